@@ -4,22 +4,12 @@ Modular Flask Application
 """
 
 from flask import Flask, send_from_directory
-from dotenv import load_dotenv
+from config import load_env_file
+from logging_config import setup_logging
 import os
 import logging
 
 # ==================== ENVIRONMENT SETUP ====================
-def load_env_file():
-    """Manually load .env file"""
-    env_path = os.path.join(os.path.dirname(__file__), '.env')
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
-
 load_env_file()
 
 # ==================== FLASK APP SETUP ====================
@@ -27,23 +17,20 @@ app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "technoglobal-secret-key-2025")
 
 # ==================== LOGGING ====================
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler()]
-)
+# JSON + kuyruklu handler (LOG_FORMAT, LOG_LEVEL, LOG_LEVELS, LOG_SAMPLE_EVERY)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# ==================== DATABASE & MODELS ====================
-from database import get_database
-from models import AdminModel
+# ==================== DATABASE ====================
+# MongoDB bağlantısı ilk kullanımda açılır (import sırasında ağ erişimi yok).
+# Default admin ve index'ler için: python bootstrap.py
+
+# ==================== PROFILING ====================
+# X-Profile: 1 header'ı veya PROFILE_SAMPLE_RATE ile açılır (Server-Timing header'ı)
+import profiling
+import mongo_monitor  # noqa: F401  (sorgu şekli listener'ı client oluşmadan kaydedilmeli)
 
-# Initialize default admin
-try:
-    AdminModel.create_default_admin()
-    logger.info("✅ Database initialized, default admin ready")
-except Exception as e:
-    logger.warning(f"⚠️  Admin creation warning: {e}")
+profiling.init_app(app)
 
 # ==================== REGISTER BLUEPRINTS ====================
 from routes import register_blueprints
@@ -66,4 +53,9 @@ if __name__ == "__main__":
     logger.info(f"📍 Port: {port}")
     logger.info("⚠️  Use gunicorn for production!")
     logger.info("=" * 60)
+    
+    # Geliştirme ortamında admin/index'leri hazırla (production: python bootstrap.py)
+    from bootstrap import bootstrap
+    bootstrap()
+    
     app.run(host="0.0.0.0", port=port, debug=True)
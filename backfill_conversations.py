@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Konuşma özetlerini (conversations) chats koleksiyonundan oluştur
+Okuma cursor'u (last_read_at) ve sayaçlar için; sayaçlar kayarsa tekrar çalıştırılabilir
+"""
+
+import logging
+
+from config import load_env_file
+
+load_env_file()
+
+from models import ChatModel
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    logger.info("=" * 60)
+    logger.info("💬 Konuşma Özeti / Sayaç Backfill Scripti")
+    logger.info("=" * 60)
+    
+    updated = ChatModel.rebuild_conversations()
+    
+    logger.info(f"✅ {updated} konuşma güncellendi")
+    logger.info("=" * 60)
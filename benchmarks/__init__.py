@@ -0,0 +1,6 @@
+"""
+Benchmarks Package
+Yerel Graph API stub'ı ile throughput / gecikme ölçümleri
+
+Kullanım: python -m benchmarks.run --help
+"""
@@ -0,0 +1,177 @@
+"""
+Graph API Stub
+WhatsApp Cloud API'nin benchmark için yerel taklidi (gecikme / hata / throttle enjeksiyonu)
+
+Tek başına: python -m benchmarks.graph_stub --port 9090 --latency-ms 120 --error-rate 0.01
+Uygulamayı yönlendirmek için: GRAPH_API_BASE=http://127.0.0.1:9090
+"""
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+import argparse
+import random
+import threading
+import time
+import uuid
+
+
+class GraphStub:
+    """
+    /messages, /message_templates ve /media endpoint'lerini taklit eder
+
+    - latency_ms ± jitter_ms: her istekte bekleme
+    - error_rate: 400 (geçersiz parametre) dönen isteklerin oranı
+    - throttle_rate: 429 / code 130429 (rate limit) dönen isteklerin oranı
+    - max_rps: saniyelik kapasite; aşılırsa throttle döner (0 = sınırsız)
+    """
+
+    def __init__(self, latency_ms: float = 100, jitter_ms: float = 20, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, max_rps: float = 0, templates: int = 30, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.templates = [
+            {
+                "id": str(1000 + i),
+                "name": f"sablon_{i}",
+                "status": "APPROVED",
+                "language": "tr",
+                "category": "MARKETING",
+                "components": [{"type": "BODY", "text": f"Şablon {i}"}]
+            }
+            for i in range(templates)
+        ]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)  # (saniye, istek sayısı)
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+        self.app = self._create_app()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+
+    # --- enjeksiyon ---
+
+    def _delay(self):
+        delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _inject_failure(self):
+        """Hata / throttle yanıtı (yoksa None)"""
+        roll = self._random.random()
+        with self._lock:
+            self.stats["requests"] += 1
+            if self._over_capacity() or roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return jsonify({"error": {
+                    "message": "(#130429) Rate limit hit",
+                    "type": "OAuthException",
+                    "code": 130429
+                }}), 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return jsonify({"error": {
+                    "message": "(#100) Invalid parameter",
+                    "type": "OAuthException",
+                    "code": 100
+                }}), 400
+            self.stats["ok"] += 1
+        return None
+
+    def _over_capacity(self) -> bool:
+        """Saniyelik kapasite aşıldı mı (lock altında çağrılır)"""
+        if not self.max_rps:
+            return False
+        second = int(time.time())
+        window_second, count = self._window
+        count = count + 1 if window_second == second else 1
+        self._window = (second, count)
+        return count > self.max_rps
+
+    # --- endpoint'ler ---
+
+    def _create_app(self) -> Flask:
+        app = Flask("graph_stub")
+
+        @app.route("/<version>/<phone_number_id>/messages", methods=["POST"])
+        def messages(version, phone_number_id):
+            self._delay()
+            failure = self._inject_failure()
+            if failure:
+                return failure
+            payload = request.get_json(silent=True) or {}
+            return jsonify({
+                "messaging_product": "whatsapp",
+                "contacts": [{"input": payload.get("to"), "wa_id": payload.get("to")}],
+                "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]
+            })
+
+        @app.route("/<version>/<business_id>/message_templates", methods=["GET"])
+        def message_templates(version, business_id):
+            self._delay()
+            failure = self._inject_failure()
+            if failure:
+                return failure
+            limit = int(request.args.get("limit", 25))
+            offset = int(request.args.get("offset", 0))
+            page = self.templates[offset:offset + limit]
+            body = {"data": page, "paging": {}}
+            if offset + limit < len(self.templates):
+                body["paging"]["next"] = f"{request.base_url}?limit={limit}&offset={offset + limit}"
+            return jsonify(body)
+
+        @app.route("/<version>/<phone_number_id>/media", methods=["POST"])
+        def media(version, phone_number_id):
+            self._delay()
+            failure = self._inject_failure()
+            if failure:
+                return failure
+            return jsonify({"id": str(uuid.uuid4().int)[:16]})
+
+        return app
+
+    # --- sunucu ---
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Arka plan thread'inde başlat, base URL döndür"""
+        self._server = make_server(host, port, self.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="graph-stub", daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_port}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WhatsApp Cloud API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9090)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0)
+    args = parser.parse_args()
+
+    stub = GraphStub(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_rps=args.max_rps
+    )
+    print(f"🧪 Graph API stub: http://{args.host}:{args.port}")
+    make_server(args.host, args.port, stub.app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
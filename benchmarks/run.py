@@ -0,0 +1,453 @@
+"""
+Benchmark Runner
+Yerel Graph API stub'ı + mongomock (veya yerel mongod) ile uygulama endpoint'lerini ölçer
+
+Senaryolar:
+- bulk_send:    /api/bulk-send (mesaj/sn, mesaj başı süre p50/p99)
+- webhook:      /webhook status + gelen mesaj patlaması
+- chat_polling: /api/chats, /api/chat/<phone>, unread-count, stats
+- analytics:    /api/analytics/stats
+
+Her senaryo için istek/sn, p50/p99 (ms) ve istek başına Mongo operasyonu raporlanır.
+
+Örnekler:
+    python -m benchmarks.run
+    python -m benchmarks.run --scenarios bulk_send,webhook --contacts 2000 --latency-ms 80
+    python -m benchmarks.run --mongo-uri mongodb://localhost:27017/whatsapp_bench
+    python -m benchmarks.run --mongo-uri mongodb://localhost:27017/whatsapp_bench --skip-seed  (seed_data sonrası)
+    python -m benchmarks.run --output bench_output.txt --baseline benchmarks/baseline.json
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = ("bulk_send", "webhook", "chat_polling", "analytics")
+BENCH_TEMPLATE = "bench_template"
+
+
+# ==================== MONGO OP SAYACI ====================
+
+class OpCounter:
+    """Mongo operasyon sayacı (mongomock wrapper'ı veya CommandListener besler)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, amount: int = 1):
+        with self._lock:
+            self.count += amount
+
+    def reset(self) -> int:
+        with self._lock:
+            count, self.count = self.count, 0
+        return count
+
+
+op_counter = OpCounter()
+
+# mongomock'ta sayılan Collection metodları (iç içe çağrılar tek sayılır)
+MOCK_OPERATIONS = (
+    "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+    "delete_one", "delete_many", "aggregate", "count_documents", "estimated_document_count",
+    "distinct", "find_one_and_update", "find_one_and_replace", "find_one_and_delete", "bulk_write"
+)
+
+
+def _count_mongomock_operations(collection_class):
+    depth = threading.local()
+
+    def wrap(method):
+        def wrapper(*args, **kwargs):
+            outermost = not getattr(depth, "value", 0)
+            if outermost:
+                op_counter.add()
+            depth.value = getattr(depth, "value", 0) + 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                depth.value -= 1
+        return wrapper
+
+    for name in MOCK_OPERATIONS:
+        if hasattr(collection_class, name):
+            setattr(collection_class, name, wrap(getattr(collection_class, name)))
+
+
+def setup_mongo(mongo_uri: str = None, drop: bool = True):
+    """
+    Database singleton'ını benchmark veritabanına bağla
+    mongo_uri verilmezse mongomock kullanılır; drop ise koleksiyonlar silinir.
+    """
+    import database
+
+    if mongo_uri is None:
+        import mongomock
+        _count_mongomock_operations(mongomock.collection.Collection)
+        client = mongomock.MongoClient()
+        db = client.get_database("whatsapp_bench")
+        database.db_instance._client = client
+        database.db_instance._db = db
+        database.db_instance._pid = os.getpid()
+        database.db_instance._options = {}
+        return db
+
+    from pymongo import monitoring
+
+    class _CommandCounter(monitoring.CommandListener):
+        def started(self, event):
+            if event.command_name not in ("hello", "ismaster", "isMaster", "ping", "endSessions"):
+                op_counter.add()
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    database.register_listener(_CommandCounter())
+    os.environ["MONGODB_URI"] = mongo_uri
+    db = database.get_database()
+    if "bench" not in db.name:
+        raise SystemExit(f"❌ Veritabanı adı 'bench' içermeli (koleksiyonlar silinir): {db.name}")
+    if drop:
+        for name in db.list_collection_names():
+            db.drop_collection(name)
+    return db
+
+
+# ==================== VERİ ====================
+
+def seed(db, contacts: int, chat_ratio: float, skip: bool = False) -> List[str]:
+    """Benchmark verisi (benchmarks.seed_data); skip ise mevcut veri kullanılır"""
+    from benchmarks.seed_data import seed_database, finalize
+
+    if not skip:
+        print(f"🌱 Seeding {contacts} contacts...")
+        seed_database(db, contacts=contacts, chat_ratio=chat_ratio, batch_size=1000, log=lambda line: None)
+        finalize(log=lambda line: None)
+
+    phones = db["contacts"].distinct("phone")
+    if not phones:
+        raise SystemExit("❌ Veritabanında kişi yok (--skip-seed olmadan çalıştırın)")
+    return phones
+
+
+# ==================== ÖLÇÜM ====================
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _logged_in_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+        session["username"] = "bench"
+    return client
+
+
+def run_requests(app, name: str, requests_fn: Callable, total: int, concurrency: int) -> Dict:
+    """requests_fn(client, i) -> response; süreleri ve Mongo op sayısını topla"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    local = threading.local()
+
+    def one(i):
+        nonlocal errors
+        if not hasattr(local, "client"):
+            local.client = _logged_in_client(app)
+        started = time.perf_counter()
+        response = requests_fn(local.client, i)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            if response.status_code >= 400:
+                errors += 1
+
+    op_counter.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    ops = op_counter.reset()
+
+    return {
+        "scenario": name,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(total / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mongo_ops_per_request": round(ops / total, 2) if total else 0
+    }
+
+
+def bench_bulk_send(app, recipients: int) -> Dict:
+    """Tek /api/bulk-send isteği ve arka plan işinin sonu; mesaj başı döngü süresi ölçülür"""
+    import bulk_engine
+    from models import BulkJobModel
+
+    send_times = []
+    threads = []
+    original_send = bulk_engine.send_template_message
+    original_start = bulk_engine.start_job
+
+    def timed_send(*args, **kwargs):
+        send_times.append(time.perf_counter())
+        return original_send(*args, **kwargs)
+
+    def tracked_start(job):
+        thread = original_start(job)
+        threads.append(thread)
+        return thread
+
+    bulk_engine.send_template_message = timed_send
+    bulk_engine.start_job = tracked_start
+    try:
+        client = _logged_in_client(app)
+        op_counter.reset()
+        started = time.perf_counter()
+        response = client.post("/api/bulk-send", json={
+            "template_name": BENCH_TEMPLATE,
+            "limit": recipients,
+            # Rate limit beklemesi ölçümü bozmasın
+            "rate_limit_per_minute": 10 ** 9
+        })
+        # İstek 202 ile döner; gönderim arka plan thread'inde biter
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        ops = op_counter.reset()
+    finally:
+        bulk_engine.send_template_message = original_send
+        bulk_engine.start_job = original_start
+
+    body = response.get_json() or {}
+    job = BulkJobModel.get_job(body["job_id"]) if body.get("job_id") else None
+    results = (job or {}).get("counters", {})
+    body["success"] = bool(job) and job["status"] == "completed"
+    processed = results.get("success", 0) + results.get("failed", 0)
+    cycle_ms = [(b - a) * 1000 for a, b in zip(send_times, send_times[1:])]
+
+    return {
+        "scenario": "bulk_send",
+        "requests": processed,
+        "errors": results.get("failed", 0) if body.get("success") else processed or 1,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(processed / elapsed, 2) if elapsed else 0,
+        "p50_ms": round(percentile(cycle_ms, 50), 2),
+        "p99_ms": round(percentile(cycle_ms, 99), 2),
+        "mongo_ops_per_request": round(ops / processed, 2) if processed else 0
+    }
+
+
+def bench_webhook(app, phones: List[str], total: int, concurrency: int) -> Dict:
+    rng = random.Random(7)
+
+    def payload(i):
+        phone = rng.choice(phones)
+        if i % 10 < 7:
+            value = {"statuses": [{
+                "id": f"wamid.bench{i}",
+                "status": rng.choice(["sent", "delivered", "read"]),
+                "recipient_id": phone
+            }]}
+        else:
+            value = {
+                "messages": [{
+                    "from": phone,
+                    "id": f"wamid.in{i}",
+                    "type": "text",
+                    "text": {"body": f"merhaba {i}"}
+                }],
+                "contacts": [{"profile": {"name": "Bench"}}]
+            }
+        return {"entry": [{"changes": [{"field": "messages", "value": value}]}]}
+
+    return run_requests(app, "webhook", lambda client, i: client.post("/webhook", json=payload(i)), total, concurrency)
+
+
+def bench_chat_polling(app, phones: List[str], total: int, concurrency: int) -> Dict:
+    filters = ["all", "incoming", "unread", "replied"]
+
+    def poll(client, i):
+        kind = i % 4
+        if kind == 0:
+            return client.get(f"/api/chats?filter={filters[(i // 4) % 4]}&page=1&limit=20")
+        if kind == 1:
+            return client.get(f"/api/chat/{phones[i % len(phones)]}?limit=50")
+        if kind == 2:
+            return client.get("/api/chat/unread-count")
+        return client.get("/api/chats/stats")
+
+    return run_requests(app, "chat_polling", poll, total, concurrency)
+
+
+def bench_analytics(app, total: int, concurrency: int) -> Dict:
+    ranges = ["today", "7d", "30d", "all"]
+    return run_requests(
+        app, "analytics",
+        lambda client, i: client.get(f"/api/analytics/stats?time_range={ranges[i % len(ranges)]}"),
+        total, concurrency
+    )
+
+
+# ==================== RAPOR ====================
+
+def print_report(results: List[Dict]):
+    header = f"{'scenario':<14}{'reqs':>7}{'err':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'mongo/req':>11}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<14}{r['requests']:>7}{r['errors']:>6}{r['throughput_per_s']:>10}"
+            f"{r['p50_ms']:>10}{r['p99_ms']:>10}{r['mongo_ops_per_request']:>11}"
+        )
+    print("\nGraph stub:")
+    for r in results:
+        print(f"   {r['scenario']:<14}{r['graph']}")
+
+
+def compare_baseline(results: List[Dict], baseline_path: str, max_regression: float) -> List[str]:
+    """Baseline'a göre throughput düşüşü / p99 artışı max_regression'ı aşan senaryolar"""
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+
+    regressions = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if not base:
+            continue
+        if base["throughput_per_s"] and r["throughput_per_s"] < base["throughput_per_s"] * (1 - max_regression):
+            regressions.append(f"{r['scenario']}: throughput {base['throughput_per_s']} → {r['throughput_per_s']}/s")
+        if base["p99_ms"] and r["p99_ms"] > base["p99_ms"] * (1 + max_regression):
+            regressions.append(f"{r['scenario']}: p99 {base['p99_ms']} → {r['p99_ms']} ms")
+        if base["mongo_ops_per_request"] and r["mongo_ops_per_request"] > base["mongo_ops_per_request"] * (1 + max_regression):
+            regressions.append(
+                f"{r['scenario']}: mongo ops/req {base['mongo_ops_per_request']} → {r['mongo_ops_per_request']}"
+            )
+    return regressions
+
+
+# ==================== MAIN ====================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TechnoSender benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Virgülle ayrılmış: {', '.join(SCENARIOS)}")
+    parser.add_argument("--mongo-uri", default=None, help="Yerel mongod (db adı 'bench' içermeli); yoksa mongomock")
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--chat-ratio", type=float, default=0.3, help="Chat geçmişi olan kişi oranı")
+    parser.add_argument("--skip-seed", action="store_true", help="Mevcut veriyi kullan (--mongo-uri ile, seed_data sonrası)")
+    parser.add_argument("--recipients", type=int, default=200, help="bulk_send alıcı sayısı")
+    parser.add_argument("--requests", type=int, default=500, help="Diğer senaryolarda istek sayısı")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50, help="Graph stub gecikmesi")
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0)
+    parser.add_argument("--output", help="Sonuçları JSON olarak yaz")
+    parser.add_argument("--baseline", help="Karşılaştırılacak önceki --output dosyası")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="İzin verilen oran (0.2 = %%20)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        print(f"❌ Bilinmeyen senaryo: {', '.join(sorted(unknown))}")
+        return 2
+
+    from benchmarks.graph_stub import GraphStub
+
+    stub = GraphStub(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_rps=args.max_rps,
+        seed=1
+    )
+    base_url = stub.start()
+
+    # Uygulama modülleri import edilmeden önce ayarlanmalı (modül seviyesinde okunuyor)
+    os.environ["GRAPH_API_BASE"] = base_url
+    os.environ.setdefault("PHONE_NUMBER_ID", "bench-phone")
+    os.environ.setdefault("WHATSAPP_BUSINESS_ID", "bench-business")
+    os.environ.setdefault("WHATSAPP_ACCESS_TOKEN", "bench-token")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("LOG_FORMAT", "text")
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+    db = setup_mongo(args.mongo_uri, drop=not args.skip_seed)
+    from app import app
+    
+    # Webhook handler çalışma dizinine webhook_logs.json yazar; repo'yu kirletmesin
+    os.chdir(tempfile.mkdtemp(prefix="whatsapp_bench_"))
+
+    phones = seed(db, args.contacts, args.chat_ratio, skip=args.skip_seed)
+
+    results = []
+    for scenario in scenarios:
+        print(f"⏱️  {scenario}...")
+        stub.reset_stats()
+        if scenario == "bulk_send":
+            results.append(bench_bulk_send(app, args.recipients))
+        elif scenario == "webhook":
+            results.append(bench_webhook(app, phones, args.requests, args.concurrency))
+        elif scenario == "chat_polling":
+            results.append(bench_chat_polling(app, phones, args.requests, args.concurrency))
+        elif scenario == "analytics":
+            results.append(bench_analytics(app, args.requests, args.concurrency))
+        results[-1]["graph"] = dict(stub.stats)
+
+    stub.stop()
+    print_report(results)
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({
+                "created_at": datetime.utcnow().isoformat(),
+                "mongo": "mongod" if args.mongo_uri else "mongomock",
+                "settings": vars(args),
+                "results": results
+            }, f, indent=2)
+        print(f"💾 {output}")
+
+    if baseline:
+        regressions = compare_baseline(results, baseline, args.max_regression)
+        if regressions:
+            print("\n❌ Regression:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("\n✅ Baseline'a göre regression yok")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
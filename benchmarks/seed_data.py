@@ -0,0 +1,409 @@
+"""
+Synthetic Data Generator
+Production ölçeğinde contacts / messages / chats / sales / webhook_logs üretir
+
+- Dağılımlar çarpık (Pareto): az sayıda kişinin çok mesajı/chat'i olur
+- Mesajlar durum geçişleriyle (sent → delivered → read / failed) ve tutarlı
+  template_sends ledger'ı ile üretilir
+- Yazmalar insert_many / bulk_write ile batch halinde yapılır
+- Sonunda conversations + chat_stats yeniden hesaplanır ve index'ler oluşturulur
+
+Örnekler:
+    python -m benchmarks.seed_data --mongo-uri mongodb://localhost:27017/whatsapp_bench --contacts 100000
+    python -m benchmarks.seed_data --mongo-uri ... --contacts 20000 --messages-per-contact 20 --skew 1.1 --drop
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Iterable
+from pymongo import UpdateOne
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLLECTIONS = ("contacts", "messages", "template_sends", "chats", "conversations", "chat_stats", "products", "sales", "webhook_logs")
+
+COUNTRIES = [("TR", 0.55), ("DE", 0.1), ("AZ", 0.08), ("NL", 0.06), ("FR", 0.05), ("GB", 0.05), ("US", 0.04), ("", 0.07)]
+TAGS = ["toptan", "perakende", "vip", "yeni", "eski_musteri", "bayi", "webhook"]
+INCOMING_TYPES = [("text", 0.85), ("image", 0.08), ("document", 0.04), ("video", 0.03)]
+
+# Mesaj durum dağılımı (sent → delivered → read; failed ayrı dal)
+FAILED_RATE = 0.03
+DELIVERED_RATE = 0.92
+READ_RATE = 0.6
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _skewed_count(rng: random.Random, mean: float, alpha: float, cap: int) -> int:
+    """Ortalaması ~mean olan Pareto dağılımlı sayı (alpha küçüldükçe kuyruk uzar)"""
+    if mean <= 0:
+        return 0
+    # Pareto(alpha) ortalaması alpha / (alpha - 1)
+    scale = mean * (alpha - 1) / alpha if alpha > 1 else mean / 2
+    return min(int(rng.paretovariate(alpha) * scale), cap)
+
+
+def _recent_time(rng: random.Random, now: datetime, days: int) -> datetime:
+    """Yakın tarihlere ağırlıklı zaman (son günler daha yoğun)"""
+    age_days = days * (rng.random() ** 2)
+    return now - timedelta(days=age_days)
+
+
+class BatchWriter:
+    """Dokümanları biriktirip insert_many ile yazar"""
+
+    def __init__(self, collection, batch_size: int):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.total = 0
+        self._batch = []
+
+    def add(self, doc: Dict):
+        self._batch.append(doc)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self.collection.insert_many(self._batch, ordered=False)
+            self.total += len(self._batch)
+            self._batch = []
+
+
+def _insert_batches(collection, docs: Iterable[Dict], batch_size: int) -> int:
+    writer = BatchWriter(collection, batch_size)
+    for doc in docs:
+        writer.add(doc)
+    writer.flush()
+    return writer.total
+
+
+def _bulk_write_batches(collection, operations: Iterable, batch_size: int) -> int:
+    total = 0
+    batch = []
+    for operation in operations:
+        batch.append(operation)
+        if len(batch) >= batch_size:
+            collection.bulk_write(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        collection.bulk_write(batch, ordered=False)
+        total += len(batch)
+    return total
+
+
+def seed_database(
+    db,
+    contacts: int = 100000,
+    templates: int = 20,
+    messages_per_contact: float = 6,
+    chat_ratio: float = 0.3,
+    chat_messages: float = 15,
+    sales_ratio: float = 0.05,
+    webhook_log_ratio: float = 0.5,
+    skew: float = 1.3,
+    days: int = 180,
+    batch_size: int = 5000,
+    seed: int = 42,
+    log=print
+) -> Dict:
+    """
+    Veritabanına sentetik veri yaz
+
+    - messages_per_contact: kişi başı ortalama template gönderimi (çarpık)
+    - chat_ratio: chat geçmişi olan kişi oranı, chat_messages: bunlarda ortalama mesaj
+    - sales_ratio: satış yapılan kişi oranı
+    - webhook_log_ratio: mesaj durum geçişlerinin webhook_logs'a yazılma oranı
+    - skew: Pareto alpha (1.1 çok çarpık, 3 neredeyse düzgün)
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    template_names = [f"sablon_{i}" for i in range(1, templates + 1)]
+    # Bazı template'ler çok daha sık gönderilir
+    template_weights = [1 / (i ** 0.8) for i in range(1, templates + 1)]
+    counts = {}
+
+    phones = [f"90{rng.randint(5000000000, 5599999999)}" for _ in range(contacts)]
+    phones = list(dict.fromkeys(phones))
+
+    # Kişi başına gönderilen template'ler (ledger ile messages tutarlı olsun)
+    sends = {}
+    for phone in phones:
+        n = _skewed_count(rng, messages_per_contact, skew, cap=templates * 3)
+        if n:
+            sends[phone] = rng.choices(template_names, weights=template_weights, k=n)
+
+    # --- contacts ---
+    started = time.time()
+
+    def contact_docs():
+        for i, phone in enumerate(phones):
+            created = _recent_time(rng, now, days * 2)
+            yield {
+                "phone": phone,
+                "name": f"Müşteri {i}",
+                "country": _weighted(rng, COUNTRIES),
+                "tags": rng.sample(TAGS, k=rng.randint(0, 2)),
+                "created_at": created,
+                "updated_at": created,
+                "is_active": rng.random() > 0.03,
+                "metadata": {}
+            }
+
+    counts["contacts"] = _insert_batches(db["contacts"], contact_docs(), batch_size)
+    log(f"   contacts: {counts['contacts']} ({time.time() - started:.1f}s)")
+
+    # --- messages + webhook_logs (durum geçişleri) ---
+    started = time.time()
+    webhook_logs = BatchWriter(db["webhook_logs"], batch_size)
+    # (phone, template_name) → ilk başarılı gönderim (başarısızlar ledger'a girmez)
+    ledger = {}
+
+    def message_docs():
+        for phone, names in sends.items():
+            for template_name in names:
+                sent_at = _recent_time(rng, now, days)
+                message_id = f"wamid.{uuid.UUID(int=rng.getrandbits(128)).hex}"
+                doc = {
+                    "phone": phone,
+                    "template_name": template_name,
+                    "message_type": "template",
+                    "content": "",
+                    "media_url": None,
+                    "status": "sent",
+                    "message_id": message_id,
+                    "sent_at": sent_at,
+                    "delivered_at": None,
+                    "read_at": None,
+                    "failed_at": None,
+                    "error_message": None,
+                    "metadata": {}
+                }
+                transitions = ["sent"]
+                if rng.random() < FAILED_RATE:
+                    doc["status"] = "failed"
+                    doc["failed_at"] = sent_at + timedelta(seconds=rng.randint(1, 30))
+                    doc["error_message"] = "[{'code': 131026, 'title': 'Message undeliverable'}]"
+                    transitions.append("failed")
+                elif rng.random() < DELIVERED_RATE:
+                    doc["status"] = "delivered"
+                    doc["delivered_at"] = sent_at + timedelta(seconds=rng.randint(1, 600))
+                    transitions.append("delivered")
+                    if rng.random() < READ_RATE:
+                        doc["status"] = "read"
+                        doc["read_at"] = doc["delivered_at"] + timedelta(minutes=rng.randint(1, 60 * 48))
+                        transitions.append("read")
+                if doc["status"] != "failed":
+                    key = (phone, template_name)
+                    ledger[key] = min(ledger.get(key, sent_at), sent_at)
+
+                for status in transitions:
+                    if rng.random() < webhook_log_ratio:
+                        webhook_logs.add({
+                            "event_type": "status",
+                            "phone": phone,
+                            "data": {"status": status, "message_id": message_id},
+                            "timestamp": doc.get(f"{status}_at") or sent_at
+                        })
+                yield doc
+
+    counts["messages"] = _insert_batches(db["messages"], message_docs(), batch_size)
+    log(f"   messages: {counts['messages']} ({time.time() - started:.1f}s)")
+
+    counts["template_sends"] = _insert_batches(db["template_sends"], (
+        {"phone": phone, "template_name": template_name, "status": "sent", "sent_at": sent_at, "source": "seed"}
+        for (phone, template_name), sent_at in ledger.items()
+    ), batch_size)
+    log(f"   template_sends: {counts['template_sends']}")
+
+    # --- chats (çarpık geçmiş uzunluğu) ---
+    started = time.time()
+    chat_phones = rng.sample(phones, k=int(len(phones) * chat_ratio))
+
+    def chat_docs():
+        for phone in chat_phones:
+            n = max(_skewed_count(rng, chat_messages, skew, cap=20000), 1)
+            timestamp = _recent_time(rng, now, days)
+            for j in range(n):
+                timestamp = min(timestamp + timedelta(minutes=rng.expovariate(1 / 90)), now)
+                direction = "incoming" if rng.random() < 0.55 else "outgoing"
+                message_type = _weighted(rng, INCOMING_TYPES) if direction == "incoming" else "text"
+                content = f"mesaj {j}" if message_type == "text" else f"({message_type})"
+                if direction == "incoming" and rng.random() < webhook_log_ratio:
+                    webhook_logs.add({
+                        "event_type": "incoming_message",
+                        "phone": phone,
+                        "data": {"message_type": message_type, "content": content},
+                        "timestamp": timestamp
+                    })
+                yield {
+                    "phone": phone,
+                    "direction": direction,
+                    "message_type": message_type,
+                    "content": content,
+                    "media_url": None,
+                    # Son mesajlar dışında gelenler okunmuş say
+                    "is_read": direction == "outgoing" or j < n - 3 or rng.random() < 0.5,
+                    "timestamp": timestamp
+                }
+
+    counts["chats"] = _insert_batches(db["chats"], chat_docs(), batch_size)
+    log(f"   chats: {counts['chats']} across {len(chat_phones)} conversations ({time.time() - started:.1f}s)")
+
+    webhook_logs.flush()
+    counts["webhook_logs"] = webhook_logs.total
+    log(f"   webhook_logs: {counts['webhook_logs']}")
+
+    # --- products + sales ---
+    started = time.time()
+    products = []
+    for i in range(1, 11):
+        cost = round(rng.uniform(2, 40), 2)
+        sale = round(cost * rng.uniform(1.15, 1.8), 2)
+        products.append({
+            "name": f"Ürün {i}",
+            "currency": "USD",
+            "description": "",
+            "category": rng.choice(["elektronik", "aksesuar", "kablo"]),
+            "use_tier_pricing": False,
+            "is_active": True,
+            "cost_price": cost,
+            "sale_price": sale,
+            "pricing_tiers": [],
+            "profit": round(sale - cost, 2),
+            "profit_margin": round((sale - cost) / sale * 100, 2),
+            "created_at": now - timedelta(days=days),
+            "updated_at": now - timedelta(days=days)
+        })
+    product_ids = db["products"].insert_many(products).inserted_ids
+    counts["products"] = len(product_ids)
+
+    buyers = rng.sample(phones, k=int(len(phones) * sales_ratio))
+    buyer_stats = {}
+
+    def sale_docs():
+        for phone in buyers:
+            for _ in range(max(_skewed_count(rng, 2, skew, cap=200), 1)):
+                index = rng.randrange(len(products))
+                product = products[index]
+                quantity = rng.choice([1, 1, 2, 5, 10, 50, 100])
+                total_cost = product["cost_price"] * quantity
+                total_sale = product["sale_price"] * quantity
+                sale_date = _recent_time(rng, now, days)
+                stats = buyer_stats.setdefault(phone, {"count": 0, "last": sale_date})
+                stats["count"] += 1
+                stats["last"] = max(stats["last"], sale_date)
+                yield {
+                    "phone": phone,
+                    "customer_name": phone,
+                    "product_id": str(product_ids[index]),
+                    "product_name": product["name"],
+                    "quantity": quantity,
+                    "unit_cost_price": product["cost_price"],
+                    "unit_sale_price": product["sale_price"],
+                    "total_cost": round(total_cost, 2),
+                    "total_amount": round(total_sale, 2),
+                    "total_profit": round(total_sale - total_cost, 2),
+                    "profit_margin": product["profit_margin"],
+                    "currency": "USD",
+                    "notes": "",
+                    "sale_date": sale_date,
+                    "created_at": sale_date,
+                    "status": "completed"
+                }
+
+    counts["sales"] = _insert_batches(db["sales"], sale_docs(), batch_size)
+    _bulk_write_batches(db["contacts"], (
+        UpdateOne(
+            {"phone": phone},
+            {"$set": {"has_sale": True, "last_sale_date": stats["last"]}, "$inc": {"total_sales": stats["count"]}}
+        )
+        for phone, stats in buyer_stats.items()
+    ), batch_size)
+    log(f"   sales: {counts['sales']} ({time.time() - started:.1f}s)")
+
+    return counts
+
+
+def finalize(log=print) -> Dict:
+    """Konuşma özetleri, global sayaçlar ve index'ler (models üzerinden)"""
+    from models import ChatModel, ensure_indexes
+
+    started = time.time()
+    ensure_indexes()
+    conversations = ChatModel.rebuild_conversations()
+    log(f"   conversations rebuilt: {conversations} ({time.time() - started:.1f}s)")
+    return {"conversations": conversations}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sentetik veri üretici")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGODB_URI"),
+                        help="Hedef veritabanı (URI'de db adı olmalı)")
+    parser.add_argument("--contacts", type=int, default=100000)
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--messages-per-contact", type=float, default=6)
+    parser.add_argument("--chat-ratio", type=float, default=0.3)
+    parser.add_argument("--chat-messages", type=float, default=15)
+    parser.add_argument("--sales-ratio", type=float, default=0.05)
+    parser.add_argument("--webhook-log-ratio", type=float, default=0.5)
+    parser.add_argument("--skew", type=float, default=1.3, help="Pareto alpha (küçük = daha çarpık)")
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop", action="store_true", help="Önce koleksiyonları sil")
+    parser.add_argument("--yes", action="store_true", help="Db adı 'bench' içermese de devam et")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not args.mongo_uri:
+        print("❌ --mongo-uri veya MONGODB_URI gerekli")
+        return 2
+
+    os.environ["MONGODB_URI"] = args.mongo_uri
+    from database import get_database
+    db = get_database()
+
+    if "bench" not in db.name and not args.yes:
+        print(f"❌ '{db.name}' bir benchmark veritabanı gibi görünmüyor (adında 'bench' yok); --yes ile zorla")
+        return 2
+
+    if args.drop:
+        for name in COLLECTIONS:
+            db.drop_collection(name)
+
+    print(f"🌱 Seeding {db.name}: {args.contacts} contacts")
+    started = time.time()
+    counts = seed_database(
+        db,
+        contacts=args.contacts,
+        templates=args.templates,
+        messages_per_contact=args.messages_per_contact,
+        chat_ratio=args.chat_ratio,
+        chat_messages=args.chat_messages,
+        sales_ratio=args.sales_ratio,
+        webhook_log_ratio=args.webhook_log_ratio,
+        skew=args.skew,
+        days=args.days,
+        batch_size=args.batch_size,
+        seed=args.seed
+    )
+    counts.update(finalize())
+    print(f"✅ Done in {time.time() - started:.1f}s: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Veritabanı Bootstrap Komutu
+Default admin ve index'leri oluşturur; konuşma özetleri (conversations) boşsa
+chats koleksiyonundan doldurur. Uygulama başlangıcında değil, deploy öncesi
+çalıştırılır (Procfile: release):
+
+    python bootstrap.py
+"""
+
+import logging
+import sys
+
+from config import load_env_file
+
+load_env_file()
+
+from models import AdminModel, ChatModel, ensure_indexes
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def backfill_conversations():
+    """Konuşma özetleri yoksa chats'ten oluştur, global sayaçlar yoksa hesapla (idempotent)"""
+    if ChatModel.get_conversations_collection().find_one({}, {"_id": 1}) is None:
+        if ChatModel.get_collection().find_one({}, {"_id": 1}) is not None:
+            updated = ChatModel.rebuild_conversations()
+            logger.info(f"💬 {updated} konuşma özeti chats'ten oluşturuldu")
+            return
+    if ChatModel.get_stats_collection().find_one({"_id": "global"}) is None:
+        ChatModel.rebuild_chat_stats()
+        logger.info("💬 Global chat sayaçları hesaplandı")
+
+def bootstrap() -> bool:
+    """Default admin + index'ler + konuşma özetleri (idempotent)"""
+    try:
+        AdminModel.create_default_admin()
+        ensure_indexes()
+        backfill_conversations()
+        logger.info("✅ Database initialized, default admin and indexes ready")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Bootstrap hatası: {e}")
+        return False
+
+if __name__ == "__main__":
+    sys.exit(0 if bootstrap() else 1)
@@ -0,0 +1,517 @@
+"""
+Bulk Send Engine
+Toplu template gönderimini kalıcı bir iş (bulk_jobs) olarak çalıştırır
+
+- Alıcılar Mongo'dan _id sırasıyla sayfa sayfa akıtılır (liste bellekte tutulmaz);
+  segment_id verilirse segment filtreleri iş çalışırken çözülür. direct=True ile
+  verilen telefon listesine (kişi kaydı olmasa da) sırayla gönderilir
+- Alıcılar BULK_CHECKPOINT_EVERY'lik gruplar halinde işlenir: gönderimler
+  BULK_CONCURRENCY thread ile paralel yapılır, template_sends claim'i her alıcı için
+  hız bekleyişinden sonra, gönderimin hemen önünde alınır (lease sadece Graph API
+  isteğini kapsar); mesaj ve chat kayıtları grup başına toplu yazılır
+- Her grupta son işlenen alıcı ve sayaçlar kaydedilir (checkpoint), lease
+  (BULK_JOB_LEASE_SECONDS) uzatılır. Yavaş işlerde lease ayrıca
+  BULK_HEARTBEAT_SECONDS'ta bir uzatılır; checkpoint veya heartbeat işin
+  başkasına geçtiğini gösterirse yeni gönderim başlatılmadan durulur
+- Worker ölürse lease dolar; scheduler (kampanya olmayan işler dahil) resume_job
+  ile işi son checkpoint'ten devam ettirir.
+  Checkpoint ile çökme arasında işlenenler template_sends claim'i sayesinde
+  tekrar gönderilmez
+- respect_quiet_hours ile sessiz saatteki ülkelerin kişileri atlanır (deferred);
+  özet, en erken tekrar deneme zamanını (resume_at) döndürür
+- Her kişi havuzdaki sabit gönderici numarasından gönderilir (senders.py); numara
+  bütçesi marketing önceliğiyle alınır (outbound.py), iş sayaçları numara bazında
+  da tutulur (counters.senders). Header görselinin media ID'si iş başında her
+  numara için çözülür (media.resolve_for_senders)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+from models import ContactModel, MessageModel, ChatModel, TemplateSendModel, BulkJobModel, SegmentModel
+from utils import send_template_message
+from senders import pool as sender_pool
+import media
+import outbound
+import quiet_hours
+from health import monitor
+from metrics import bulk_send_messages, bulk_send_job_seconds, bulk_send_in_progress
+import logging
+import os
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_EVERY = int(os.environ.get("BULK_CHECKPOINT_EVERY", 25))
+JOB_LEASE_SECONDS = int(os.environ.get("BULK_JOB_LEASE_SECONDS", 300))
+CONCURRENCY = max(1, int(os.environ.get("BULK_CONCURRENCY", 4)))
+HEARTBEAT_SECONDS = int(os.environ.get("BULK_HEARTBEAT_SECONDS", 30))
+
+# Yanıtta döndürülen alıcı detayı sınırı (büyük işlerde yanıt şişmesin)
+MAX_DETAILS = 1000
+
+# Bu process'te devam eden toplu gönderimlerde kalan alıcı sayısı (readiness göstergesi)
+_pending_recipients = {}
+_pending_lock = threading.Lock()
+monitor.register_queue("bulk_send_pending", lambda: sum(_pending_recipients.values()))
+
+
+def _owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class _Pacer:
+    """İşin rate limit'i: paralel gönderimler arasında sabit aralık"""
+
+    def __init__(self, per_minute: float):
+        self.delay = 60.0 / per_minute if per_minute > 0 else 1.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.delay
+        if at > now:
+            time.sleep(at - now)
+
+
+def create_job(template_name: str, header_image_id: str = "", limit: int = None,
+               rate_limit_per_minute: float = 60, tags: list = None, phones: list = None,
+               respect_quiet_hours: bool = False, campaign_id: str = None, segment_id: str = None,
+               language_code: str = "tr", direct: bool = False) -> Dict:
+    """
+    Yeni işi kaydet (çağıran process sahibi olur, run_job ile çalıştırılır)
+
+    direct: phones kişi tablosundan süzülmeden doğrudan alıcı listesi olarak kullanılır
+    """
+    if segment_id:
+        estimated_total = SegmentModel.get_audience_count(segment_id) or 0
+    elif phones:
+        estimated_total = len(set(phones))
+    else:
+        active = ContactModel.get_collection().count_documents({"is_active": True})
+        estimated_total = max(active - TemplateSendModel.count(template_name), 0)
+    if limit:
+        estimated_total = min(estimated_total, limit)
+
+    params = {
+        "header_image_id": header_image_id,
+        "language_code": language_code,
+        "limit": limit,
+        "rate_limit_per_minute": rate_limit_per_minute,
+        "tags": tags or [],
+        "phones": phones or [],
+        "direct": direct,
+        "segment_id": segment_id,
+        "respect_quiet_hours": respect_quiet_hours,
+        "campaign_id": campaign_id
+    }
+    return BulkJobModel.create_job(template_name, params, _owner(), JOB_LEASE_SECONDS, estimated_total)
+
+
+def resume_job(job_id: str) -> Optional[Dict]:
+    """Sahibi ölmüş / hata ile durmuş işi devral (canlıysa veya bittiyse None)"""
+    return BulkJobModel.acquire(job_id, _owner(), JOB_LEASE_SECONDS)
+
+
+def start_job(job: Dict) -> threading.Thread:
+    """
+    İşi arka plan thread'inde çalıştır (web isteğini bloklamadan)
+
+    Process ölürse iş lease'i dolar ve scheduler işi son checkpoint'ten devralır
+    (scheduler.resume_orphaned_jobs).
+    """
+    thread = threading.Thread(target=run_job, args=(job,), name=f"bulk-job-{job['_id']}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _job_filters(params: Dict) -> Dict:
+    """İşin hedef kitlesi: segment (gönderim anında okunur) veya tags/phones"""
+    if params.get("segment_id"):
+        segment = SegmentModel.get_segment(params["segment_id"])
+        if not segment:
+            raise ValueError(f"Segment not found: {params['segment_id']}")
+        return segment["filters"]
+    return {"tags": params.get("tags") or [], "phones": params.get("phones") or []}
+
+
+def _iter_phones(phones: List[str], template_name: str, after: str = None, page_size: int = 500) -> Iterator[Dict]:
+    """
+    Doğrudan telefon listesi (sıralı, tekil); isimler kişi kaydından, ledger'da
+    kaydı olanlar (already_sent) template_sends'ten sayfa sayfa okunur
+    """
+    pending = sorted(phone for phone in set(phones) if after is None or phone > after)
+    for start in range(0, len(pending), page_size):
+        page = pending[start:start + page_size]
+        names = {
+            doc["phone"]: doc.get("name")
+            for doc in ContactModel.get_collection().find({"phone": {"$in": page}}, {"phone": 1, "name": 1})
+        }
+        sent = {
+            doc["phone"]
+            for doc in TemplateSendModel.get_collection().find(
+                {"template_name": template_name, "phone": {"$in": page}}, {"_id": 0, "phone": 1}
+            )
+        }
+        for phone in page:
+            # Checkpoint anahtarı olarak telefon kullanılır
+            yield {"_id": phone, "phone": phone, "name": names.get(phone) or "Unknown",
+                   "already_sent": phone in sent}
+
+
+def _iter_recipients(params: Dict, template_name: str, after_id=None) -> Iterator[Dict]:
+    if params.get("direct"):
+        return _iter_phones(params.get("phones") or [], template_name, after=after_id)
+    return SegmentModel.iter_contacts(_job_filters(params), exclude_template=template_name, after_id=after_id)
+
+
+def run_job(job: Dict) -> Dict:
+    """
+    İşi son checkpoint'ten sonuna kadar çalıştır (çağıran thread'de, bloklayarak)
+
+    Returns: {job_id, status, results: {success, failed, skipped, deferred, total},
+              resume_at, details: []}
+    """
+    job_id = job["_id"]
+    owner = job["owner"]
+    template_name = job["template_name"]
+    params = job.get("params", {})
+    limit = params.get("limit")
+    rate_limit = params.get("rate_limit_per_minute") or 60
+
+    counters = dict(job.get("counters") or {"attempted": 0, "success": 0, "failed": 0, "skipped": 0})
+    counters.setdefault("deferred", 0)
+    counters.setdefault("senders", {})
+    respect_quiet_hours = params.get("respect_quiet_hours", False)
+    resume_at = None
+    last_contact_id = job.get("last_contact_id")
+    estimated_total = job.get("estimated_total") or 0
+    details = []
+    batch = []
+    batch_after_id = last_contact_id
+    status = "completed"
+    error = None
+
+    logger.info(
+        "Bulk job %s %s: ~%d recipients, %s msg/min", job_id, "resuming" if last_contact_id else "starting",
+        estimated_total, rate_limit,
+        extra={"job_id": job_id, "template": template_name}
+    )
+
+    start_time = time.time()
+    send_key = threading.get_ident()
+    with _pending_lock:
+        _pending_recipients[send_key] = max(estimated_total - counters["attempted"], 0)
+    bulk_send_in_progress.inc()
+
+    def add_detail(entry):
+        if len(details) < MAX_DETAILS:
+            details.append(entry)
+
+    # Media ID yüklendiği numaraya ait; her numara kendi ID'sini kullanır
+    header_image_id = params.get("header_image_id") or ""
+    header_ids = media.resolve_for_senders(header_image_id, sender_pool.senders) if header_image_id else {}
+
+    pacer = _Pacer(rate_limit)
+    executor = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="bulk-send")
+
+    # Grup hız limiti yüzünden uzun sürse de lease dolmasın (checkpoint sayıya bağlı)
+    lost = threading.Event()
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(HEARTBEAT_SECONDS):
+            try:
+                if not BulkJobModel.heartbeat(job_id, owner, JOB_LEASE_SECONDS):
+                    lost.set()
+                    return
+            except Exception as e:
+                # Geçici DB hatası: sonraki turda tekrar denenir
+                logger.warning("Bulk job heartbeat failed: %s", e, extra={"job_id": job_id})
+
+    threading.Thread(target=heartbeat, name=f"bulk-job-heartbeat-{job_id}", daemon=True).start()
+
+    def flush():
+        """Grubu paralel gönder, sonuçları toplu kaydet"""
+        if not batch:
+            return
+        outcomes = list(executor.map(
+            lambda contact: _deliver(template_name, params, contact, pacer, header_ids, lost),
+            batch
+        ))
+        batch.clear()
+        _persist(job_id, template_name, outcomes, counters, add_detail)
+        with _pending_lock:
+            _pending_recipients[send_key] = max(estimated_total - counters["attempted"], 0)
+
+    try:
+        processed = 0
+        for contact in _iter_recipients(params, template_name, after_id=last_contact_id):
+            if limit and counters["attempted"] >= limit:
+                break
+
+            phone = contact["phone"]
+            processed += 1
+
+            until = quiet_hours.quiet_until(contact.get("country")) if respect_quiet_hours else None
+            if until is not None:
+                # Sessiz saat: gönderilmez, sonraki çalıştırmada tekrar denenir
+                counters["deferred"] += 1
+                resume_at = until if resume_at is None else min(resume_at, until)
+            elif contact.get("already_sent"):
+                # Gönderilmiş / başka worker gönderiyor
+                counters["skipped"] += 1
+                bulk_send_messages.labels("skipped").inc()
+                add_detail({"phone": phone, "name": contact.get("name", "Unknown"),
+                            "status": "skipped", "error": "Already sent"})
+            else:
+                # Claim gönderim anında _deliver'da alınır
+                if not batch:
+                    batch_after_id = last_contact_id
+                counters["attempted"] += 1
+                batch.append(contact)
+            last_contact_id = contact["_id"]
+
+            if processed % CHECKPOINT_EVERY == 0:
+                flush()
+                elapsed_time = time.time() - start_time
+                logger.info(
+                    "Bulk send progress %d/%d", counters["attempted"], estimated_total,
+                    extra={
+                        "job_id": job_id,
+                        "template": template_name,
+                        "success": counters["success"],
+                        "failed": counters["failed"],
+                        "rate": round(processed / elapsed_time, 2) if elapsed_time > 0 else 0
+                    }
+                )
+                if lost.is_set() or not BulkJobModel.checkpoint(
+                    job_id, owner, last_contact_id, counters, JOB_LEASE_SECONDS
+                ):
+                    # Lease kaçırıldı, iş başka bir process'te devam ediyor
+                    logger.warning("Bulk job %s taken over by another worker, stopping", job_id,
+                                   extra={"job_id": job_id, "template": template_name})
+                    status = "lost"
+                    break
+
+        flush()
+        if lost.is_set():
+            # Son grup gönderilmedi; yeni sahip son checkpoint'ten devam eder
+            status = "lost"
+    except Exception as e:
+        status = "failed"
+        error = str(e)
+        logger.exception("Bulk job %s failed: %s", job_id, e, extra={"job_id": job_id, "template": template_name})
+        if batch:
+            # Gönderilmemiş grup (claim henüz alınmadı): devam noktası grubun başına çekilir
+            counters["attempted"] -= len(batch)
+            last_contact_id = batch_after_id
+    finally:
+        executor.shutdown(wait=True)
+        stopped.set()
+        with _pending_lock:
+            _pending_recipients.pop(send_key, None)
+        bulk_send_in_progress.dec()
+        bulk_send_job_seconds.observe(time.time() - start_time)
+
+    if status != "lost":
+        BulkJobModel.finish(job_id, owner, status, last_contact_id, counters, error)
+
+    logger.info(
+        "Bulk job %s %s: %d success, %d failed, %d skipped",
+        job_id, status, counters["success"], counters["failed"], counters["skipped"],
+        extra={"job_id": job_id, "template": template_name}
+    )
+
+    return {
+        "job_id": job_id,
+        "status": status,
+        "error": error,
+        "results": {
+            "success": counters["success"],
+            "failed": counters["failed"],
+            "skipped": counters["skipped"],
+            "deferred": counters["deferred"],
+            "total": counters["attempted"] + counters["skipped"],
+            "senders": counters["senders"]
+        },
+        "resume_at": resume_at,
+        "details": details
+    }
+
+
+def _deliver(template_name: str, params: Dict, contact: Dict, pacer: _Pacer, header_ids: Dict,
+             lost: threading.Event) -> Dict:
+    """
+    Tek alıcıya gönder (executor thread'inde): hız beklemesi, claim, gönderim ve
+    claim'in sonuçlandırılması. İş başka process'e geçtiyse (lost) gönderilmez
+
+    Returns: {phone, name, sender, result, message_id, skipped, aborted, db_error}
+    """
+    phone = contact["phone"]
+    sender = sender_pool.for_contact(phone)
+    outcome = {
+        "phone": phone,
+        "name": contact.get("name", "Unknown"),
+        "sender": sender.phone_number_id,
+        "result": None,
+        "message_id": None,
+        "skipped": False,
+        "aborted": False,
+        "db_error": None
+    }
+
+    pacer.wait()
+    outbound.acquire(sender, outbound.MARKETING)
+    if lost.is_set():
+        # Bekleme sırasında iş devralındı: alıcı yeni sahibe kalır
+        outcome["aborted"] = True
+        return outcome
+    try:
+        # Lease gönderimin hemen önünde alınır; grup içindeki hız beklemesini kapsamaz
+        claimed = TemplateSendModel.claim(phone, template_name, source="bulk_send")
+    except Exception as e:
+        # Claim alınamadı, gönderilmez (ledger kaydı olmadığı için sonra tekrar denenir)
+        outcome["result"] = {"success": False, "error": str(e)}
+        outcome["db_error"] = str(e)
+        return outcome
+    if not claimed:
+        # Gönderilmiş / başka worker gönderiyor
+        outcome["skipped"] = True
+        return outcome
+
+    try:
+        # Recovery marker'ı: bundan sonra çöken claim gönderilmiş sayılır
+        TemplateSendModel.mark_attempted(phone, template_name)
+    except Exception as e:
+        # Marker yazılamadı: göndermeden bırakılır (claim kalırsa recovery siler)
+        try:
+            TemplateSendModel.release(phone, template_name)
+        except Exception:
+            pass
+        outcome["result"] = {"success": False, "error": str(e)}
+        outcome["db_error"] = str(e)
+        return outcome
+
+    try:
+        result = send_template_message(
+            phone, template_name,
+            language_code=params.get("language_code") or "tr",
+            header_image_id=header_ids.get(sender.phone_number_id, params.get("header_image_id", "")),
+            sender=sender
+        )
+    except Exception as e:
+        # Gidip gitmediği bilinmiyor: timeout gibi ele alınır (tekrar gönderilmez)
+        logger.exception("Bulk send exception for %s: %s", phone, e)
+        result = {"success": False, "error": str(e)}
+    outcome["result"] = result
+    outcome.update(settle_claim(phone, template_name, result))
+    return outcome
+
+
+def settle_claim(phone: str, template_name: str, result: Dict, source: str = "bulk_send") -> Dict:
+    """
+    Gönderim sonucuna göre template_sends claim'ini sonuçlandır
+
+    Returns: {message_id, db_error}
+    """
+    message_id = None
+    try:
+        if result["success"]:
+            # ✅ BAŞARILI - claim commit edilir
+            message_id = (result.get("response", {}).get("messages") or [{}])[0].get("id")
+            committed = TemplateSendModel.commit(phone, template_name, message_id=message_id)
+        elif result.get("status_code"):
+            # ❌ BAŞARISIZ - API reddetti, claim geri alınır, kişi tekrar denenebilir
+            committed = True
+            if not TemplateSendModel.release(phone, template_name):
+                logger.warning("Send claim already gone on release: %s %s", phone, template_name)
+        else:
+            # ❓ Timeout / bağlantı hatası - mesaj gitmiş olabilir, tekrar gönderilmez
+            committed = TemplateSendModel.commit(phone, template_name, confirmed=False)
+
+        if not committed:
+            # Lease gönderim bitmeden doldu ve recovery claim'i bıraktı: mesaj gitmiş
+            # olabilir, tekrar gönderilmesin diye kayıt geri yazılır
+            TemplateSendModel.record_sent(phone, template_name, source=source)
+            return {"message_id": message_id, "db_error": "Send lease expired before commit"}
+    except Exception as e:
+        # Claim kaldığı için tekrar gönderilmez; lease dolunca recovery çözer
+        return {"message_id": message_id, "db_error": str(e)}
+    return {"message_id": message_id, "db_error": None}
+
+
+def _persist(job_id: str, template_name: str, outcomes: List[Dict], counters: Dict, add_detail):
+    """Grubun sayaçlarını güncelle, mesaj ve chat kayıtlarını toplu yaz"""
+    messages = []
+    chats = []
+    for outcome in outcomes:
+        phone = outcome["phone"]
+        result = outcome["result"]
+        if outcome["aborted"]:
+            counters["attempted"] -= 1
+            continue
+        if outcome["skipped"]:
+            counters["attempted"] -= 1
+            counters["skipped"] += 1
+            bulk_send_messages.labels("skipped").inc()
+            add_detail({"phone": phone, "name": outcome["name"], "status": "skipped", "error": "Already sent"})
+            continue
+
+        sender_counters = counters["senders"].setdefault(outcome["sender"], {"success": 0, "failed": 0})
+        sender_counters["success" if result["success"] else "failed"] += 1
+
+        if outcome["db_error"]:
+            # Ledger hatası - bu kritik!
+            logger.error(
+                "Bulk send database error for %s: %s", phone, outcome["db_error"],
+                extra={"job_id": job_id, "template": template_name}
+            )
+            counters["failed"] += 1
+            bulk_send_messages.labels("db_error").inc()
+            add_detail({"phone": phone, "name": outcome["name"], "status": "failed",
+                        "error": f"Database error: {outcome['db_error']}"})
+            continue
+
+        if result["success"]:
+            messages.append({"phone": phone, "template_name": template_name, "status": "sent",
+                             "message_id": outcome["message_id"]})
+            chats.append({"phone": phone, "direction": "outgoing", "message_type": "template",
+                          "content": f"📤 Toplu Gönderim: {template_name}"})
+            counters["success"] += 1
+            bulk_send_messages.labels("success").inc()
+            add_detail({"phone": phone, "name": outcome["name"], "status": "success"})
+            logger.info(
+                "Bulk send sent %s", phone,
+                extra={"sample": "bulk_send.sent", "job_id": job_id, "template": template_name}
+            )
+        else:
+            messages.append({"phone": phone, "template_name": template_name, "status": "failed",
+                             "error_message": result.get("error", "Unknown error")})
+            counters["failed"] += 1
+            bulk_send_messages.labels("failed").inc()
+            add_detail({"phone": phone, "name": outcome["name"], "status": "failed",
+                        "error": result.get("error", "Unknown error")})
+            logger.warning(
+                "Bulk send failed for %s: %s", phone, result.get("error"),
+                extra={"job_id": job_id, "template": template_name}
+            )
+
+    if messages:
+        try:
+            MessageModel.create_messages(messages)
+        except Exception as e:
+            # Gönderim ve ledger tamam, sadece mesaj logu eksik kalır
+            logger.error("Bulk send message log write failed: %s", e, extra={"job_id": job_id, "template": template_name})
+            bulk_send_messages.labels("db_error").inc(len(messages))
+
+    if chats:
+        try:
+            ChatModel.save_messages(chats)
+        except Exception as chat_error:
+            # Chat kaydetme başarısız olsa bile devam et
+            logger.warning("Chat save failed for job %s: %s", job_id, chat_error)
@@ -6,7 +6,6 @@ Usage: python bulk_update_old_templates.py
 
 import os
 import sys
-from datetime import datetime
 
 # .env dosyasını yükle
 def load_env_file():
@@ -27,6 +26,7 @@ load_env_file()
 
 # Database'i import et
 from database import get_database
+from models import TemplateSendModel
 
 # Eski sablon_6 gönderim listesi
 OLD_TEMPLATE_DATA = {
@@ -218,15 +218,8 @@ def update_sent_templates():
             # Her formatı dene
             found = False
             for format_phone in formats_to_try:
-                result = contacts_collection.update_one(
-                    {"phone": format_phone},
-                    {
-                        "$addToSet": {"sent_templates": template_name},
-                        "$set": {"updated_at": datetime.utcnow()}
-                    }
-                )
-                
-                if result.matched_count > 0:
+                if contacts_collection.find_one({"phone": format_phone}, {"_id": 1}):
+                    TemplateSendModel.record_sent(format_phone, template_name, source="import")
                     updated += 1
                     found = True
                     print(f"   ✅ Bulundu: {format_phone}")
@@ -1,91 +1,67 @@
 #!/usr/bin/env python3
 """
-Başarısız mesajların durumunu kontrol et
+Başarısız mesajların ledger durumunu kontrol et
+- Hiç başarılı gönderimi olmayan başarısız (phone, template_name) ikililerinden
+  kaçının template_sends'te kaydı var (tekrar gönderimi engelliyor)
+
+Kayıtları silmek için: python fix_failed_duplicates.py
 """
 
-import os
 import logging
 
-# .env dosyasını manuel yükle
-def load_env_file():
-    env_path = os.path.join(os.path.dirname(__file__), '.env')
-    if os.path.exists(env_path):
-        with open(env_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    os.environ[key.strip()] = value.strip()
-        return True
-    return False
+from config import load_env_file
 
 load_env_file()
 
-from database import get_database
-from models import ContactModel, MessageModel
+from models import TemplateSendModel
+from fix_failed_duplicates import failed_pairs
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+SAMPLE_SIZE = 10
+
+
 def check_status():
-    """Failed mesajların durumunu kontrol et"""
-    
-    db = get_database()
-    messages_collection = MessageModel.get_collection()
-    contacts_collection = ContactModel.get_collection()
-    
-    # Rastgele 10 başarısız mesaj al
-    failed_messages = list(messages_collection.find({
-        "status": "failed"
-    }).limit(10))
-    
-    logger.info(f"📊 İlk 10 başarısız mesaj kontrol ediliyor...")
+    """Failed mesajların ledger durumunu kontrol et"""
+    total = 0
+    blocked = 0
+
+    logger.info(f"📊 İlk {SAMPLE_SIZE} başarısız gönderim kontrol ediliyor...")
     logger.info("=" * 80)
-    
-    for i, msg in enumerate(failed_messages, 1):
-        phone = msg.get("phone")
-        template_name = msg.get("template_name")
-        
-        # Contact'ı bul
-        contact = contacts_collection.find_one({"phone": phone})
-        
-        if contact:
-            sent_templates = contact.get("sent_templates", [])
-            in_list = template_name in sent_templates
-            
-            logger.info(f"\n[{i}] Phone: {phone}")
+
+    for phone, template_name in failed_pairs():
+        total += 1
+        send = TemplateSendModel.get_collection().find_one(
+            # Gönderimi süren claim'ler sayılmaz
+            {"phone": phone, "template_name": template_name, "status": {"$ne": "in_flight"}},
+            {"_id": 0, "status": 1, "source": 1, "sent_at": 1}
+        )
+        if send:
+            blocked += 1
+
+        if total <= SAMPLE_SIZE:
+            logger.info(f"\n[{total}] Phone: {phone}")
             logger.info(f"    Template: {template_name}")
-            logger.info(f"    sent_templates'de: {'✅ VAR (PROBLEM!)' if in_list else '❌ YOK (Normal)'}")
-            logger.info(f"    sent_templates: {sent_templates}")
-        else:
-            logger.warning(f"\n[{i}] Contact bulunamadı: {phone}")
-    
+            logger.info(f"    Ledger'da: {'✅ VAR (PROBLEM!)' if send else '❌ YOK (Normal)'}")
+            if send:
+                logger.info(f"    Kayıt: {send}")
+
     logger.info("=" * 80)
-    
-    # Özet istatistik
-    all_failed = list(messages_collection.find({"status": "failed"}, {"phone": 1, "template_name": 1}))
-    
-    problem_count = 0
-    for msg in all_failed:
-        phone = msg.get("phone")
-        template_name = msg.get("template_name")
-        
-        contact = contacts_collection.find_one({"phone": phone}, {"sent_templates": 1})
-        if contact and template_name in contact.get("sent_templates", []):
-            problem_count += 1
-    
+
     logger.info(f"\n📊 ÖZET:")
-    logger.info(f"   Toplam başarısız mesaj: {len(all_failed)}")
-    logger.info(f"   sent_templates'de olan: {problem_count} (PROBLEM!)")
-    logger.info(f"   sent_templates'de olmayan: {len(all_failed) - problem_count} (Normal)")
-    
-    if problem_count == 0:
+    logger.info(f"   Toplam başarısız gönderim: {total}")
+    logger.info(f"   Ledger'da olan: {blocked} (PROBLEM!)")
+    logger.info(f"   Ledger'da olmayan: {total - blocked} (Normal)")
+
+    if blocked == 0:
         logger.info(f"\n✅ HİÇ PROBLEM YOK!")
-        logger.info(f"   Başarısız mesajlar zaten sent_templates'de değil")
+        logger.info(f"   Başarısız gönderimler ledger'da değil")
         logger.info(f"   Tekrar gönderim yapılabilir!")
     else:
-        logger.warning(f"\n⚠️ {problem_count} mesajda problem var!")
-        logger.warning(f"   Bu mesajlar sent_templates'den çıkarılmalı")
+        logger.warning(f"\n⚠️ {blocked} gönderimde problem var!")
+        logger.warning(f"   Bu kayıtlar için: python fix_failed_duplicates.py")
+
 
 if __name__ == "__main__":
     logger.info("🔍 Başarısız Mesaj Durum Kontrolü")
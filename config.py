@@ -0,0 +1,33 @@
+"""
+Environment Configuration
+.env dosyasını process başına bir kez yükler
+"""
+
+import os
+
+_loaded = False
+
+
+def load_env_file(path: str = None) -> bool:
+    """
+    .env dosyasını os.environ'a yükle (tekrar çağrılırsa dosya yeniden okunmaz)
+    
+    Returns: dosya bulunduysa True
+    """
+    global _loaded
+    if _loaded:
+        return True
+
+    env_path = path or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+    if not os.path.exists(env_path):
+        return False
+
+    with open(env_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                os.environ[key.strip()] = value.strip()
+
+    _loaded = True
+    return True
@@ -3,81 +3,268 @@ MongoDB Database Connection ve Configuration
 """
 import os
 import logging
-from pymongo import MongoClient
+import threading
+import time
+from typing import Dict, List
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 
 logger = logging.getLogger(__name__)
 
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _available_compressors(requested: str) -> List[str]:
+    """İstenen compressor'lardan kurulu olanları döndür (zstd/snappy ek paket ister)"""
+    available = []
+    for name in [c.strip() for c in requested.split(",") if c.strip()]:
+        if name == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️  zstd compression için 'zstandard' paketi kurulu değil, atlanıyor")
+                continue
+        elif name == "snappy":
+            try:
+                import snappy  # noqa: F401
+            except ImportError:
+                logger.warning("⚠️  snappy compression için 'python-snappy' paketi kurulu değil, atlanıyor")
+                continue
+        available.append(name)
+    return available
+
+
+def get_client_options() -> Dict:
+    """MongoClient bağlantı havuzu ayarları (environment'tan)"""
+    options = {
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 10000),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", 30000),
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+        "readPreference": os.environ.get("MONGO_READ_PREFERENCE", "primary"),
+    }
+
+    compressors = _available_compressors(os.environ.get("MONGO_COMPRESSORS", ""))
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Bağlantı havuzu istatistikleri (kullanımda, bekleyen, bekleme süresi)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.created = 0
+            self.closed = 0
+            self.in_use = 0
+            self.waiting = 0
+            self.checkouts = 0
+            self.checkout_failures = {}
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "open": self.created - self.closed,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 2) if self.checkouts else 0,
+                "max_wait_ms": round(self.max_wait_ms, 2)
+            }
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        wait_ms = (time.perf_counter() - getattr(self._local, "started", time.perf_counter())) * 1000
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+
+pool_stats = PoolStatsListener()
+_event_listeners = [pool_stats]
+
+
+def register_listener(listener):
+    """
+    pymongo event listener ekle (command monitoring vb.)
+    Client oluşturulmadan önce çağrılmalı; sonraki bağlantılarda geçerlidir.
+    """
+    if listener not in _event_listeners:
+        _event_listeners.append(listener)
+
+
 class Database:
     """MongoDB bağlantı singleton sınıfı"""
     _instance = None
     _client = None
     _db = None
-    
+    _pid = None
+    _options = None
+    _lock = threading.Lock()
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
         return cls._instance
-    
+
     def connect(self):
-        """MongoDB'ye bağlan"""
-        if self._client is not None:
-            return self._db
-        
-        try:
-            mongodb_uri = os.environ.get("MONGODB_URI")
-            
-            if not mongodb_uri:
-                logger.error("❌ MONGODB_URI environment variable bulunamadı!")
-                raise ValueError("MONGODB_URI gerekli")
-            
-            # MongoDB bağlantısı
-            self._client = MongoClient(
-                mongodb_uri,
-                serverSelectionTimeoutMS=5000,
-                connectTimeoutMS=10000,
-                socketTimeoutMS=10000,
-            )
-            
-            # Bağlantı testi
-            self._client.admin.command('ping')
-            
-            # Database seç (URI'den veya default)
+        """MongoDB'ye bağlan (process başına bir client, fork sonrası yeniden oluşturulur)"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                return self._db
+
+            if self._client is not None:
+                # Fork'tan miras kalan client kullanılamaz (socket'ler parent'a ait)
+                self.reset_after_fork()
+
             try:
-                self._db = self._client.get_database()
-            except:
-                # URI'de database belirtilmemişse default kullan
-                self._db = self._client.get_database('whatsapp_api')
-            
-            logger.info("✅ MongoDB bağlantısı başarılı")
-            logger.info(f"📊 Database: {self._db.name}")
-            
-            return self._db
-            
-        except (ConnectionFailure, ServerSelectionTimeoutError) as e:
-            logger.error(f"❌ MongoDB bağlantı hatası: {e}")
-            raise
-        except Exception as e:
-            logger.error(f"❌ Beklenmeyen hata: {e}")
-            raise
-    
+                mongodb_uri = os.environ.get("MONGODB_URI")
+
+                if not mongodb_uri:
+                    logger.error("❌ MONGODB_URI environment variable bulunamadı!")
+                    raise ValueError("MONGODB_URI gerekli")
+
+                options = get_client_options()
+
+                # MongoDB bağlantısı
+                client = MongoClient(
+                    mongodb_uri,
+                    event_listeners=list(_event_listeners),
+                    **options
+                )
+
+                # NOT: Burada ping yapılmaz; client sunucu keşfini arka planda yapar,
+                # erişilebilirlik /ready endpoint'inde kontrol edilir
+
+                # Database seç (URI'den veya default)
+                try:
+                    db = client.get_database()
+                except:
+                    # URI'de database belirtilmemişse default kullan
+                    db = client.get_database('whatsapp_api')
+
+                self._client = client
+                self._db = db
+                self._pid = os.getpid()
+                self._options = options
+
+                logger.info("✅ MongoDB bağlantısı başarılı")
+                logger.info(f"📊 Database: {self._db.name} (pid={self._pid}, maxPoolSize={options['maxPoolSize']})")
+
+                return self._db
+
+            except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+                logger.error(f"❌ MongoDB bağlantı hatası: {e}")
+                raise
+            except Exception as e:
+                logger.error(f"❌ Beklenmeyen hata: {e}")
+                raise
+
     def get_db(self):
         """Database instance döndür"""
-        if self._db is None:
+        if self._db is None or self._pid != os.getpid():
             return self.connect()
         return self._db
-    
+
+    def get_client(self):
+        """MongoClient instance döndür"""
+        self.get_db()
+        return self._client
+
+    def reset_after_fork(self):
+        """Fork sonrası child process'te miras kalan client'ı bırak (kapatmadan)"""
+        self._client = None
+        self._db = None
+        self._pid = None
+        pool_stats._lock = threading.Lock()
+        pool_stats.reset()
+
     def close(self):
         """MongoDB bağlantısını kapat"""
         if self._client:
             self._client.close()
             self._client = None
             self._db = None
+            self._pid = None
             logger.info("🔒 MongoDB bağlantısı kapatıldı")
 
 # Global database instance
 db_instance = Database()
 
+def _after_fork_in_child():
+    # Fork anında başka bir thread'in tuttuğu lock child'da sonsuza kadar kilitli kalır
+    Database._lock = threading.Lock()
+    db_instance.reset_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
 def get_database():
     """Database instance al"""
     return db_instance.get_db()
+
+def get_pool_stats() -> Dict:
+    """Bağlantı havuzu istatistikleri (bu process için)"""
+    options = db_instance._options or {}
+    return {
+        "pid": os.getpid(),
+        "connected": db_instance._client is not None and db_instance._pid == os.getpid(),
+        "max_pool_size": options.get("maxPoolSize"),
+        **pool_stats.stats()
+    }
@@ -5,18 +5,54 @@ import multiprocessing
 bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
 backlog = 2048
 
+# Serving profile (GUNICORN_PROFILE):
+# - gthread: worker başına thread havuzu, yavaş Graph çağrıları worker'ı kilitlemez (default)
+# - gevent:  greenlet tabanlı, çok sayıda eşzamanlı bağlantı (gevent paketi gerekir)
+# - sync:    eski ayar (2 sync worker, 600s timeout)
+PROFILE = os.environ.get("GUNICORN_PROFILE", "gthread").lower()
+
+if PROFILE == "gevent":
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        PROFILE = "gthread"
+
+cpu_count = multiprocessing.cpu_count()
+max_workers = int(os.environ.get("GUNICORN_MAX_WORKERS", 4))
+
 # Worker processes
-workers = 2
-worker_class = 'sync'
-worker_connections = 1000
-timeout = 600  # 10 dakika - bulk send için
+if PROFILE == "sync":
+    workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+    worker_class = 'sync'
+    timeout = 600  # 10 dakika - bulk send için
+elif PROFILE == "gevent":
+    workers = int(os.environ.get("WEB_CONCURRENCY", min(cpu_count + 1, max_workers)))
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+else:
+    # I/O ağırlıklı iş yükü: az process, çok thread
+    workers = int(os.environ.get("WEB_CONCURRENCY", min(cpu_count * 2 + 1, max_workers)))
+    worker_class = 'gthread'
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+if PROFILE != "sync":
+    # gthread'de timeout worker'ın ana döngüsünü izler (takılan process'i yeniden başlatır);
+    # istek süreleri Graph/Mongo client timeout'larıyla sınırlanır. Toplu gönderimler
+    # istek içinde değil arka plan işi olarak çalışır (bulk_engine.start_job)
+    timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
 keepalive = 5
 
+# Bellek sızıntılarına karşı worker'ları periyodik yenile
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = 200
+
 # Logging
 accesslog = '-'
 errorlog = '-'
 loglevel = 'info'
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)sµs'
 
 # Process naming
 proc_name = 'whatsapp-api'
@@ -32,3 +68,27 @@ tmp_upload_dir = None
 # SSL
 keyfile = None
 certfile = None
+
+
+# Server hooks
+def post_fork(server, worker):
+    """preload_app ile parent'ta açılmış MongoClient'ı child'da kullanma"""
+    import sys
+    database = sys.modules.get("database")
+    if database is not None:
+        database.db_instance.reset_after_fork()
+
+
+def on_starting(server):
+    """Prometheus multiprocess dizinini önceki çalışmadan kalan dosyalardan temizle"""
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        import shutil
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Ölen worker'ın metrik dosyalarını işaretle (livesum gauge'ler)"""
+    from metrics import mark_process_dead
+    mark_process_dead(worker.pid)
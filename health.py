@@ -0,0 +1,162 @@
+"""
+Health Monitor
+Bağımlılık kontrollerini (Mongo, havuz, kuyruklar, Graph API) arka planda
+periyodik çalıştırır; /ready sadece son sonuçları okur
+"""
+
+from datetime import datetime
+from typing import Callable, Dict
+from database import get_database, get_pool_stats
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", 10))
+
+# Son başarılı Graph API çağrısından bu kadar saniye geçtiyse uyarı (kritik değil)
+GRAPH_STALE_AFTER = float(os.environ.get("HEALTH_GRAPH_STALE_AFTER", 3600))
+
+_graph_status = {
+    "last_success_at": None,
+    "last_error_at": None,
+    "last_error": None
+}
+
+
+def record_graph_call(success: bool, error: str = None):
+    """Graph API çağrı sonucunu kaydet (utils çağırır)"""
+    if success:
+        _graph_status["last_success_at"] = datetime.utcnow()
+    else:
+        _graph_status["last_error_at"] = datetime.utcnow()
+        _graph_status["last_error"] = error
+
+
+class HealthMonitor:
+    """Kontrolleri timer ile çalıştırıp sonuçları cache'ler"""
+
+    def __init__(self, interval: float = CHECK_INTERVAL):
+        self.interval = interval
+        self._checks = {}
+        self._queues = {}
+        self._results = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def register_check(self, name: str, fn: Callable[[], Dict], critical: bool = False):
+        """
+        Kontrol ekle. fn bir dict döndürür ("ok" anahtarı ile);
+        exception fırlatırsa ok=False sayılır.
+        """
+        self._checks[name] = (fn, critical)
+
+    def register_queue(self, name: str, fn: Callable[[], int]):
+        """Bekleyen iş sayısını döndüren kuyruk göstergesi ekle"""
+        self._queues[name] = fn
+
+    def run_checks(self):
+        """Tüm kontrolleri çalıştır ve sonuçları sakla"""
+        results = {}
+        for name, (fn, critical) in list(self._checks.items()):
+            started = time.perf_counter()
+            try:
+                result = fn() or {}
+                result.setdefault("ok", True)
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+            result["critical"] = critical
+            result["check_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            results[name] = result
+
+        queues = {}
+        for name, fn in list(self._queues.items()):
+            try:
+                queues[name] = fn()
+            except Exception as e:
+                queues[name] = f"error: {e}"
+        results["queues"] = {"ok": True, "critical": False, "pending": queues}
+
+        with self._lock:
+            self._results = results
+            self._checked_at = time.monotonic()
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_checks()
+            except Exception as e:
+                logger.error(f"Health check loop error: {e}")
+            time.sleep(self.interval)
+
+    def _ensure_running(self):
+        """Arka plan thread'ini (process başına bir tane) başlat"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def snapshot(self) -> Dict:
+        """Son kontrol sonuçları + genel durum"""
+        self._ensure_running()
+
+        # Thread henüz çalışmadıysa veya takıldıysa bir kez senkron kontrol
+        if time.monotonic() - self._checked_at > self.interval * 3:
+            self.run_checks()
+
+        with self._lock:
+            results = dict(self._results)
+            age = time.monotonic() - self._checked_at
+
+        ready = all(r.get("ok") for r in results.values() if r.get("critical"))
+        return {
+            "status": "ready" if ready else "unavailable",
+            "checked_seconds_ago": round(age, 1),
+            "checks": results
+        }
+
+
+def _check_mongo() -> Dict:
+    started = time.perf_counter()
+    get_database().command("ping")
+    return {"ok": True, "ping_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+
+def _check_mongo_pool() -> Dict:
+    stats = get_pool_stats()
+    max_pool = stats.get("max_pool_size") or 0
+    saturation = round(stats["in_use"] / max_pool * 100, 1) if max_pool else 0
+    return {
+        "ok": stats["waiting"] == 0 or saturation < 100,
+        "in_use": stats["in_use"],
+        "waiting": stats["waiting"],
+        "max_pool_size": max_pool,
+        "saturation_percent": saturation,
+        "checkout_failures": stats["checkout_failures"]
+    }
+
+
+def _check_graph_api() -> Dict:
+    last_success = _graph_status["last_success_at"]
+    age = (datetime.utcnow() - last_success).total_seconds() if last_success else None
+    return {
+        "ok": age is not None and age < GRAPH_STALE_AFTER,
+        "last_success_at": last_success.isoformat() if last_success else None,
+        "last_success_seconds_ago": round(age, 1) if age is not None else None,
+        "last_error_at": _graph_status["last_error_at"].isoformat() if _graph_status["last_error_at"] else None,
+        "last_error": _graph_status["last_error"]
+    }
+
+
+monitor = HealthMonitor()
+monitor.register_check("mongo", _check_mongo, critical=True)
+monitor.register_check("mongo_pool", _check_mongo_pool)
+monitor.register_check("graph_api", _check_graph_api)
@@ -0,0 +1,146 @@
+"""
+Logging Configuration
+JSON formatlı, kuyruklu (non-blocking) ve örneklemeli logging
+
+Environment:
+- LOG_FORMAT:  json (default) | text
+- LOG_LEVEL:   root seviye (default INFO)
+- LOG_LEVELS:  modül bazında seviye, örn. "utils=WARNING,routes.bulk_send=INFO"
+- LOG_SAMPLE_EVERY: extra={"sample": "<anahtar>"} ile işaretlenen mesaj başı
+  log'lardan her N'de biri yazılır (default 100; 1 = hepsi). WARNING ve üstü
+  her zaman yazılır.
+"""
+
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+
+# LogRecord'un standart alanları (bunların dışındakiler extra olarak yazılır)
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satır JSON olarak yaz (extra alanlar dahil)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    extra={"sample": key} taşıyan INFO/DEBUG kayıtlarından her N'de birini geçir
+    Geçen kayda o ana kadar atlanan sayı "sampled_every" olarak eklenir.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(int(every), 1)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sampled_every = self.every
+        return True
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, level = item.split("=", 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    Standart QueueHandler kaydı kuyruğa koymadan önce mesajı formatlar;
+    formatlama listener thread'inde yapılsın diye kayıt olduğu gibi kuyruğa konur.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging():
+    """
+    Root logger'ı kur: QueueHandler → (ayrı thread) QueueListener → stdout
+    İstek thread'i sadece kaydı kuyruğa koyar; formatlama ve yazma arka planda yapılır.
+    """
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        log_format = os.environ.get("LOG_FORMAT", "json").lower()
+        stream_handler = logging.StreamHandler()
+        if log_format == "json":
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _LazyQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(os.environ.get("LOG_SAMPLE_EVERY", 100)))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+        for name, level in _parse_levels(os.environ.get("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_stop_listener)
+
+
+def _stop_listener():
+    """Kuyrukta kalan kayıtları yaz (process kapanırken)"""
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_after_fork():
+    # Listener thread'i fork'ta child'a geçmez; kuyruk aynı kalır, thread yeniden başlatılır
+    global _setup_lock
+    _setup_lock = threading.Lock()
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
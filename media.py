@@ -0,0 +1,227 @@
+"""
+Media Pipeline
+Template header görselleri için içerik hash'li yükleme ve media ID cache'i
+
+- Yüklenen dosya istekten parça parça okunup GridFS'e (media_files) yazılır,
+  okunurken SHA-256'sı hesaplanır (aynı içerik tek dosya). Dosyalar Mongo'da
+  olduğu için yenilemeyi yapan scheduler process'i de aynı içeriği okur
+- İçerik daha önce aynı numaraya yüklendiyse Graph API'ye tekrar gitmeden
+  kayıtlı media ID kullanılır (media_assets)
+- Media ID yüklendiği numaraya aittir: template ayarında birincil numaranın ID'si
+  tutulur, toplu gönderim başlarken diğer numaralar için karşılığı bulunur,
+  yoksa içerik o numaraya yüklenir (resolve_for_senders)
+- Media ID'ler MEDIA_TTL_DAYS (Cloud API: 30 gün) geçerlidir; dolmasına
+  MEDIA_REFRESH_BEFORE_DAYS kala dosya GridFS'ten yeniden yüklenir ve eski ID'yi
+  kullanan template ayarları yeni ID'ye geçirilir (scheduler her turda çağırır)
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict
+import hashlib
+import logging
+import os
+
+import gridfs
+
+from models import MediaAssetModel, TemplateSettingsModel
+from senders import Sender, pool as sender_pool
+from utils import graph_request, GRAPH_API_BASE
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TTL_DAYS = float(os.environ.get("MEDIA_TTL_DAYS", 30))
+MEDIA_REFRESH_BEFORE_DAYS = float(os.environ.get("MEDIA_REFRESH_BEFORE_DAYS", 3))
+
+CHUNK_SIZE = 64 * 1024
+
+
+def store_upload(file) -> Dict:
+    """
+    Yüklenen dosyayı (werkzeug FileStorage) hash'leyerek GridFS'e yaz
+
+    Returns: {sha256, file_id, size}
+    """
+    files = MediaAssetModel.get_files()
+    digest = hashlib.sha256()
+    size = 0
+
+    grid_in = files.new_file(filename=file.filename, content_type=file.content_type)
+    try:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            grid_in.write(chunk)
+            size += len(chunk)
+        grid_in.sha256 = digest.hexdigest()
+        grid_in.close()
+    except Exception:
+        grid_in.abort()
+        raise
+
+    sha256 = grid_in.sha256
+    file_id = MediaAssetModel.find_file(sha256)
+    if file_id != grid_in._id:
+        # Aynı içerik zaten saklı: yeni kopya silinir
+        files.delete(grid_in._id)
+
+    return {"sha256": sha256, "file_id": file_id, "size": size}
+
+
+def _sender() -> Sender:
+    # Template header görselleri birincil numaraya yüklenir
+    return sender_pool.senders[0]
+
+
+def upload(file_id, filename: str, content_type: str, sender: Sender = None) -> Dict:
+    """
+    GridFS'teki dosyayı Graph API /media'ya yükle
+
+    Returns: {success, media_id} veya {success: False, status_code, error, response}
+    """
+    sender = sender or _sender()
+    url = f"{GRAPH_API_BASE}/v24.0/{sender.phone_number_id}/media"
+    headers = {"Authorization": f"Bearer {sender.access_token}"}
+
+    f = MediaAssetModel.get_files().get(file_id)
+    try:
+        files = {"file": (filename, f, content_type)}
+        logger.info(f"📤 Uploading media to WhatsApp: {filename}")
+        response = graph_request(
+            "POST", url, "media", headers=headers, files=files,
+            data={"messaging_product": "whatsapp"}, timeout=30
+        )
+    finally:
+        f.close()
+
+    if response.status_code == 200:
+        return {"success": True, "media_id": response.json().get("id")}
+
+    error_data = response.json() if response.text else {}
+    return {
+        "success": False,
+        "status_code": response.status_code,
+        "error": error_data.get("error", {}).get("message", "Unknown error"),
+        "response": error_data
+    }
+
+
+def _expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=MEDIA_TTL_DAYS)
+
+
+def _needs_refresh(asset: Dict) -> bool:
+    return asset["expires_at"] < datetime.utcnow() + timedelta(days=MEDIA_REFRESH_BEFORE_DAYS)
+
+
+def get_or_upload(stored: Dict, filename: str, content_type: str) -> Dict:
+    """
+    İçerik bu numaraya yüklendiyse (ve ID'si yakında dolmuyorsa) kayıtlı media ID,
+    değilse yeni yükleme
+
+    Returns: {success, media_id, reused, expires_at} veya upload hatası
+    """
+    sender = _sender()
+    asset = MediaAssetModel.get_asset(stored["sha256"], sender.phone_number_id)
+    if asset and not _needs_refresh(asset):
+        logger.info(f"♻️ Media already uploaded ({stored['sha256'][:12]}), reusing {asset['media_id']}")
+        return {"success": True, "media_id": asset["media_id"], "reused": True, "expires_at": asset["expires_at"]}
+
+    result = upload(stored["file_id"], filename, content_type, sender)
+    if not result["success"]:
+        return result
+
+    saved = MediaAssetModel.save_asset(
+        stored["sha256"], sender.phone_number_id, result["media_id"], _expiry(),
+        stored["file_id"], filename=filename, content_type=content_type, size=stored["size"]
+    )
+    if asset and asset["media_id"] != result["media_id"]:
+        TemplateSettingsModel.replace_header_image_id(asset["media_id"], result["media_id"])
+    return {"success": True, "media_id": result["media_id"], "reused": False, "expires_at": saved["expires_at"]}
+
+
+def media_id_for(media_id: str, sender: Sender) -> str:
+    """
+    media_id ile aynı içeriğin bu numaraya ait media ID'si (gerekirse yükler)
+
+    Kayıtlı olmayan (elle girilmiş) ID'ler olduğu gibi döner.
+    """
+    asset = MediaAssetModel.get_by_media_id(media_id)
+    if not asset or asset["phone_number_id"] == sender.phone_number_id:
+        return media_id
+
+    own = MediaAssetModel.get_asset(asset["sha256"], sender.phone_number_id)
+    if own and not _needs_refresh(own):
+        return own["media_id"]
+
+    file_id = asset.get("file_id") or MediaAssetModel.find_file(asset["sha256"])
+    if not file_id:
+        raise ValueError(f"Media file missing for {media_id}")
+    filename = asset.get("filename") or asset["sha256"]
+    content_type = asset.get("content_type") or "image/jpeg"
+    result = upload(file_id, filename, content_type, sender)
+    if not result["success"]:
+        raise ValueError(result["error"])
+
+    MediaAssetModel.save_asset(
+        asset["sha256"], sender.phone_number_id, result["media_id"], _expiry(), file_id,
+        filename=filename, content_type=content_type, size=asset.get("size")
+    )
+    logger.info(f"📤 Media {media_id} uploaded for sender {sender.name}: {result['media_id']}")
+    return result["media_id"]
+
+
+def resolve_for_senders(media_id: str, senders) -> Dict[str, str]:
+    """
+    Numara → media ID (toplu gönderim başında bir kez)
+
+    Çözülemeyen numaralarda orijinal ID kullanılır; Graph API reddederse
+    claim geri alınır ve kişi sonra tekrar denenir.
+    """
+    resolved = {}
+    for sender in senders:
+        try:
+            resolved[sender.phone_number_id] = media_id_for(media_id, sender)
+        except Exception as e:
+            logger.error(f"❌ Media {media_id} could not be resolved for sender {sender.name}: {e}")
+            resolved[sender.phone_number_id] = media_id
+    return resolved
+
+
+def refresh_expiring(limit: int = 20) -> int:
+    """Media ID'si dolmak üzere olan dosyaları yeniden yükle; yenilenen sayısı"""
+    before = datetime.utcnow() + timedelta(days=MEDIA_REFRESH_BEFORE_DAYS)
+    refreshed = 0
+    for asset in MediaAssetModel.get_expiring(before, limit=limit):
+        sender = sender_pool.get(asset["phone_number_id"])
+        if not sender:
+            MediaAssetModel.mark_refresh_error(asset["_id"], "sender not configured")
+            continue
+        # Eski (yerel diskte saklanmış) kayıtlarda file_id yok; içerik GridFS'te aranır
+        file_id = asset.get("file_id") or MediaAssetModel.find_file(asset["sha256"])
+        if not file_id:
+            logger.warning(f"⚠️ Media file missing, cannot refresh {asset['media_id']} ({asset['sha256'][:12]})")
+            MediaAssetModel.mark_refresh_error(asset["_id"], "file missing")
+            continue
+
+        try:
+            result = upload(file_id, asset.get("filename") or asset["sha256"],
+                            asset.get("content_type") or "image/jpeg", sender)
+        except gridfs.NoFile:
+            result = {"success": False, "error": "file missing"}
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        if not result["success"]:
+            logger.error(f"❌ Media refresh failed for {asset['media_id']}: {result['error']}")
+            MediaAssetModel.mark_refresh_error(asset["_id"], result["error"])
+            continue
+
+        MediaAssetModel.save_asset(
+            asset["sha256"], asset["phone_number_id"], result["media_id"], _expiry(), file_id,
+            content_type=asset.get("content_type"), size=asset.get("size")
+        )
+        templates = TemplateSettingsModel.replace_header_image_id(asset["media_id"], result["media_id"])
+        logger.info(f"🔄 Media refreshed: {asset['media_id']} → {result['media_id']} ({templates} templates)")
+        refreshed += 1
+    return refreshed
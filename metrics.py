@@ -0,0 +1,202 @@
+"""
+Prometheus Metrics
+Graph API, toplu gönderim, webhook ve MongoDB metrikleri
+
+prometheus_client kurulu değilse metrikler sessizce devre dışı kalır.
+Gunicorn ile birden fazla worker çalışıyorsa PROMETHEUS_MULTIPROC_DIR
+ayarlanmalıdır; /metrics bu durumda tüm worker'ların toplamını döndürür.
+Dizin yoksa oluşturulur (scheduler, bootstrap, scriptler gunicorn'suz başlar);
+oluşturulamazsa tek process moduna dönülür.
+"""
+
+from functools import wraps
+import os
+import time
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+if MULTIPROC_DIR:
+    try:
+        os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    except OSError:
+        # prometheus_client değer sınıfını import sırasında seçer; dizin yazılamıyorsa
+        # process içi metriklere dön
+        os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+        os.environ.pop("prometheus_multiproc_dir", None)
+        MULTIPROC_DIR = None
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram
+    METRICS_ENABLED = True
+except ImportError:
+    prometheus_client = None
+    Counter = Gauge = Histogram = None
+    METRICS_ENABLED = False
+
+
+class _NoopMetric:
+    """prometheus_client yokken kullanılan boş metrik"""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+def _metric(kind, name, documentation, labelnames=(), **kwargs):
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    return kind(name, documentation, labelnames, **kwargs)
+
+
+# Süreler saniye cinsinden
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+MONGO_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+graph_request_seconds = _metric(
+    Histogram,
+    "whatsapp_graph_request_seconds",
+    "Graph API request latency",
+    ("endpoint", "status"),
+    buckets=LATENCY_BUCKETS
+)
+
+bulk_send_messages = _metric(
+    Counter,
+    "whatsapp_bulk_send_messages",
+    "Bulk send recipients processed",
+    ("result",)
+)
+
+bulk_send_job_seconds = _metric(
+    Histogram,
+    "whatsapp_bulk_send_job_seconds",
+    "Bulk send job duration",
+    buckets=(1, 10, 30, 60, 300, 900, 1800, 3600, 7200)
+)
+
+bulk_send_in_progress = _metric(
+    Gauge,
+    "whatsapp_bulk_send_in_progress",
+    "Bulk send jobs currently running",
+    multiprocess_mode="livesum"
+)
+
+sender_messages = _metric(
+    Counter,
+    "whatsapp_sender_messages",
+    "Messages sent per sender phone number",
+    ("sender", "result")
+)
+
+outbound_wait_seconds = _metric(
+    Histogram,
+    "whatsapp_outbound_wait_seconds",
+    "Time spent waiting for the sender budget",
+    ("priority",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 30, 60)
+)
+
+webhook_events = _metric(
+    Counter,
+    "whatsapp_webhook_events",
+    "Webhook events received",
+    ("event_type",)
+)
+
+webhook_processing_seconds = _metric(
+    Histogram,
+    "whatsapp_webhook_processing_seconds",
+    "Webhook processing time",
+    ("event_type",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+mongo_operation_seconds = _metric(
+    Histogram,
+    "whatsapp_mongo_operation_seconds",
+    "Model method latency (MongoDB operations)",
+    ("model", "method", "status"),
+    buckets=MONGO_BUCKETS
+)
+
+
+def timed_model(cls=None, *, exclude=()):
+    """
+    Class decorator: model'in public staticmethod'larının süresini ölç
+
+    get_collection gibi yardımcılar ve exclude'daki (DB'ye gitmeyen) metodlar atlanır.
+    """
+    def decorate(cls):
+        if not METRICS_ENABLED:
+            return cls
+
+        for name, attr in list(vars(cls).items()):
+            if not isinstance(attr, staticmethod):
+                continue
+            if name.startswith("_") or name.endswith("collection") or name in exclude:
+                continue
+            setattr(cls, name, staticmethod(_timed(cls.__name__, name, attr.__func__)))
+        return cls
+
+    return decorate(cls) if cls is not None else decorate
+
+
+def _timed(model: str, method: str, func):
+    # Label child'ları ilk çağrıda oluşturulur (import sırasında metrik dosyası açılmaz)
+    children = {}
+
+    def observe(status: str, elapsed: float):
+        child = children.get(status)
+        if child is None:
+            child = children[status] = mongo_operation_seconds.labels(model, method, status)
+        child.observe(elapsed)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            observe("error", time.perf_counter() - started)
+            raise
+        observe("ok", time.perf_counter() - started)
+        return result
+
+    return wrapper
+
+
+def generate_latest():
+    """
+    /metrics çıktısı (content, content_type)
+    Multiprocess modda tüm worker'ların dosyalarından toplanır.
+    """
+    if not METRICS_ENABLED:
+        return None, None
+
+    if MULTIPROC_DIR:
+        from prometheus_client import CollectorRegistry, multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Ölen worker'ın canlı gauge dosyalarını temizle (gunicorn child_exit)"""
+    if METRICS_ENABLED and MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
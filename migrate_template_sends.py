@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Gönderim geçmişini template_sends ledger'ına taşı
+
+Kaynaklar:
+- contacts.sent_templates dizileri
+- messages koleksiyonundaki başarılı (sent/delivered/read) template gönderimleri
+
+Idempotenttir (upsert + $setOnInsert), tekrar çalıştırılabilir.
+--unset ile taşıma sonrası contacts.sent_templates alanı silinir.
+
+Usage: python migrate_template_sends.py [--unset]
+"""
+
+import argparse
+import logging
+
+from config import load_env_file
+
+load_env_file()
+
+from pymongo import UpdateOne
+from models import ContactModel, MessageModel, TemplateSendModel
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def _flush(operations) -> int:
+    if not operations:
+        return 0
+    result = TemplateSendModel.get_collection().bulk_write(operations, ordered=False)
+    operations.clear()
+    return result.upserted_count
+
+
+def _ledger_upsert(phone: str, template_name: str, sent_at, source: str) -> UpdateOne:
+    return UpdateOne(
+        {"phone": phone, "template_name": template_name},
+        {"$setOnInsert": {"status": "sent", "sent_at": sent_at, "source": source}},
+        upsert=True
+    )
+
+
+def migrate_messages() -> int:
+    """messages → ledger (ilk başarılı gönderim zamanı ile)"""
+    pipeline = [
+        {"$match": {
+            "template_name": {"$nin": [None, ""]},
+            "status": {"$in": ["sent", "delivered", "read"]}
+        }},
+        {"$group": {
+            "_id": {"phone": "$phone", "template_name": "$template_name"},
+            "sent_at": {"$min": "$sent_at"}
+        }}
+    ]
+    inserted = 0
+    operations = []
+    for doc in MessageModel.get_collection().aggregate(pipeline, allowDiskUse=True):
+        operations.append(_ledger_upsert(doc["_id"]["phone"], doc["_id"]["template_name"], doc["sent_at"], "messages"))
+        if len(operations) >= BATCH_SIZE:
+            inserted += _flush(operations)
+    inserted += _flush(operations)
+    return inserted
+
+
+def migrate_contacts() -> int:
+    """contacts.sent_templates → ledger (mesaj kaydı olmayan eski gönderimler)"""
+    cursor = ContactModel.get_collection().find(
+        {"sent_templates.0": {"$exists": True}},
+        {"phone": 1, "sent_templates": 1, "updated_at": 1}
+    )
+    inserted = 0
+    operations = []
+    for contact in cursor:
+        for template_name in contact["sent_templates"]:
+            operations.append(_ledger_upsert(contact["phone"], template_name, contact.get("updated_at"), "contacts"))
+        if len(operations) >= BATCH_SIZE:
+            inserted += _flush(operations)
+    inserted += _flush(operations)
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="sent_templates → template_sends taşıma")
+    parser.add_argument("--unset", action="store_true", help="Taşımadan sonra contacts.sent_templates alanını sil")
+    args = parser.parse_args()
+
+    logger.info("=" * 60)
+    logger.info("📒 Template Gönderim Ledger Migration")
+    logger.info("=" * 60)
+
+    TemplateSendModel.ensure_indexes()
+
+    from_messages = migrate_messages()
+    logger.info(f"✅ messages: {from_messages} kayıt eklendi")
+
+    from_contacts = migrate_contacts()
+    logger.info(f"✅ contacts.sent_templates: {from_contacts} kayıt eklendi")
+
+    if args.unset:
+        result = ContactModel.get_collection().update_many(
+            {"sent_templates": {"$exists": True}},
+            {"$unset": {"sent_templates": ""}}
+        )
+        logger.info(f"🧹 {result.modified_count} kişiden sent_templates alanı silindi")
+
+    logger.info(f"📊 Ledger toplam: {TemplateSendModel.get_collection().estimated_document_count()}")
+    logger.info("=" * 60)
@@ -1,13 +1,157 @@
 """
 MongoDB Collection Models ve Helper Functions
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
 from bson.objectid import ObjectId
 from database import get_database
+import gridfs
+from metrics import timed_model
+from collections import OrderedDict
+import copy
 import hashlib
+import os
+import logging
+import re
+import socket
+import threading
+import time
 
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Process içi LRU + TTL cache (sık okunan, nadiren değişen kayıtlar için)
+
+    - maxsize dolunca en eski kullanılan kayıt atılır (LRU)
+    - ttl saniyeden eski kayıtlar miss sayılır
+    - Değerler kopyalanarak döndürülür, çağıran taraf cache'i bozamaz
+
+    NOT: Her gunicorn worker'ının kendi cache'i vardır. Invalidation sadece
+    yazmayı yapan process'te anında olur, diğer worker'larda TTL ile düşer.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Cache'den oku, yoksa/süresi geçmişse None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key, value):
+        """Cache'e yaz (None değerler cache'lenmez)"""
+        if value is None or self.ttl <= 0 or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Tek bir kaydı cache'den çıkar (write-through invalidation)"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Tüm cache'i temizle"""
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss metrikleri"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total * 100, 1) if total > 0 else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+def _cache_from_env(name: str, default_maxsize: int, default_ttl: float) -> TTLCache:
+    """Cache ayarlarını environment'tan oku (örn. CACHE_CONTACTS_TTL=0 ile kapatılır)"""
+    prefix = f"CACHE_{name.upper()}"
+    return TTLCache(
+        name,
+        maxsize=int(os.environ.get(f"{prefix}_MAXSIZE", default_maxsize)),
+        ttl=float(os.environ.get(f"{prefix}_TTL", default_ttl))
+    )
+
+
+_contact_cache = _cache_from_env("contacts", default_maxsize=10000, default_ttl=300)
+_product_cache = _cache_from_env("products", default_maxsize=1000, default_ttl=600)
+_template_settings_cache = _cache_from_env("template_settings", default_maxsize=500, default_ttl=600)
+_admin_cache = _cache_from_env("admins", default_maxsize=50, default_ttl=60)
+_settings_cache = _cache_from_env("settings", default_maxsize=100, default_ttl=30)
+
+
+def get_cache_stats() -> List[Dict]:
+    """Tüm model cache'lerinin hit/miss istatistikleri"""
+    return [cache.stats() for cache in (_contact_cache, _product_cache, _template_settings_cache, _admin_cache, _settings_cache)]
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Template gönderim claim'inin süresi; bu süre içinde commit/release edilmeyen
+# claim'ler (çöken worker) recover_expired_leases ile çözülür
+SEND_LEASE_SECONDS = int(os.environ.get("SEND_LEASE_SECONDS", 120))
+
+# Segment kitle sayısı bu süre (saniye) boyunca segment dokümanından okunur
+SEGMENT_COUNT_TTL = int(os.environ.get("SEGMENT_COUNT_TTL", 600))
+
+# Kişi okumalarında taşınmayan eski alanlar (gönderim geçmişi template_sends'te)
+_CONTACT_PROJECTION = {"sent_templates": 0}
+
+
+def ensure_indexes():
+    """Model index'lerini oluştur (idempotent)"""
+    ChatModel.ensure_indexes()
+    TemplateSendModel.ensure_indexes()
+    BulkJobModel.ensure_indexes()
+    SendBudgetModel.ensure_indexes()
+    CampaignModel.ensure_indexes()
+    MediaAssetModel.ensure_indexes()
+    ProfileTraceModel.ensure_indexes()
+
+
+@timed_model
 class ContactModel:
     """Kişi Yönetimi"""
     
@@ -23,7 +167,6 @@ class ContactModel:
             "name": name,
             "country": country,
             "tags": tags or [],
-            "sent_templates": [],  # Gönderilen template'ler
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "is_active": True,
@@ -32,14 +175,20 @@ class ContactModel:
         
         result = ContactModel.get_collection().insert_one(contact)
         contact['_id'] = str(result.inserted_id)
+        _contact_cache.invalidate(phone)
         return contact
     
     @staticmethod
     def get_contact(phone: str) -> Optional[Dict]:
-        """Telefon numarasına göre kişi getir"""
-        contact = ContactModel.get_collection().find_one({"phone": phone})
+        """Telefon numarasına göre kişi getir (cache'li)"""
+        contact = _contact_cache.get(phone)
+        if contact is not None:
+            return contact
+        
+        contact = ContactModel.get_collection().find_one({"phone": phone}, _CONTACT_PROJECTION)
         if contact:
             contact['_id'] = str(contact['_id'])
+            _contact_cache.set(phone, contact)
         return contact
     
     @staticmethod
@@ -49,11 +198,52 @@ class ContactModel:
         if tags:
             query["tags"] = {"$in": tags}
         
-        contacts = list(ContactModel.get_collection().find(query))
+        contacts = list(ContactModel.get_collection().find(query, _CONTACT_PROJECTION))
         for contact in contacts:
             contact['_id'] = str(contact['_id'])
         return contacts
     
+    @staticmethod
+    def get_contacts_page(page: int = 1, limit: int = 20, search: str = "", is_active: bool = True) -> Dict:
+        """
+        Kişileri sayfa sayfa getir (_id sırasıyla, isim / numara araması ile)
+        
+        Returns: {contacts: [], total: int, page: int, limit: int, total_pages: int, has_next: bool}
+        """
+        page = max(page, 1)
+        limit = max(limit, 1)
+        query = {"is_active": is_active}
+        if search:
+            pattern = {"$regex": re.escape(search), "$options": "i"}
+            query["$or"] = [{"name": pattern}, {"phone": pattern}]
+        
+        collection = ContactModel.get_collection()
+        total = collection.count_documents(query)
+        contacts = list(
+            collection.find(query, _CONTACT_PROJECTION).sort("_id", 1).skip((page - 1) * limit).limit(limit)
+        )
+        for contact in contacts:
+            contact['_id'] = str(contact['_id'])
+        
+        total_pages = (total + limit - 1) // limit
+        return {
+            "contacts": contacts,
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "total_pages": total_pages,
+            "has_next": page < total_pages
+        }
+    
+    @staticmethod
+    def get_stats() -> Dict:
+        """Kişiler sayfası özet sayıları: {total (aktif), tagged}"""
+        collection = ContactModel.get_collection()
+        return {
+            "total": collection.count_documents({"is_active": True}),
+            "tagged": collection.count_documents({"is_active": True, "tags.0": {"$exists": True}})
+        }
+    
     @staticmethod
     def update_contact(phone: str, updates: Dict) -> bool:
         """Kişi güncelle"""
@@ -62,6 +252,7 @@ class ContactModel:
             {"phone": phone},
             {"$set": updates}
         )
+        _contact_cache.invalidate(phone)
         return result.modified_count > 0
     
     @staticmethod
@@ -77,66 +268,42 @@ class ContactModel:
             contact['updated_at'] = datetime.utcnow()
             contact['is_active'] = contact.get('is_active', True)
             contact['tags'] = contact.get('tags', [])
-            contact['sent_templates'] = contact.get('sent_templates', [])
             contact['metadata'] = contact.get('metadata', {})
         
         result = ContactModel.get_collection().insert_many(contacts)
+        for contact in contacts:
+            _contact_cache.invalidate(contact.get('phone'))
         return len(result.inserted_ids)
     
     @staticmethod
     def add_sent_template(phone: str, template_name: str) -> bool:
-        """Kişiye gönderilen template'i ekle"""
-        result = ContactModel.get_collection().update_one(
-            {"phone": phone},
-            {
-                "$addToSet": {"sent_templates": template_name},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-        return result.modified_count > 0
+        """Kişiye gönderilen template'i kaydet (template_sends ledger'ı)"""
+        return TemplateSendModel.record_sent(phone, template_name)
     
     @staticmethod
     def has_received_template(phone: str, template_name: str) -> bool:
         """Kişi bu template'i daha önce aldı mı?"""
-        contact = ContactModel.get_collection().find_one(
-            {"phone": phone, "sent_templates": template_name}
-        )
-        return contact is not None
+        return TemplateSendModel.has_received(phone, template_name)
     
     @staticmethod
     def get_contacts_without_template(template_name: str, tags: List[str] = None) -> List[Dict]:
+        """Belirli template'i almamış aktif kişileri getir (template_sends ledger'ına göre)"""
+        return list(ContactModel.iter_contacts_without_template(template_name, tags=tags))
+    
+    @staticmethod
+    def iter_contacts_without_template(template_name: str, tags: List[str] = None,
+                                       after_id: str = None, page_size: int = 500,
+                                       phones: List[str] = None):
         """
-        Belirli template'i almamış kişileri getir
-        Hem sent_templates hem de MessageModel'de kontrol eder
+        Template'i almamış aktif kişileri _id sırasıyla sayfa sayfa akıt
+        phones verilirse sadece bu numaralar (eski kampanya hedef listeleri).
         """
-        query = {
-            "is_active": True,
-            "sent_templates": {"$ne": template_name}
-        }
-        if tags:
-            query["tags"] = {"$in": tags}
-        
-        # sent_templates'de olmayan kişileri getir
-        contacts = list(ContactModel.get_collection().find(query))
-        
-        # MessageModel'de başarılı gönderim yapılmış telefonları al
-        messages_collection = get_database()['messages']
-        messages_sent_phones = messages_collection.distinct("phone", {
-            "template_name": template_name,
-            "status": {"$in": ["sent", "delivered", "read"]}
-        })
-        messages_sent_set = set(messages_sent_phones)
-        
-        # MessageModel'de de olmayan kişileri filtrele
-        eligible_contacts = []
-        for contact in contacts:
-            if contact['phone'] not in messages_sent_set:
-                contact['_id'] = str(contact['_id'])
-                eligible_contacts.append(contact)
-        
-        return eligible_contacts
+        filters = {"tags": tags or [], "phones": phones or []}
+        return SegmentModel.iter_contacts(filters, exclude_template=template_name,
+                                          after_id=after_id, page_size=page_size)
 
 
+@timed_model
 class TemplateSettingsModel:
     """Template ayarları (image ID, vb.)"""
     
@@ -146,10 +313,15 @@ class TemplateSettingsModel:
     
     @staticmethod
     def get_template_settings(template_name: str) -> Optional[Dict]:
-        """Template ayarlarını getir"""
+        """Template ayarlarını getir (cache'li)"""
+        settings = _template_settings_cache.get(template_name)
+        if settings is not None:
+            return settings
+        
         settings = TemplateSettingsModel.get_collection().find_one({"template_name": template_name})
         if settings:
             settings['_id'] = str(settings['_id'])
+            _template_settings_cache.set(template_name, settings)
         return settings
     
     @staticmethod
@@ -166,6 +338,7 @@ class TemplateSettingsModel:
             },
             upsert=True
         )
+        _template_settings_cache.invalidate(template_name)
         return result.modified_count > 0 or result.upserted_id is not None
     
     @staticmethod
@@ -173,8 +346,146 @@ class TemplateSettingsModel:
         """Template için kaydedilmiş image ID'yi getir"""
         settings = TemplateSettingsModel.get_template_settings(template_name)
         return settings.get("header_image_id") if settings else None
+    
+    @staticmethod
+    def replace_header_image_id(old_id: str, new_id: str) -> int:
+        """Eski media ID'yi kullanan tüm template'leri yeni ID'ye geçir (media yenileme)"""
+        collection = TemplateSettingsModel.get_collection()
+        names = [doc["template_name"] for doc in collection.find({"header_image_id": old_id}, {"template_name": 1})]
+        if not names:
+            return 0
+        collection.update_many(
+            {"header_image_id": old_id},
+            {"$set": {"header_image_id": new_id, "updated_at": datetime.utcnow()}}
+        )
+        for name in names:
+            _template_settings_cache.invalidate(name)
+        return len(names)
 
 
+@timed_model
+class MediaAssetModel:
+    """
+    Graph API'ye yüklenmiş medya (içerik hash'i → media ID)
+    
+    Aynı içerik (sha256) aynı numaraya bir kez yüklenir; media ID'nin geçerlilik
+    süresi (expires_at) dolmadan dosya yeniden yüklenir (media.py).
+    Dosyanın kendisi GridFS'te (media_files) sha256 ile bir kez saklanır; böylece
+    web ve scheduler process'leri aynı içeriğe erişir.
+    """
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['media_assets']
+    
+    @staticmethod
+    def get_files() -> gridfs.GridFS:
+        return gridfs.GridFS(get_database(), collection="media_files")
+    
+    @staticmethod
+    def ensure_indexes():
+        collection = MediaAssetModel.get_collection()
+        collection.create_index(
+            [("sha256", 1), ("phone_number_id", 1)],
+            unique=True,
+            name="sha256_phone_number_unique"
+        )
+        collection.create_index("expires_at", name="expires_at")
+        collection.create_index("media_id", name="media_id")
+        get_database()["media_files.files"].create_index([("sha256", 1), ("uploadDate", 1)], name="sha256")
+    
+    @staticmethod
+    def find_file(sha256: str):
+        """İçeriğin GridFS'teki (ilk yüklenen) dosyası; yoksa None"""
+        doc = get_database()["media_files.files"].find_one(
+            {"sha256": sha256}, {"_id": 1}, sort=[("uploadDate", 1)]
+        )
+        return doc["_id"] if doc else None
+    
+    @staticmethod
+    def get_asset(sha256: str, phone_number_id: str) -> Optional[Dict]:
+        return MediaAssetModel.get_collection().find_one({"sha256": sha256, "phone_number_id": phone_number_id})
+    
+    @staticmethod
+    def get_by_media_id(media_id: str) -> Optional[Dict]:
+        return MediaAssetModel.get_collection().find_one({"media_id": media_id})
+    
+    @staticmethod
+    def save_asset(sha256: str, phone_number_id: str, media_id: str, expires_at: datetime,
+                   file_id, filename: str = None, content_type: str = None, size: int = None) -> Dict:
+        """Yüklemeyi kaydet (aynı içerik tekrar yüklendiyse media ID güncellenir)"""
+        now = datetime.utcnow()
+        return MediaAssetModel.get_collection().find_one_and_update(
+            {"sha256": sha256, "phone_number_id": phone_number_id},
+            {
+                "$set": {
+                    "media_id": media_id,
+                    "expires_at": expires_at,
+                    "uploaded_at": now,
+                    "file_id": file_id,
+                    "content_type": content_type,
+                    "size": size,
+                    "refresh_error": None,
+                    "refresh_failed_at": None
+                },
+                "$setOnInsert": {"filename": filename, "created_at": now},
+                "$inc": {"upload_count": 1}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def get_expiring(before: datetime, retry_after: timedelta = timedelta(hours=1), limit: int = 50) -> List[Dict]:
+        """Media ID'si before'dan önce dolacak kayıtlar (en yakın önce; son yenilemesi hata verenler retry_after sonra)"""
+        return list(MediaAssetModel.get_collection()
+                    .find({
+                        "expires_at": {"$lt": before},
+                        "$or": [
+                            {"refresh_failed_at": None},
+                            {"refresh_failed_at": {"$lt": datetime.utcnow() - retry_after}}
+                        ]
+                    })
+                    .sort("expires_at", 1)
+                    .limit(limit))
+    
+    @staticmethod
+    def mark_refresh_error(asset_id, error: str) -> None:
+        MediaAssetModel.get_collection().update_one(
+            {"_id": asset_id},
+            {"$set": {"refresh_error": error, "refresh_failed_at": datetime.utcnow()}}
+        )
+
+
+@timed_model
+class TemplateCatalogModel:
+    """Meta template kataloğunun yerel kopyası (worker'lar arası paylaşılır)"""
+
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['template_catalog']
+
+    @staticmethod
+    def get_catalog(business_id: str) -> Optional[Dict]:
+        """Kaydedilmiş kataloğu getir"""
+        return TemplateCatalogModel.get_collection().find_one({"_id": business_id})
+
+    @staticmethod
+    def save_catalog(business_id: str, templates: List[Dict], pages: List[Dict], version: str) -> None:
+        """Kataloğu kaydet (sayfa ETag'leri ile birlikte)"""
+        TemplateCatalogModel.get_collection().update_one(
+            {"_id": business_id},
+            {"$set": {
+                "templates": templates,
+                "pages": pages,
+                "version": version,
+                "fetched_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+
+@timed_model
 class MessageModel:
     """Mesaj Gönderim Takibi"""
     
@@ -190,17 +501,45 @@ class MessageModel:
         content: str = "",
         media_url: str = None,
         status: str = "pending",
-        error_message: str = None
+        error_message: str = None,
+        message_id: str = None
     ) -> Dict:
         """Yeni mesaj kaydı oluştur"""
-        message = {
+        message = MessageModel._new_message(
+            phone, template_name, message_type, content, media_url, status, error_message, message_id
+        )
+        result = MessageModel.get_collection().insert_one(message)
+        message['_id'] = str(result.inserted_id)
+        return message
+    
+    @staticmethod
+    def create_messages(messages: List[Dict]) -> int:
+        """Toplu mesaj kaydı (her eleman create_message argümanları); eklenen sayı"""
+        if not messages:
+            return 0
+        documents = [MessageModel._new_message(**message) for message in messages]
+        result = MessageModel.get_collection().insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    
+    @staticmethod
+    def _new_message(
+        phone: str,
+        template_name: str,
+        message_type: str = "template",
+        content: str = "",
+        media_url: str = None,
+        status: str = "pending",
+        error_message: str = None,
+        message_id: str = None
+    ) -> Dict:
+        return {
             "phone": phone,
             "template_name": template_name,
             "message_type": message_type,
             "content": content,
             "media_url": media_url,
             "status": status,
-            "message_id": None,  # WhatsApp'tan gelecek
+            "message_id": message_id,  # WhatsApp yanıtındaki wamid
             "sent_at": datetime.utcnow(),
             "delivered_at": None,
             "read_at": None,
@@ -208,10 +547,6 @@ class MessageModel:
             "error_message": error_message,
             "metadata": {}
         }
-        
-        result = MessageModel.get_collection().insert_one(message)
-        message['_id'] = str(result.inserted_id)
-        return message
     
     @staticmethod
     def update_status(message_id: str, status: str, error: str = None):
@@ -277,46 +612,814 @@ class MessageModel:
         }
 
 
+@timed_model
+class TemplateSendModel:
+    """
+    Template gönderim ledger'ı: (phone, template_name) başına tek kayıt
+    
+    Gönderim akışı (exactly-once):
+    1. claim   → status "in_flight" + lease_expires_at (unique index ile atomik)
+    2. mark_attempted → Graph API çağrısından hemen önce attempted_at yazılır
+    3. API sonucu:
+       - başarılı          → commit (status "sent", message_id)
+       - API hata döndü    → release (kayıt silinir, tekrar denenebilir)
+       - timeout/belirsiz  → commit(confirmed=False) (tekrar gönderilmez)
+    4. Çöken worker'ın süresi dolmuş lease'leri recover_expired_leases ile çözülür:
+       - claim'den sonra başarılı messages kaydı var → commit
+       - attempted_at yazılmamış (API'ye hiç gidilmedi) → release
+       - aksi halde (API çağrıldı ya da marker'sız eski claim) → "sent",
+         confirmed=False, needs_review=True; tekrar gönderilmez, elle kontrol edilir
+    
+    commit / release False döndürürse claim artık bu çağıranın değildir (lease
+    dolup recovery çözmüş): gönderilmiş mesaj için kayıt record_sent ile geri
+    yazılır, lease süresi claim(lease_seconds=...) ile çağıran tarafından verilir.
+    
+    status alanı olmayan (eski/migration) kayıtlar gönderilmiş sayılır.
+    """
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['template_sends']
+    
+    @staticmethod
+    def ensure_indexes():
+        """Dedup için unique (phone, template_name) + template bazlı listeleme + lease taraması"""
+        collection = TemplateSendModel.get_collection()
+        collection.create_index(
+            [("phone", 1), ("template_name", 1)],
+            unique=True,
+            name="phone_template_unique"
+        )
+        collection.create_index([("template_name", 1), ("phone", 1)], name="template_phone")
+        collection.create_index(
+            [("lease_expires_at", 1)],
+            name="in_flight_lease",
+            partialFilterExpression={"status": "in_flight"}
+        )
+    
+    @staticmethod
+    def claim(phone: str, template_name: str, source: str = "send", lease_seconds: int = None) -> bool:
+        """
+        Gönderimden önce (phone, template_name) kaydını lease ile al
+        
+        Returns: True → bu çağrı kaydı oluşturdu, gönderilebilir
+                 False → daha önce gönderilmiş / başka worker gönderiyor
+        """
+        now = datetime.utcnow()
+        lease = SEND_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        try:
+            result = TemplateSendModel.get_collection().update_one(
+                {"phone": phone, "template_name": template_name},
+                {"$setOnInsert": {
+                    "status": "in_flight",
+                    "claimed_at": now,
+                    "attempted_at": None,
+                    "lease_expires_at": now + timedelta(seconds=lease),
+                    "claimed_by": f"{socket.gethostname()}:{os.getpid()}",
+                    "source": source
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Aynı anda upsert eden diğer worker kazandı
+            return False
+        return result.upserted_id is not None
+    
+    @staticmethod
+    def mark_attempted(phone: str, template_name: str) -> bool:
+        """Graph API çağrısından önce: bu claim için gönderim denendi (recovery marker'ı)"""
+        result = TemplateSendModel.get_collection().update_one(
+            {"phone": phone, "template_name": template_name, "status": "in_flight"},
+            {"$set": {"attempted_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+    
+    @staticmethod
+    def commit(phone: str, template_name: str, message_id: str = None, confirmed: bool = True) -> bool:
+        """In-flight claim'i gönderildi olarak işaretle (claim kaybolduysa False)"""
+        result = TemplateSendModel.get_collection().update_one(
+            {"phone": phone, "template_name": template_name, "status": "in_flight"},
+            {
+                "$set": {
+                    "status": "sent",
+                    "sent_at": datetime.utcnow(),
+                    "message_id": message_id,
+                    "confirmed": confirmed
+                },
+                "$unset": {"lease_expires_at": ""}
+            }
+        )
+        return result.modified_count > 0
+    
+    @staticmethod
+    def release(phone: str, template_name: str) -> bool:
+        """Başarısız gönderimin claim'ini geri al (gönderilmiş kayıtlar silinmez; claim yoksa False)"""
+        result = TemplateSendModel.get_collection().delete_one(
+            {"phone": phone, "template_name": template_name, "status": "in_flight"}
+        )
+        return result.deleted_count > 0
+    
+    @staticmethod
+    def record_sent(phone: str, template_name: str, source: str = "manual") -> bool:
+        """Claim'siz doğrudan gönderildi kaydı (import / geçmiş senkronizasyonu)"""
+        try:
+            result = TemplateSendModel.get_collection().update_one(
+                {"phone": phone, "template_name": template_name},
+                {"$setOnInsert": {"status": "sent", "sent_at": datetime.utcnow(), "source": source}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return result.upserted_id is not None
+    
+    @staticmethod
+    def recover_expired_leases(limit: int = 1000) -> Dict:
+        """
+        Süresi dolmuş in-flight claim'leri çöz
+        
+        messages'ta claim'den sonra başarılı gönderim varsa commit; API'ye hiç
+        gidilmediyse (attempted_at None) release; gidilip gidilmediği bilinmiyorsa
+        gönderilmiş sayılır ve needs_review ile işaretlenir (mesaj kaydı gönderimden
+        sonra yazıldığı için çökme anında henüz olmayabilir).
+        Eşzamanlı çalışan recovery'ler lease_expires_at eşitliği ile ayrışır.
+        """
+        collection = TemplateSendModel.get_collection()
+        expired = list(collection.find(
+            {"status": "in_flight", "lease_expires_at": {"$lt": datetime.utcnow()}},
+            {"phone": 1, "template_name": 1, "claimed_at": 1, "lease_expires_at": 1, "attempted_at": 1}
+        ).limit(limit))
+        
+        committed = released = review = 0
+        for lease in expired:
+            guard = {"_id": lease["_id"], "status": "in_flight", "lease_expires_at": lease["lease_expires_at"]}
+            message = MessageModel.get_collection().find_one(
+                {
+                    "phone": lease["phone"],
+                    "template_name": lease["template_name"],
+                    "status": {"$in": ["sent", "delivered", "read"]},
+                    "sent_at": {"$gte": lease["claimed_at"]}
+                },
+                {"message_id": 1}
+            )
+            if message:
+                result = collection.update_one(guard, {
+                    "$set": {
+                        "status": "sent",
+                        "sent_at": datetime.utcnow(),
+                        "message_id": message.get("message_id"),
+                        "confirmed": True,
+                        "recovered": True
+                    },
+                    "$unset": {"lease_expires_at": ""}
+                })
+                committed += result.modified_count
+            elif "attempted_at" in lease and lease["attempted_at"] is None:
+                # Claim alındı ama API çağrılmadan worker öldü
+                released += collection.delete_one(guard).deleted_count
+            else:
+                result = collection.update_one(guard, {
+                    "$set": {
+                        "status": "sent",
+                        "sent_at": datetime.utcnow(),
+                        "confirmed": False,
+                        "needs_review": True,
+                        "recovered": True
+                    },
+                    "$unset": {"lease_expires_at": ""}
+                })
+                review += result.modified_count
+        
+        if committed or released or review:
+            logger.warning(f"♻️ Expired send leases recovered: {committed} committed, {released} released, {review} need review")
+        return {"committed": committed, "released": released, "needs_review": review}
+    
+    @staticmethod
+    def has_received(phone: str, template_name: str) -> bool:
+        return TemplateSendModel.get_collection().find_one(
+            {"phone": phone, "template_name": template_name},
+            {"_id": 1}
+        ) is not None
+    
+    @staticmethod
+    def get_phones(template_name: str) -> set:
+        """Bu template'i almış telefonlar (template_phone index'inden okunur)"""
+        cursor = TemplateSendModel.get_collection().find(
+            {"template_name": template_name},
+            {"_id": 0, "phone": 1}
+        )
+        return {doc["phone"] for doc in cursor}
+    
+    @staticmethod
+    def get_sends(template_name: str) -> Dict[str, Dict]:
+        """phone → ledger kaydı (template durum ekranı için)"""
+        cursor = TemplateSendModel.get_collection().find(
+            {"template_name": template_name},
+            {"_id": 0, "phone": 1, "status": 1, "sent_at": 1, "source": 1}
+        )
+        return {doc["phone"]: doc for doc in cursor}
+    
+    @staticmethod
+    def get_templates_for_phone(phone: str) -> List[str]:
+        cursor = TemplateSendModel.get_collection().find(
+            {"phone": phone},
+            {"_id": 0, "template_name": 1}
+        ).sort("sent_at", 1)
+        return [doc["template_name"] for doc in cursor]
+    
+    @staticmethod
+    def get_templates_for_phones(phones: List[str]) -> Dict[str, List[str]]:
+        """Birden çok kişi için phone → template listesi (tek sorgu)"""
+        templates = {}
+        if not phones:
+            return templates
+        cursor = TemplateSendModel.get_collection().find(
+            {"phone": {"$in": phones}},
+            {"_id": 0, "phone": 1, "template_name": 1}
+        )
+        for doc in cursor:
+            templates.setdefault(doc["phone"], []).append(doc["template_name"])
+        return templates
+    
+    @staticmethod
+    def count(template_name: str) -> int:
+        return TemplateSendModel.get_collection().count_documents({"template_name": template_name})
+
+
+@timed_model
+class BulkJobModel:
+    """
+    Toplu gönderim işleri (checkpoint + heartbeat lease)
+    
+    Çalışan işin sahibi (owner) her checkpoint'te lease_expires_at'i uzatır.
+    Worker ölürse lease dolar ve iş last_contact_id'den devam ettirilebilir.
+    """
+    
+    RESUMABLE_STATUSES = ["running", "failed"]
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['bulk_jobs']
+    
+    @staticmethod
+    def ensure_indexes():
+        collection = BulkJobModel.get_collection()
+        collection.create_index([("created_at", -1)], name="created_at")
+        collection.create_index([("status", 1), ("lease_expires_at", 1)], name="status_lease")
+    
+    @staticmethod
+    def _serialize(job: Optional[Dict]) -> Optional[Dict]:
+        if job:
+            job['_id'] = str(job['_id'])
+        return job
+    
+    @staticmethod
+    def create_job(template_name: str, params: Dict, owner: str, lease_seconds: int, estimated_total: int = 0) -> Dict:
+        """Yeni işi oluştur (oluşturan process sahibi olarak başlar)"""
+        now = datetime.utcnow()
+        job = {
+            "template_name": template_name,
+            "params": params,
+            "status": "running",
+            "owner": owner,
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "heartbeat_at": now,
+            "last_contact_id": None,
+            "counters": {"attempted": 0, "success": 0, "failed": 0, "skipped": 0},
+            "estimated_total": estimated_total,
+            "resume_count": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None
+        }
+        result = BulkJobModel.get_collection().insert_one(job)
+        job['_id'] = str(result.inserted_id)
+        return job
+    
+    @staticmethod
+    def get_job(job_id: str) -> Optional[Dict]:
+        try:
+            object_id = ObjectId(job_id)
+        except Exception:
+            return None
+        return BulkJobModel._serialize(BulkJobModel.get_collection().find_one({"_id": object_id}))
+    
+    @staticmethod
+    def get_jobs(limit: int = 20, status: str = None) -> List[Dict]:
+        query = {"status": status} if status else {}
+        jobs = BulkJobModel.get_collection().find(query).sort("created_at", -1).limit(limit)
+        return [BulkJobModel._serialize(job) for job in jobs]
+    
+    @staticmethod
+    def get_orphaned(limit: int = 10) -> List[str]:
+        """Lease'i dolmuş running, kampanyaya bağlı olmayan işler (kampanya işleri kampanya üzerinden devralınır)"""
+        cursor = BulkJobModel.get_collection().find(
+            {
+                "status": "running",
+                "lease_expires_at": {"$lt": datetime.utcnow()},
+                "params.campaign_id": None
+            },
+            {"_id": 1}
+        ).sort("lease_expires_at", 1).limit(limit)
+        return [str(job["_id"]) for job in cursor]
+    
+    @staticmethod
+    def acquire(job_id: str, owner: str, lease_seconds: int) -> Optional[Dict]:
+        """
+        Lease'i dolmuş (sahibi ölmüş) veya hata ile durmuş işi devral
+        
+        Returns: devralınan iş, iş başka bir process'te canlıysa / bitmişse None
+        """
+        now = datetime.utcnow()
+        job = BulkJobModel.get_collection().find_one_and_update(
+            {
+                "_id": ObjectId(job_id),
+                "status": {"$in": BulkJobModel.RESUMABLE_STATUSES},
+                "$or": [{"status": "failed"}, {"lease_expires_at": {"$lt": now}}]
+            },
+            {
+                "$set": {
+                    "status": "running",
+                    "owner": owner,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "heartbeat_at": now,
+                    "error": None,
+                    "updated_at": now
+                },
+                "$inc": {"resume_count": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        return BulkJobModel._serialize(job)
+    
+    @staticmethod
+    def checkpoint(job_id: str, owner: str, last_contact_id: str, counters: Dict, lease_seconds: int) -> bool:
+        """
+        İlerlemeyi kaydet ve lease'i uzat
+        
+        Returns: False → iş artık bu process'e ait değil (başkası devraldı), durulmalı
+        """
+        now = datetime.utcnow()
+        result = BulkJobModel.get_collection().update_one(
+            {"_id": ObjectId(job_id), "owner": owner, "status": "running"},
+            {"$set": {
+                "last_contact_id": last_contact_id,
+                "counters": counters,
+                "heartbeat_at": now,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "updated_at": now
+            }}
+        )
+        return result.matched_count > 0
+    
+    @staticmethod
+    def heartbeat(job_id: str, owner: str, lease_seconds: int) -> bool:
+        """
+        Sadece lease'i uzat (checkpoint'ler arasında, zaman bazlı)
+        
+        Returns: False → iş artık bu process'e ait değil, durulmalı
+        """
+        now = datetime.utcnow()
+        result = BulkJobModel.get_collection().update_one(
+            {"_id": ObjectId(job_id), "owner": owner, "status": "running"},
+            {"$set": {
+                "heartbeat_at": now,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds)
+            }}
+        )
+        return result.matched_count > 0
+    
+    @staticmethod
+    def finish(job_id: str, owner: str, status: str, last_contact_id: str, counters: Dict, error: str = None) -> bool:
+        """İşi completed / failed olarak kapat"""
+        now = datetime.utcnow()
+        result = BulkJobModel.get_collection().update_one(
+            {"_id": ObjectId(job_id), "owner": owner},
+            {"$set": {
+                "status": status,
+                "last_contact_id": last_contact_id,
+                "counters": counters,
+                "error": error,
+                "lease_expires_at": None,
+                "updated_at": now,
+                "finished_at": now
+            }}
+        )
+        return result.matched_count > 0
+
+
+@timed_model
+class SendBudgetModel:
+    """
+    Gönderici numara başına, tüm process'lerin paylaştığı gönderim bütçesi
+    
+    Her (numara, pencere) için tek doküman; count pencere içindeki gönderim sayısı.
+    Eski pencereler TTL index ile silinir.
+    """
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['send_budget']
+    
+    @staticmethod
+    def ensure_indexes():
+        SendBudgetModel.get_collection().create_index("expires_at", expireAfterSeconds=0, name="expires_at_ttl")
+    
+    @staticmethod
+    def take(sender_id: str, window: int, limit: int) -> bool:
+        """Pencerede limit dolmadıysa bir hak al (atomik)"""
+        try:
+            SendBudgetModel.get_collection().update_one(
+                {"_id": f"{sender_id}:{window}", "count": {"$lt": limit}},
+                {
+                    "$inc": {"count": 1},
+                    "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(minutes=5)}
+                },
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # Pencere dolu (filtre eşleşmedi, upsert mevcut _id'ye çarptı)
+            return False
+
+
+@timed_model(exclude=("iter_contacts",))
+class SegmentModel:
+    """
+    Kampanya hedef kitlesi tanımı (telefon listesi yerine sorgu)
+    
+    filters:
+    - tags: [..]                  → kişi bu etiketlerden birine sahip
+    - countries: [..]             → contact.country (büyük/küçük harf duyarsız)
+    - has_sale: true / false      → satış yapılmış / yapılmamış
+    - replied_within_days: N      → son N günde gelen mesajı olan (conversations)
+    - not_received_template: ad   → bu template'i almamış (template_sends)
+    - phones: [..]                → sabit liste (eski kampanyalar)
+    
+    Gönderim anında iter_contacts ile _id sırasıyla sayfa sayfa çözülür;
+    conversations / ledger koşulları her sayfa için tek $in sorgusuyla uygulanır.
+    """
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['segments']
+    
+    @staticmethod
+    def normalize_filters(filters: Dict) -> Dict:
+        """Filtreleri doğrula ve normalize et (hatalıysa ValueError)"""
+        filters = filters or {}
+        normalized = {}
+        
+        for key in ("tags", "countries", "phones"):
+            value = filters.get(key) or []
+            if isinstance(value, str):
+                value = [item.strip() for item in value.split(",")]
+            if not isinstance(value, list):
+                raise ValueError(f"{key} liste olmalı")
+            value = [str(item).strip() for item in value if str(item).strip()]
+            if value:
+                normalized[key] = [item.upper() for item in value] if key == "countries" else value
+        
+        if filters.get("has_sale") is not None:
+            if not isinstance(filters["has_sale"], bool):
+                raise ValueError("has_sale true/false olmalı")
+            normalized["has_sale"] = filters["has_sale"]
+        
+        if filters.get("replied_within_days") not in (None, ""):
+            try:
+                days = int(filters["replied_within_days"])
+            except (TypeError, ValueError):
+                raise ValueError("replied_within_days sayı olmalı")
+            if days <= 0:
+                raise ValueError("replied_within_days pozitif olmalı")
+            normalized["replied_within_days"] = days
+        
+        if filters.get("not_received_template"):
+            normalized["not_received_template"] = str(filters["not_received_template"]).strip()
+        
+        return normalized
+    
+    @staticmethod
+    def build_query(filters: Dict) -> Dict:
+        """contacts üzerinde çalışan kısım (conversations / ledger koşulları hariç)"""
+        query = {"is_active": True}
+        if filters.get("tags"):
+            query["tags"] = {"$in": filters["tags"]}
+        if filters.get("countries"):
+            countries = set()
+            for country in filters["countries"]:
+                countries.update({country, country.lower(), country.capitalize()})
+            query["country"] = {"$in": sorted(countries)}
+        if filters.get("phones"):
+            query["phone"] = {"$in": filters["phones"]}
+        if filters.get("has_sale") is True:
+            query["has_sale"] = True
+        elif filters.get("has_sale") is False:
+            query["has_sale"] = {"$ne": True}
+        return query
+    
+    @staticmethod
+    def iter_contacts(filters: Dict, exclude_template: str = None, after_id: str = None, page_size: int = 500):
+        """
+        Segmentteki aktif kişileri _id sırasıyla sayfa sayfa akıt
+        
+        Her sayfa ayrı bir (_id > son) sorgusudur; uzun süren gönderimlerde
+        sunucu cursor'u zaman aşımına uğramaz ve after_id ile kaldığı yerden devam edilir.
+        exclude_template: gönderilecek template (ledger'da olanlar atlanır).
+        """
+        query = SegmentModel.build_query(filters)
+        excluded_templates = [name for name in (exclude_template, filters.get("not_received_template")) if name]
+        reply_cutoff = None
+        if filters.get("replied_within_days"):
+            reply_cutoff = datetime.utcnow() - timedelta(days=filters["replied_within_days"])
+        
+        last_id = ObjectId(after_id) if after_id else None
+        while True:
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            page = list(ContactModel.get_collection()
+                        .find(query, _CONTACT_PROJECTION)
+                        .sort("_id", 1)
+                        .limit(page_size))
+            if not page:
+                return
+            
+            phones = [contact["phone"] for contact in page]
+            excluded = set()
+            if excluded_templates:
+                excluded.update(doc["phone"] for doc in TemplateSendModel.get_collection().find(
+                    {"phone": {"$in": phones}, "template_name": {"$in": excluded_templates}},
+                    {"_id": 0, "phone": 1}
+                ))
+            replied = None
+            if reply_cutoff is not None:
+                replied = {doc["_id"] for doc in ChatModel.get_conversations_collection().find(
+                    {"_id": {"$in": phones}, "last_incoming_at": {"$gte": reply_cutoff}},
+                    {"_id": 1}
+                )}
+            
+            for contact in page:
+                last_id = contact['_id']
+                phone = contact["phone"]
+                if phone in excluded or (replied is not None and phone not in replied):
+                    continue
+                contact['_id'] = str(last_id)
+                yield contact
+            
+            if len(page) < page_size:
+                return
+    
+    @staticmethod
+    def count_audience(filters: Dict, exclude_template: str = None) -> int:
+        """Kitle sayısı (conversations/ledger koşulu yoksa tek count_documents)"""
+        if not exclude_template and not filters.get("not_received_template") and not filters.get("replied_within_days"):
+            return ContactModel.get_collection().count_documents(SegmentModel.build_query(filters))
+        return sum(1 for _ in SegmentModel.iter_contacts(filters, exclude_template=exclude_template, page_size=2000))
+    
+    @staticmethod
+    def _serialize(segment: Optional[Dict]) -> Optional[Dict]:
+        if segment:
+            segment['_id'] = str(segment['_id'])
+        return segment
+    
+    @staticmethod
+    def create_segment(name: str, filters: Dict) -> Dict:
+        """Segment oluştur (filtreler normalize edilir, kitle sayısı hemen hesaplanır)"""
+        filters = SegmentModel.normalize_filters(filters)
+        now = datetime.utcnow()
+        segment = {
+            "name": name,
+            "filters": filters,
+            "audience_count": SegmentModel.count_audience(filters),
+            "count_updated_at": now,
+            "created_at": now,
+            "updated_at": now
+        }
+        result = SegmentModel.get_collection().insert_one(segment)
+        segment['_id'] = str(result.inserted_id)
+        return segment
+    
+    @staticmethod
+    def get_segment(segment_id: str) -> Optional[Dict]:
+        try:
+            object_id = ObjectId(segment_id)
+        except Exception:
+            return None
+        return SegmentModel._serialize(SegmentModel.get_collection().find_one({"_id": object_id}))
+    
+    @staticmethod
+    def get_segments(limit: int = 100) -> List[Dict]:
+        segments = SegmentModel.get_collection().find().sort("created_at", -1).limit(limit)
+        return [SegmentModel._serialize(segment) for segment in segments]
+    
+    @staticmethod
+    def get_audience_count(segment_id: str, refresh: bool = False) -> Optional[int]:
+        """Cache'li kitle sayısı (SEGMENT_COUNT_TTL'den eskiyse yeniden hesaplanır)"""
+        segment = SegmentModel.get_segment(segment_id)
+        if not segment:
+            return None
+        
+        updated_at = segment.get("count_updated_at")
+        fresh = updated_at and datetime.utcnow() - updated_at < timedelta(seconds=SEGMENT_COUNT_TTL)
+        if fresh and not refresh and segment.get("audience_count") is not None:
+            return segment["audience_count"]
+        
+        count = SegmentModel.count_audience(segment["filters"])
+        SegmentModel.get_collection().update_one(
+            {"_id": ObjectId(segment_id)},
+            {"$set": {"audience_count": count, "count_updated_at": datetime.utcnow()}}
+        )
+        return count
+    
+    @staticmethod
+    def delete_segment(segment_id: str) -> bool:
+        result = SegmentModel.get_collection().delete_one({"_id": ObjectId(segment_id)})
+        return result.deleted_count > 0
+
+
+@timed_model
 class CampaignModel:
-    """Kampanya Yönetimi"""
+    """
+    Kampanya Yönetimi
+    
+    Durumlar: pending → scheduled → running → completed / failed
+    Zamanlanmış kampanyaları scheduler.py (status, scheduled_at) index'i ile
+    bulur, claim_due ile atomik olarak alır ve bulk_engine ile çalıştırır.
+    
+    Hedef kitle segment_id ile SegmentModel'e referans verir; telefon listesi
+    kampanya dokümanında tutulmaz (eski kayıtlardaki target_phones desteklenir).
+    """
     
     @staticmethod
     def get_collection() -> Collection:
         return get_database()['campaigns']
     
+    @staticmethod
+    def ensure_indexes():
+        collection = CampaignModel.get_collection()
+        collection.create_index([("status", 1), ("scheduled_at", 1)], name="status_scheduled_at")
+        collection.create_index([("created_at", -1)], name="created_at")
+    
+    @staticmethod
+    def _serialize(campaign: Optional[Dict]) -> Optional[Dict]:
+        if campaign:
+            campaign['_id'] = str(campaign['_id'])
+        return campaign
+    
     @staticmethod
     def create_campaign(
         name: str,
         template_name: str,
-        target_phones: List[str],
-        scheduled_at: datetime = None
+        segment_id: str,
+        scheduled_at: datetime = None,
+        rate_limit_per_minute: float = 60
     ) -> Dict:
-        """Yeni kampanya oluştur"""
+        """
+        Yeni kampanya oluştur
+        
+        total_count segmentin cache'li kitle sayısıdır (tahmini).
+        scheduled_at verilmezse kampanya hemen çalıştırılmak üzere "scheduled" olur.
+        """
         campaign = {
             "name": name,
             "template_name": template_name,
-            "target_phones": target_phones,
-            "total_count": len(target_phones),
+            "segment_id": segment_id,
+            "rate_limit_per_minute": rate_limit_per_minute,
+            "total_count": SegmentModel.get_audience_count(segment_id) or 0,
             "sent_count": 0,
             "delivered_count": 0,
             "failed_count": 0,
-            "status": "scheduled" if scheduled_at else "pending",
-            "scheduled_at": scheduled_at,
+            "deferred_count": 0,
+            "status": "scheduled",
+            "scheduled_at": scheduled_at or datetime.utcnow(),
             "started_at": None,
             "completed_at": None,
             "created_at": datetime.utcnow(),
-            "is_running": False
+            "is_running": False,
+            "job_id": None,
+            "owner": None,
+            "error": None
         }
         
         result = CampaignModel.get_collection().insert_one(campaign)
         campaign['_id'] = str(result.inserted_id)
         return campaign
     
+    @staticmethod
+    def get_campaign(campaign_id: str) -> Optional[Dict]:
+        try:
+            object_id = ObjectId(campaign_id)
+        except Exception:
+            return None
+        return CampaignModel._serialize(CampaignModel.get_collection().find_one({"_id": object_id}))
+    
+    @staticmethod
+    def get_campaigns(limit: int = 50) -> List[Dict]:
+        campaigns = CampaignModel.get_collection().find(
+            {}, {"target_phones": 0}
+        ).sort("created_at", -1).limit(limit)
+        return [CampaignModel._serialize(campaign) for campaign in campaigns]
+    
+    @staticmethod
+    def claim_due(owner: str, now: datetime = None) -> Optional[Dict]:
+        """Zamanı gelmiş en eski kampanyayı atomik olarak running'e al (yoksa None)"""
+        now = now or datetime.utcnow()
+        campaign = CampaignModel.get_collection().find_one_and_update(
+            {"status": "scheduled", "scheduled_at": {"$lte": now}},
+            {"$set": {
+                "status": "running",
+                "is_running": True,
+                "owner": owner,
+                "started_at": now,
+                "job_id": None,
+                "error": None
+            }},
+            sort=[("scheduled_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        return CampaignModel._serialize(campaign)
+    
+    @staticmethod
+    def count_active_for_segment(segment_id: str) -> int:
+        """Segmenti kullanan, bitmemiş (completed / failed olmayan) kampanya sayısı"""
+        return CampaignModel.get_collection().count_documents({
+            "segment_id": segment_id,
+            "status": {"$nin": ["completed", "failed"]}
+        })
+    
+    @staticmethod
+    def get_running() -> List[Dict]:
+        """Çalışıyor görünen kampanyalar (sahibi ölmüş olabilir, job lease'ine bakılır)"""
+        campaigns = CampaignModel.get_collection().find(
+            {"status": "running", "job_id": {"$ne": None}},
+            {"target_phones": 0}
+        )
+        return [CampaignModel._serialize(campaign) for campaign in campaigns]
+    
+    @staticmethod
+    def requeue_stale(older_than_seconds: int = 600) -> int:
+        """Claim edilip işi hiç oluşturulamamış (process çökmüş) kampanyaları tekrar zamanla"""
+        result = CampaignModel.get_collection().update_many(
+            {
+                "status": "running",
+                "job_id": None,
+                "started_at": {"$lt": datetime.utcnow() - timedelta(seconds=older_than_seconds)}
+            },
+            {"$set": {"status": "scheduled", "is_running": False}}
+        )
+        return result.modified_count
+    
+    @staticmethod
+    def attach_job(campaign_id: str, job_id: str, owner: str):
+        CampaignModel.get_collection().update_one(
+            {"_id": ObjectId(campaign_id)},
+            {"$set": {"job_id": job_id, "owner": owner}}
+        )
+    
+    @staticmethod
+    def record_run(campaign_id: str, results: Dict, status: str, scheduled_at: datetime = None,
+                   error: str = None, job_id: str = None) -> bool:
+        """
+        Bir çalıştırmanın sonucunu işle
+        
+        status "scheduled" ise (sessiz saat nedeniyle ertelenen kişiler) kampanya
+        scheduled_at'te tekrar alınır; gönderilmiş kişiler ledger ile atlanır.
+        job_id verilirse sadece kampanya hâlâ bu işle running ise yazılır (aynı
+        sonucun iki kez sayılmasını önler). Returns: kampanya güncellendi mi
+        """
+        now = datetime.utcnow()
+        updates = {
+            "status": status,
+            "is_running": False,
+            "deferred_count": results.get("deferred", 0),
+            "error": error
+        }
+        if status == "scheduled":
+            updates["scheduled_at"] = scheduled_at or now
+        else:
+            updates["completed_at"] = now
+        
+        query = {"_id": ObjectId(campaign_id)}
+        if job_id:
+            query.update({"status": "running", "job_id": job_id})
+        
+        result = CampaignModel.get_collection().update_one(
+            query,
+            {
+                "$set": updates,
+                "$inc": {
+                    "sent_count": results.get("success", 0),
+                    "failed_count": results.get("failed", 0)
+                }
+            }
+        )
+        return result.modified_count > 0
+    
     @staticmethod
     def update_progress(campaign_id: str, sent: int, delivered: int, failed: int):
         """Kampanya ilerlemesini güncelle"""
         CampaignModel.get_collection().update_one(
-            {"_id": campaign_id},
+            {"_id": ObjectId(campaign_id)},
             {"$set": {
                 "sent_count": sent,
                 "delivered_count": delivered,
@@ -325,6 +1428,7 @@ class CampaignModel:
         )
 
 
+@timed_model
 class WebhookLogModel:
     """Webhook Log Kayıtları"""
     
@@ -361,16 +1465,46 @@ class WebhookLogModel:
         return logs
 
 
+@timed_model(exclude=("encode_cursor", "decode_cursor"))
 class ChatModel:
     """Chat Geçmişi"""
     
+    # get_all_chats filtreleri (konuşma özeti üzerinde)
+    CHAT_FILTERS = {
+        "all": {},
+        "incoming": {"incoming_count": {"$gt": 0}},
+        "unread": {"unread_count": {"$gt": 0}},
+        "replied": {"has_replied": True}
+    }
+    
     @staticmethod
     def get_collection() -> Collection:
         return get_database()['chats']
     
     @staticmethod
-    def save_message(phone: str, direction: str, message_type: str, content: str, media_url: str = None, timestamp: datetime = None):
-        """Chat mesajı kaydet (gelen/giden)"""
+    def get_conversations_collection() -> Collection:
+        """Konuşma başına özet (okuma cursor'u: last_read_at, sayaçlar)"""
+        return get_database()['conversations']
+    
+    @staticmethod
+    def get_stats_collection() -> Collection:
+        """Global chat sayaçları (tek doküman: _id = "global")"""
+        return get_database()['chat_stats']
+    
+    @staticmethod
+    def get_reply_phone_number_id(phone: str) -> Optional[str]:
+        """Kişinin en son yazdığı gönderici numara (webhook metadata.phone_number_id)"""
+        conversation = ChatModel.get_conversations_collection().find_one({"_id": phone}, {"phone_number_id": 1})
+        return (conversation or {}).get("phone_number_id")
+    
+    @staticmethod
+    def save_message(phone: str, direction: str, message_type: str, content: str, media_url: str = None,
+                     timestamp: datetime = None, phone_number_id: str = None):
+        """
+        Chat mesajı kaydet (gelen/giden)
+        
+        phone_number_id: gelen mesajı alan numara; konuşmaya yazılır, cevaplar bu numaradan gider
+        """
         message = {
             "phone": phone,
             "direction": direction,  # "incoming" veya "outgoing"
@@ -382,96 +1516,260 @@ class ChatModel:
         }
         
         result = ChatModel.get_collection().insert_one(message)
+        ChatModel._record_message(phone, direction, message_type, content, message["timestamp"], phone_number_id)
+        
         return result.inserted_id
     
     @staticmethod
-    def get_chat_history(phone: str, limit: int = 100) -> List[Dict]:
-        """Bir numarayla olan chat geçmişini getir"""
+    def save_messages(messages: List[Dict]) -> int:
+        """
+        Toplu chat kaydı (her eleman save_message argümanları); eklenen sayı
+        
+        Mesajlar tek insert_many ile yazılır; konuşma özetleri mesaj başına atomik güncellenir.
+        """
+        if not messages:
+            return 0
+        now = datetime.utcnow()
+        documents = [{
+            "phone": message["phone"],
+            "direction": message["direction"],
+            "message_type": message["message_type"],
+            "content": message["content"],
+            "media_url": message.get("media_url"),
+            "is_read": message["direction"] == "outgoing",
+            "timestamp": message.get("timestamp") or now
+        } for message in messages]
+        
+        result = ChatModel.get_collection().insert_many(documents, ordered=False)
+        for document in documents:
+            ChatModel._record_message(
+                document["phone"], document["direction"], document["message_type"],
+                document["content"], document["timestamp"]
+            )
+        return len(result.inserted_ids)
+    
+    @staticmethod
+    def _record_message(phone: str, direction: str, message_type: str, content: str, timestamp: datetime,
+                        phone_number_id: str = None):
+        """
+        Konuşma özetini ve global sayaçları güncelle
+        
+        Konuşma dokümanı atomik olarak güncellenir ve önceki hali döner;
+        global sayaçlara sadece bu mesajın yarattığı geçişler (yeni konuşma,
+        ilk gelen mesaj, ilk okunmamış, ilk cevap) eklenir. Böylece eşzamanlı
+        yazmalarda her geçiş tam bir kez sayılır. İki yazma arasında process
+        ölürse global sayaçlar kayabilir; scheduler bunları periyodik olarak
+        konuşma özetlerinden yeniden hesaplar (rebuild_chat_stats).
+        """
+        incoming = direction == "incoming"
+        is_newer = {"$gte": [timestamp, {"$ifNull": ["$last_message_time", None]}]}
+        
+        summary = {
+            "message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, 1]},
+            "incoming_count": {"$add": [{"$ifNull": ["$incoming_count", 0]}, 1 if incoming else 0]},
+            "outgoing_count": {"$add": [{"$ifNull": ["$outgoing_count", 0]}, 0 if incoming else 1]},
+            "unread_count": {"$add": [{"$ifNull": ["$unread_count", 0]}, 1 if incoming else 0]},
+            "last_read_at": {"$ifNull": ["$last_read_at", None]},
+            # Son mesaj alanları sadece daha yeni bir mesajla değişir
+            "last_message": {"$cond": [is_newer, {"$literal": content}, "$last_message"]},
+            "last_message_direction": {"$cond": [is_newer, direction, "$last_message_direction"]},
+            "last_message_time": {"$max": ["$last_message_time", timestamp]},
+            "has_bulk_send": {"$or": [{"$ifNull": ["$has_bulk_send", False]}, message_type == "template"]}
+        }
+        if incoming:
+            if phone_number_id:
+                # Kişinin en son yazdığı numara (sırası karışık gelen webhook'lar geri almaz)
+                summary["phone_number_id"] = {"$cond": [
+                    {"$gte": [timestamp, {"$ifNull": ["$last_incoming_at", None]}]},
+                    {"$literal": str(phone_number_id)},
+                    "$phone_number_id"
+                ]}
+            summary["last_incoming_at"] = {"$max": ["$last_incoming_at", timestamp]}
+        
+        update = [
+            {"$set": summary},
+            {"$set": {"has_replied": {"$and": [
+                {"$gt": ["$incoming_count", 0]},
+                {"$gt": ["$outgoing_count", 0]}
+            ]}}}
+        ]
+        
+        before = ChatModel.get_conversations_collection().find_one_and_update(
+            {"_id": phone},
+            update,
+            projection={"incoming_count": 1, "outgoing_count": 1, "unread_count": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        ) or {}
+        
+        incoming_before = before.get("incoming_count", 0)
+        outgoing_before = before.get("outgoing_count", 0)
+        replied_before = incoming_before > 0 and outgoing_before > 0
+        replied_after = (incoming_before + incoming) > 0 and (outgoing_before + (not incoming)) > 0
+        
+        deltas = {
+            "all": 0 if before else 1,
+            "incoming": 1 if incoming and incoming_before == 0 else 0,
+            "unread": 1 if incoming and before.get("unread_count", 0) == 0 else 0,
+            "replied": 1 if replied_after and not replied_before else 0,
+            "unread_messages": 1 if incoming else 0
+        }
+        deltas = {key: value for key, value in deltas.items() if value}
+        
+        if deltas:
+            ChatModel.get_stats_collection().update_one(
+                {"_id": "global"},
+                {"$inc": deltas},
+                upsert=True
+            )
+    
+    @staticmethod
+    def ensure_indexes():
+        """Chat sorguları için index'ler"""
+        # Cursor pagination: (phone, timestamp, _id) her iki yönde de index'ten okunur
+        ChatModel.get_collection().create_index(
+            [("phone", 1), ("timestamp", 1), ("_id", 1)],
+            name="phone_timestamp_id"
+        )
+        
+        # Konuşma listesi: her filtre için son mesaja göre sıralı (partial) index
+        conversations = ChatModel.get_conversations_collection()
+        conversations.create_index([("last_message_time", -1)], name="last_message_time")
+        for name, condition in ChatModel.CHAT_FILTERS.items():
+            if condition:
+                conversations.create_index(
+                    [("last_message_time", -1)],
+                    name=f"{name}_last_message_time",
+                    partialFilterExpression=condition
+                )
+    
+    @staticmethod
+    def encode_cursor(timestamp: datetime, message_id) -> str:
+        """(timestamp, _id) → opak cursor string'i"""
+        millis = (timestamp - _EPOCH) // timedelta(milliseconds=1)
+        return f"{millis}_{message_id}"
+    
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """Cursor string'i → (timestamp, ObjectId)"""
+        try:
+            millis, message_id = cursor.split("_", 1)
+            return _EPOCH + timedelta(milliseconds=int(millis)), ObjectId(message_id)
+        except Exception:
+            raise ValueError(f"Geçersiz cursor: {cursor}")
+    
+    @staticmethod
+    def get_chat_page(phone: str, limit: int = 100, before: str = None, after: str = None) -> Dict:
+        """
+        Chat geçmişini cursor ile sayfalı getir
+        
+        - before: bu mesajdan eski olanlar (yukarı kaydırma)
+        - after: bu mesajdan yeni olanlar (polling, sadece yeni mesajlar)
+        - ikisi de yoksa: son `limit` mesaj
+        
+        Returns: {messages: [] (eskiden yeniye), has_more: bool,
+                  before_cursor: str, after_cursor: str}
+        """
+        query = {"phone": phone}
+        
+        if after:
+            timestamp, message_id = ChatModel.decode_cursor(after)
+            query["$or"] = [
+                {"timestamp": {"$gt": timestamp}},
+                {"timestamp": timestamp, "_id": {"$gt": message_id}}
+            ]
+            direction = 1
+        else:
+            if before:
+                timestamp, message_id = ChatModel.decode_cursor(before)
+                query["$or"] = [
+                    {"timestamp": {"$lt": timestamp}},
+                    {"timestamp": timestamp, "_id": {"$lt": message_id}}
+                ]
+            direction = -1
+        
         chats = list(ChatModel.get_collection()
-                    .find({"phone": phone})
-                    .sort("timestamp", -1)
-                    .limit(limit))
+                    .find(query)
+                    .sort([("timestamp", direction), ("_id", direction)])
+                    .limit(limit + 1))
+        
+        has_more = len(chats) > limit
+        chats = chats[:limit]
+        if direction == -1:
+            chats.reverse()  # Eskiden yeniye sırala
         
         for chat in chats:
+            chat['cursor'] = ChatModel.encode_cursor(chat['timestamp'], chat['_id'])
             chat['_id'] = str(chat['_id'])
             chat['timestamp'] = chat['timestamp'].isoformat()
         
-        return list(reversed(chats))  # Eskiden yeniye sırala
+        return {
+            "messages": chats,
+            "has_more": has_more,
+            "before_cursor": chats[0]['cursor'] if chats else before,
+            "after_cursor": chats[-1]['cursor'] if chats else after
+        }
+    
+    @staticmethod
+    def get_chat_history(phone: str, limit: int = 100) -> List[Dict]:
+        """Bir numarayla olan chat geçmişini getir (son `limit` mesaj)"""
+        return ChatModel.get_chat_page(phone, limit=limit)["messages"]
     
     @staticmethod
     def get_all_chats(filter_type: str = "all", page: int = 1, limit: int = 20) -> Dict:
         """
-        Tüm chat'leri telefon numarasına göre grupla (pagination ile)
+        Tüm chat'leri konuşma özetlerinden getir (pagination ile)
         
         filter_type:
         - "all": Tüm konuşmalar
         - "incoming": Bize mesaj atanlar (incoming message var)
-        - "unread": Okunmayanlar (last message incoming ve unread)
+        - "unread": Okunmayanlar (okunmamış incoming mesaj var)
         - "replied": Bizim cevap verdiklerimiz (incoming + outgoing var)
         
+        Filtre, sıralama, sayfa ve toplam sayı MongoDB'de hesaplanır;
+        bellek kullanımı sayfa boyutuyla sınırlıdır.
+        
         Returns: {chats: [], total: int, page: int, total_pages: int}
         """
+        match = ChatModel.CHAT_FILTERS.get(filter_type, {})
+        page = max(page, 1)
+        
         pipeline = [
-            {"$sort": {"timestamp": -1}},
-            {"$group": {
-                "_id": "$phone",
-                "last_message": {"$first": "$content"},
-                "last_message_time": {"$first": "$timestamp"},
-                "last_message_direction": {"$first": "$direction"},
-                "message_count": {"$sum": 1},
-                "unread_count": {
-                    "$sum": {
-                        "$cond": [
-                            {"$and": [
-                                {"$eq": ["$direction", "incoming"]},
-                                {"$eq": ["$is_read", False]}
-                            ]},
-                            1,
-                            0
-                        ]
-                    }
-                },
-                "incoming_count": {
-                    "$sum": {"$cond": [{"$eq": ["$direction", "incoming"]}, 1, 0]}
-                },
-                "outgoing_count": {
-                    "$sum": {"$cond": [{"$eq": ["$direction", "outgoing"]}, 1, 0]}
-                },
-                "has_bulk_send": {
-                    "$max": {"$cond": [{"$eq": ["$message_type", "template"]}, True, False]}
-                }
-            }},
-            {"$sort": {"last_message_time": -1}}
+            {"$match": match},
+            {"$sort": {"last_message_time": -1}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "chats": [
+                    {"$skip": (page - 1) * limit},
+                    {"$limit": limit},
+                    {"$project": {
+                        "last_message": 1,
+                        "last_message_time": 1,
+                        "last_message_direction": 1,
+                        "message_count": 1,
+                        "unread_count": 1,
+                        "incoming_count": 1,
+                        "outgoing_count": 1,
+                        "has_bulk_send": 1,
+                        "has_replied": 1
+                    }}
+                ]
+            }}
         ]
         
-        chats = list(ChatModel.get_collection().aggregate(pipeline))
+        result = next(ChatModel.get_conversations_collection().aggregate(pipeline), {})
+        total = result["total"][0]["count"] if result.get("total") else 0
+        chats = result.get("chats", [])
         
-        # Filtreleme uygula
-        filtered_chats = []
         for chat in chats:
             chat['phone'] = chat.pop('_id')
-            chat['last_message_time'] = chat['last_message_time'].isoformat()
-            chat['has_replied'] = chat['incoming_count'] > 0 and chat['outgoing_count'] > 0
-            
-            # Filtre kontrolü
-            if filter_type == "all":
-                filtered_chats.append(chat)
-            elif filter_type == "incoming" and chat['incoming_count'] > 0:
-                filtered_chats.append(chat)
-            elif filter_type == "unread" and chat['unread_count'] > 0:
-                filtered_chats.append(chat)
-            elif filter_type == "replied" and chat['has_replied']:
-                filtered_chats.append(chat)
-        
-        # Pagination
-        total = len(filtered_chats)
+            if chat.get('last_message_time'):
+                chat['last_message_time'] = chat['last_message_time'].isoformat()
+        
         total_pages = (total + limit - 1) // limit  # Ceil division
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_chats = filtered_chats[start:end]
         
         return {
-            "chats": paginated_chats,
+            "chats": chats,
             "total": total,
             "page": page,
             "limit": limit,
@@ -482,7 +1780,7 @@ class ChatModel:
     @staticmethod
     def get_chat_stats() -> Dict:
         """
-        Chat istatistiklerini getir
+        Chat istatistiklerini getir (sayaç dokümanından, tek okuma)
         Returns: {
             "all": total_count,
             "incoming": incoming_count,
@@ -490,10 +1788,98 @@ class ChatModel:
             "replied": replied_count
         }
         """
+        counters = ChatModel.get_stats_collection().find_one({"_id": "global"}) or {}
+        
+        return {
+            "all": counters.get("all", 0),
+            "incoming": counters.get("incoming", 0),
+            "unread": counters.get("unread", 0),
+            "replied": counters.get("replied", 0)
+        }
+    
+    @staticmethod
+    def mark_messages_as_read(phone: str) -> bool:
+        """
+        Konuşmayı okundu olarak işaretle (okuma cursor'unu ilerlet)
+        
+        Sadece okunmamış mesajı olan konuşmada yazma yapılır: last_read_at
+        son gelen mesaja çekilir, unread sayaçları sıfırlanır.
+        
+        Returns: cursor ilerlediyse True
+        """
+        before = ChatModel.get_conversations_collection().find_one_and_update(
+            {"_id": phone, "unread_count": {"$gt": 0}},
+            [{"$set": {"last_read_at": "$last_incoming_at", "unread_count": 0}}],
+            projection={"unread_count": 1, "last_incoming_at": 1},
+            return_document=ReturnDocument.BEFORE
+        )
+        
+        if not before:
+            return False
+        
+        ChatModel.get_stats_collection().update_one(
+            {"_id": "global"},
+            {"$inc": {"unread": -1, "unread_messages": -before["unread_count"]}}
+        )
+        
+        # Eski is_read alanını da senkron tut (sadece cursor ilerlediğinde)
+        ChatModel.get_collection().update_many(
+            {
+                "phone": phone,
+                "direction": "incoming",
+                "is_read": False,
+                "timestamp": {"$lte": before["last_incoming_at"]}
+            },
+            {"$set": {"is_read": True}}
+        )
+        return True
+    
+    @staticmethod
+    def get_unread_count(phone: str = None) -> int:
+        """Okunmamış mesaj sayısını getir (sayaçlardan)"""
+        if phone:
+            conversation = ChatModel.get_conversations_collection().find_one(
+                {"_id": phone},
+                {"unread_count": 1}
+            )
+            return conversation.get("unread_count", 0) if conversation else 0
+        
+        counters = ChatModel.get_stats_collection().find_one({"_id": "global"}, {"unread_messages": 1})
+        return counters.get("unread_messages", 0) if counters else 0
+    
+    @staticmethod
+    def get_total_unread_count() -> int:
+        """Toplam okunmamış mesaj sayısı"""
+        return ChatModel.get_unread_count()
+    
+    @staticmethod
+    def rebuild_conversations(phones: List[str] = None) -> int:
+        """
+        Konuşma özetlerini ve global sayaçları chats koleksiyonundan yeniden
+        oluştur (backfill / sayaç kayması düzeltme için)
+        
+        Returns: güncellenen konuşma sayısı
+        """
+        match = {"phone": {"$in": phones}} if phones else {}
+        
         pipeline = [
+            {"$match": match},
             {"$sort": {"timestamp": -1}},
             {"$group": {
                 "_id": "$phone",
+                "last_message": {"$first": "$content"},
+                "last_message_time": {"$first": "$timestamp"},
+                "last_message_direction": {"$first": "$direction"},
+                "has_bulk_send": {
+                    "$max": {"$cond": [{"$eq": ["$message_type", "template"]}, True, False]}
+                },
+                "message_count": {"$sum": 1},
+                "incoming_count": {
+                    "$sum": {"$cond": [{"$eq": ["$direction", "incoming"]}, 1, 0]}
+                },
+                "outgoing_count": {
+                    "$sum": {"$cond": [{"$eq": ["$direction", "outgoing"]}, 1, 0]}
+                },
                 "unread_count": {
                     "$sum": {
                         "$cond": [
@@ -506,64 +1892,78 @@ class ChatModel:
                         ]
                     }
                 },
-                "incoming_count": {
-                    "$sum": {"$cond": [{"$eq": ["$direction", "incoming"]}, 1, 0]}
+                "last_incoming_at": {
+                    "$max": {"$cond": [{"$eq": ["$direction", "incoming"]}, "$timestamp", None]}
                 },
-                "outgoing_count": {
-                    "$sum": {"$cond": [{"$eq": ["$direction", "outgoing"]}, 1, 0]}
+                "last_read_at": {
+                    "$max": {
+                        "$cond": [
+                            {"$and": [
+                                {"$eq": ["$direction", "incoming"]},
+                                {"$eq": ["$is_read", True]}
+                            ]},
+                            "$timestamp",
+                            None
+                        ]
+                    }
                 }
-            }}
+            }},
+            {"$addFields": {"has_replied": {"$and": [
+                {"$gt": ["$incoming_count", 0]},
+                {"$gt": ["$outgoing_count", 0]}
+            ]}}}
         ]
         
-        chats = list(ChatModel.get_collection().aggregate(pipeline))
-        
-        stats = {
-            "all": len(chats),
-            "incoming": 0,
-            "unread": 0,
-            "replied": 0
-        }
-        
-        for chat in chats:
-            if chat['incoming_count'] > 0:
-                stats['incoming'] += 1
-            if chat['unread_count'] > 0:
-                stats['unread'] += 1
-            if chat['incoming_count'] > 0 and chat['outgoing_count'] > 0:
-                stats['replied'] += 1
-        
-        return stats
-    
-    @staticmethod
-    def mark_messages_as_read(phone: str):
-        """Bir telefon numarasının tüm okunmamış mesajlarını okundu olarak işaretle"""
-        ChatModel.get_collection().update_many(
-            {
-                "phone": phone,
-                "direction": "incoming",
-                "is_read": False
-            },
-            {"$set": {"is_read": True}}
-        )
+        operations = []
+        updated = 0
+        for conversation in ChatModel.get_collection().aggregate(pipeline, allowDiskUse=True):
+            phone = conversation.pop("_id")
+            operations.append(UpdateOne({"_id": phone}, {"$set": conversation}, upsert=True))
+            if len(operations) >= 1000:
+                ChatModel.get_conversations_collection().bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        
+        if operations:
+            ChatModel.get_conversations_collection().bulk_write(operations, ordered=False)
+            updated += len(operations)
+        
+        ChatModel.rebuild_chat_stats()
+        return updated
     
     @staticmethod
-    def get_unread_count(phone: str = None) -> int:
-        """Okunmamış mesaj sayısını getir"""
-        query = {
-            "direction": "incoming",
-            "is_read": False
-        }
+    def rebuild_chat_stats() -> Dict:
+        """Global sayaçları konuşma özetlerinden yeniden hesapla"""
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "all": {"$sum": 1},
+                "incoming": {"$sum": {"$cond": [{"$gt": ["$incoming_count", 0]}, 1, 0]}},
+                "unread": {"$sum": {"$cond": [{"$gt": ["$unread_count", 0]}, 1, 0]}},
+                "replied": {
+                    "$sum": {
+                        "$cond": [
+                            {"$and": [
+                                {"$gt": ["$incoming_count", 0]},
+                                {"$gt": ["$outgoing_count", 0]}
+                            ]},
+                            1,
+                            0
+                        ]
+                    }
+                },
+                "unread_messages": {"$sum": "$unread_count"}
+            }}
+        ]
         
-        if phone:
-            query["phone"] = phone
+        results = list(ChatModel.get_conversations_collection().aggregate(pipeline))
+        counters = results[0] if results else {}
+        counters.pop("_id", None)
         
-        return ChatModel.get_collection().count_documents(query)
-    
-    @staticmethod
-    def get_total_unread_count() -> int:
-        """Toplam okunmamış mesaj sayısı"""
-        return ChatModel.get_unread_count()
+        ChatModel.get_stats_collection().replace_one({"_id": "global"}, counters, upsert=True)
+        return counters
 
+@timed_model
 class ProductModel:
     """Ürün Yönetimi"""
     
@@ -638,14 +2038,19 @@ class ProductModel:
     
     @staticmethod
     def get_product_by_id(product_id: str) -> Dict:
-        """Ürün ID'ye göre getir"""
+        """Ürün ID'ye göre getir (cache'li)"""
         from bson import ObjectId
+        product = _product_cache.get(product_id)
+        if product is not None:
+            return product
+        
         product = ProductModel.get_collection().find_one({"_id": ObjectId(product_id)})
         
         if product:
             product['_id'] = str(product['_id'])
             product['created_at'] = product['created_at'].isoformat()
             product['updated_at'] = product['updated_at'].isoformat()
+            _product_cache.set(product_id, product)
         
         return product
     
@@ -695,6 +2100,7 @@ class ProductModel:
             {"_id": ObjectId(product_id)},
             {"$set": update_data}
         )
+        _product_cache.invalidate(product_id)
         
         return result.modified_count > 0
     
@@ -706,9 +2112,11 @@ class ProductModel:
             {"_id": ObjectId(product_id)},
             {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
         )
+        _product_cache.invalidate(product_id)
         return result.modified_count > 0
 
 
+@timed_model(exclude=("get_tier_pricing",))
 class SalesModel:
     """Satış Takip Sistemi"""
     
@@ -804,6 +2212,7 @@ class SalesModel:
                 "$inc": {"total_sales": 1}
             }
         )
+        _contact_cache.invalidate(phone)
         
         return sale
     
@@ -940,6 +2349,7 @@ class SalesModel:
         except:
             return False
 
+@timed_model(exclude=("hash_password",))
 class AdminModel:
     """Admin Kullanıcı Yönetimi"""
     
@@ -965,17 +2375,86 @@ class AdminModel:
                 "is_active": True
             }
             AdminModel.get_collection().insert_one(admin)
-            print("✅ Default admin user created (username: admin)")
+            _admin_cache.invalidate("admin")
+            logger.info("✅ Default admin user created (username: admin)")
         else:
-            print("ℹ️  Admin user already exists")
+            logger.info("ℹ️  Admin user already exists")
     
     @staticmethod
     def verify_login(username: str, password: str) -> bool:
-        """Login doğrula"""
-        admin = AdminModel.get_collection().find_one({"username": username})
+        """Login doğrula (admin kaydı kısa TTL ile cache'lenir)"""
+        admin = _admin_cache.get(username)
+        if admin is None:
+            admin = AdminModel.get_collection().find_one(
+                {"username": username},
+                {"_id": 0, "username": 1, "password": 1, "is_active": 1}
+            )
+            _admin_cache.set(username, admin)
         
         if admin and admin.get("is_active"):
             password_hash = AdminModel.hash_password(password)
             return password_hash == admin["password"]
         
         return False
+
+
+@timed_model
+class AppSettingsModel:
+    """Panelden değiştirilebilen uygulama ayarları (worker'lar arası, kısa TTL cache)"""
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['app_settings']
+    
+    @staticmethod
+    def get_setting(name: str, default=None):
+        """Ayar değerini getir (kayıt yoksa default)"""
+        doc = _settings_cache.get(name)
+        if doc is None:
+            doc = AppSettingsModel.get_collection().find_one({"_id": name}) or {"_id": name}
+            _settings_cache.set(name, doc)
+        return doc.get("value", default)
+    
+    @staticmethod
+    def set_setting(name: str, value) -> None:
+        """Ayarı kaydet (diğer worker'lar cache TTL dolunca görür)"""
+        AppSettingsModel.get_collection().update_one(
+            {"_id": name},
+            {"$set": {"value": value, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        _settings_cache.invalidate(name)
+
+
+@timed_model
+class ProfileTraceModel:
+    """Örneklenmiş istek profilleri (TTL index ile otomatik silinir)"""
+    
+    @staticmethod
+    def get_collection() -> Collection:
+        return get_database()['profile_traces']
+    
+    @staticmethod
+    def ensure_indexes():
+        """created_at TTL index'i (PROFILE_TRACE_TTL_DAYS, default 7 gün)"""
+        ttl_days = float(os.environ.get("PROFILE_TRACE_TTL_DAYS", 7))
+        collection = ProfileTraceModel.get_collection()
+        collection.create_index("created_at", expireAfterSeconds=int(ttl_days * 86400), name="created_at_ttl")
+        collection.create_index([("total_ms", -1)], name="total_ms")
+    
+    @staticmethod
+    def save_trace(trace: Dict) -> None:
+        ProfileTraceModel.get_collection().insert_one(trace)
+    
+    @staticmethod
+    def get_traces(limit: int = 50, path: str = None, sort: str = "recent") -> List[Dict]:
+        """Son (veya en yavaş) trace'ler"""
+        query = {"path": path} if path else {}
+        sort_field = "total_ms" if sort == "slowest" else "created_at"
+        traces = list(ProfileTraceModel.get_collection()
+                      .find(query)
+                      .sort(sort_field, -1)
+                      .limit(limit))
+        for trace in traces:
+            trace["_id"] = str(trace["_id"])
+        return traces
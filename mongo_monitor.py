@@ -0,0 +1,296 @@
+"""
+MongoDB Query Monitor
+Sorgu şekli (query shape) bazında süre istatistikleri, yavaş sorgu log'u ve explain
+
+- Filtre değerleri tiplerle değiştirilir: {"phone": "905..."} → {"phone": "<str>"}
+- MONGO_SLOW_MS üzerindeki komutlar normalize edilmiş filtre ile log'lanır
+- Aynı şekil MONGO_EXPLAIN_AFTER kez yavaş kalırsa explain (queryPlanner)
+  arka planda bir kez alınır ve istatistiğe eklenir
+- İstatistikler process başınadır (/api/db/query-stats)
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Dict, List
+from pymongo import monitoring
+from database import register_listener, db_instance
+import json
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+MONITOR_ENABLED = os.environ.get("MONGO_MONITOR", "1") != "0"
+SLOW_MS = float(os.environ.get("MONGO_SLOW_MS", 100))
+EXPLAIN_AFTER = int(os.environ.get("MONGO_EXPLAIN_AFTER", 3))
+
+# Bellek sınırı: bu kadar farklı şekilden sonrası tek satırda toplanır
+MAX_SHAPES = 500
+
+# Şekil istatistiği tutulmayan (sürücü/oturum) komutları
+IGNORED_COMMANDS = {
+    "explain", "hello", "ismaster", "isMaster", "ping", "buildInfo", "saslStart",
+    "saslContinue", "endSessions", "killCursors", "getMore", "listIndexes", "createIndexes"
+}
+
+# Explain edilebilen komutlar ve filtrenin bulunduğu alan
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+    "aggregate": "pipeline"
+}
+EXPLAINABLE = set(FILTER_FIELDS) | {"update", "delete"}
+
+
+def normalize(value):
+    """Değerleri tip adlarıyla değiştir, operatör ve alan adlarını koru"""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return []
+        if all(isinstance(item, dict) for item in value):
+            # $and/$or/pipeline gibi yapısal listeler
+            return [normalize(item) for item in value]
+        # $in listeleri: uzunluktan bağımsız tek şekil
+        return [f"<{type(value[0]).__name__}>"]
+    if value is None:
+        return None
+    return f"<{type(value).__name__}>"
+
+
+def _command_shape(command_name: str, command: Dict) -> Dict:
+    """Komutun istatistik anahtarı olacak kısmı"""
+    if command_name in FILTER_FIELDS:
+        shape = {FILTER_FIELDS[command_name]: normalize(command.get(FILTER_FIELDS[command_name], {}))}
+        if command_name == "find" and command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+        if command_name == "distinct":
+            shape["key"] = command.get("key")
+        return shape
+    if command_name == "update":
+        updates = command.get("updates") or [{}]
+        return {"q": normalize(updates[0].get("q", {})), "multi": bool(updates[0].get("multi"))}
+    if command_name == "delete":
+        deletes = command.get("deletes") or [{}]
+        return {"q": normalize(deletes[0].get("q", {}))}
+    return {}
+
+
+def _explainable_command(command: Dict) -> Dict:
+    """Explain için komutun sürücü alanlarından (lsid, $db, ...) arındırılmış kopyası"""
+    return {
+        key: value for key, value in command.items()
+        if not key.startswith("$") and key not in ("lsid", "txnNumber", "autocommit", "startTransaction")
+    }
+
+
+def _summarize_plan(plan: Dict) -> Dict:
+    """winningPlan ağacını stage zinciri ve kullanılan index'lere indir"""
+    stages, indexes = [], []
+    node = plan
+    while isinstance(node, dict) and node:
+        if "stage" in node:
+            stages.append(node["stage"])
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        if "inputStage" in node:
+            node = node["inputStage"]
+        elif node.get("inputStages"):
+            node = node["inputStages"][0]
+        elif "queryPlan" in node:
+            node = node["queryPlan"]
+        else:
+            break
+    return {
+        "stages": " > ".join(reversed(stages)),
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages
+    }
+
+
+def _find_winning_plan(explain: Dict):
+    """Explain çıktısında (find/aggregate/$cursor) winningPlan'ı bul"""
+    if not isinstance(explain, dict):
+        return None
+    planner = explain.get("queryPlanner")
+    if isinstance(planner, dict) and "winningPlan" in planner:
+        return planner["winningPlan"]
+    for stage in explain.get("stages", []):
+        plan = _find_winning_plan(stage.get("$cursor", {}))
+        if plan:
+            return plan
+    return None
+
+
+class QueryShapeListener(monitoring.CommandListener):
+    """Komut sürelerini sorgu şekline göre toplar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._shapes = {}
+        self._slow_log = deque(maxlen=200)
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+
+    # --- pymongo event'leri ---
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        try:
+            shape = _command_shape(event.command_name, event.command)
+            collection = event.command.get(event.command_name)
+            key = f"{event.database_name}.{collection}.{event.command_name} {json.dumps(shape, sort_keys=True, default=str)}"
+        except Exception:
+            return
+        command = event.command if event.command_name in EXPLAINABLE else None
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (
+                key, event.command_name, event.database_name, collection, shape, command
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+
+        key, command_name, database_name, collection, shape, command = pending
+        duration_ms = event.duration_micros / 1000
+        slow = duration_ms >= SLOW_MS
+
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                if len(self._shapes) >= MAX_SHAPES:
+                    key = "(other)"
+                    stats = self._shapes.get(key)
+                if stats is None:
+                    stats = self._shapes[key] = {
+                        "shape": key,
+                        "database": database_name,
+                        "collection": collection,
+                        "command": command_name,
+                        "filter": shape,
+                        "count": 0,
+                        "failed": 0,
+                        "slow": 0,
+                        "total_ms": 0.0,
+                        "max_ms": 0.0,
+                        "last_seen": None,
+                        "explain": None
+                    }
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["last_seen"] = datetime.utcnow()
+            if failed:
+                stats["failed"] += 1
+            if slow:
+                stats["slow"] += 1
+                self._slow_log.append({
+                    "at": stats["last_seen"],
+                    "shape": key,
+                    "ms": round(duration_ms, 2)
+                })
+
+            needs_explain = (
+                slow and command is not None and key != "(other)"
+                and stats["explain"] is None and stats["slow"] >= EXPLAIN_AFTER
+            )
+            if needs_explain:
+                stats["explain"] = {"status": "pending"}
+
+        if slow:
+            logger.warning(
+                "Slow Mongo %s on %s: %.1fms", command_name, collection, duration_ms,
+                extra={"shape": key, "filter": json.dumps(shape, sort_keys=True, default=str)}
+            )
+        if needs_explain:
+            self._schedule_explain(key, database_name, command)
+
+    # --- explain ---
+
+    def _schedule_explain(self, key: str, database_name: str, command: Dict):
+        try:
+            self._explain_queue.put_nowait((key, database_name, _explainable_command(command)))
+        except queue.Full:
+            with self._lock:
+                self._shapes[key]["explain"] = None
+            return
+
+        if self._explain_thread is None or not self._explain_thread.is_alive():
+            self._explain_thread = threading.Thread(target=self._explain_worker, name="mongo-explain", daemon=True)
+            self._explain_thread.start()
+
+    def _explain_worker(self):
+        while True:
+            key, database_name, command = self._explain_queue.get()
+            try:
+                client = db_instance.get_client()
+                result = client[database_name].command({"explain": command, "verbosity": "queryPlanner"})
+                plan = _find_winning_plan(result)
+                explain = {"status": "ok", "captured_at": datetime.utcnow()}
+                if plan:
+                    explain.update(_summarize_plan(plan))
+            except Exception as e:
+                explain = {"status": "error", "error": str(e), "captured_at": datetime.utcnow()}
+
+            with self._lock:
+                if key in self._shapes:
+                    self._shapes[key]["explain"] = explain
+
+            if explain.get("collection_scan"):
+                logger.warning("COLLSCAN detected for slow query: %s", key, extra={"shape": key})
+
+    # --- rapor ---
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> List[Dict]:
+        """En pahalı sorgu şekilleri (total_ms | max_ms | avg_ms | count | slow)"""
+        with self._lock:
+            shapes = [dict(stats) for stats in self._shapes.values()]
+        for stats in shapes:
+            stats["avg_ms"] = round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0
+            stats["total_ms"] = round(stats["total_ms"], 2)
+            stats["max_ms"] = round(stats["max_ms"], 2)
+        if sort not in ("total_ms", "max_ms", "avg_ms", "count", "slow"):
+            sort = "total_ms"
+        return sorted(shapes, key=lambda s: s[sort], reverse=True)[:limit]
+
+    def slow_log(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            return list(self._slow_log)[-limit:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self._shapes = {}
+            self._pending = {}
+            self._slow_log.clear()
+
+    def reset_after_fork(self):
+        """Child process parent'ın istatistiklerini ve kilidini devralmasın"""
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=100)
+        self._explain_thread = None
+        self.reset()
+
+
+query_monitor = QueryShapeListener()
+
+if MONITOR_ENABLED:
+    register_listener(query_monitor)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=query_monitor.reset_after_fork)
@@ -0,0 +1,109 @@
+"""
+Outbound Scheduler
+Giden mesajların öncelik sınıfları; aynı gönderici numaranın bütçesini paylaşırlar
+
+- interactive:   temsilci cevapları (/api/send-message, /api/send-image)
+- transactional: tek kişiye template (/api/send-template)
+- marketing:     toplu gönderim / kampanyalar (bulk_engine)
+
+Interactive / transactional mesajlar kişinin en son yazdığı numaradan gider
+(webhook'ta konuşmaya yazılan phone_number_id); kişi hiç yazmadıysa veya numara
+havuzda yoksa hash ile atanan numara kullanılır. Marketing sadece hash kullanır.
+
+Bütçe numara başına ve tüm process'ler (web, scheduler) arasında ortaktır:
+send_budget'ta OUTBOUND_WINDOW_SECONDS'lık pencerelerde sayılır, pencere hakkı
+rate_per_minute'tan (senders.py) hesaplanır. Alt sınıflar pencerenin sadece bir
+kısmını kullanabilir (OUTBOUND_MARKETING_SHARE, OUTBOUND_TRANSACTIONAL_SHARE);
+kalan pay üst sınıflara ayrılır. Kampanya bütçeyi doldursa bile temsilci cevabı
+en geç bir pencere içinde çıkar.
+
+Mongo'ya erişilemezse bütçe kontrolü atlanır (gönderim durmaz).
+"""
+
+from typing import Dict
+import logging
+import os
+import time
+
+from metrics import outbound_wait_seconds
+from models import ChatModel, SendBudgetModel
+from senders import Sender, pool as sender_pool
+from utils import send_text_message, send_image_message, send_template_message
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+TRANSACTIONAL = "transactional"
+MARKETING = "marketing"
+
+WINDOW_SECONDS = float(os.environ.get("OUTBOUND_WINDOW_SECONDS", 1))
+
+# Sınıfın kullanabileceği pencere payı
+SHARES = {
+    INTERACTIVE: 1.0,
+    TRANSACTIONAL: float(os.environ.get("OUTBOUND_TRANSACTIONAL_SHARE", 0.9)),
+    MARKETING: float(os.environ.get("OUTBOUND_MARKETING_SHARE", 0.8))
+}
+
+
+def _window_limit(sender: Sender, priority: str) -> int:
+    per_window = sender.rate_per_minute / 60.0 * WINDOW_SECONDS
+    return max(1, int(per_window * SHARES[priority]))
+
+
+def acquire(sender: Sender, priority: str = MARKETING) -> float:
+    """Numaranın bütçesinden bir mesaj hakkı al (gerekirse bekle); beklenen süre"""
+    limit = _window_limit(sender, priority)
+    waited = 0.0
+    while True:
+        # Throughput hatası sonrası bekleme temsilci cevaplarını durdurmaz
+        paused = sender.paused_seconds() if priority != INTERACTIVE else 0.0
+        if paused <= 0:
+            now = time.time()
+            window = int(now // WINDOW_SECONDS)
+            try:
+                if SendBudgetModel.take(sender.phone_number_id, window, limit):
+                    break
+            except Exception as e:
+                logger.warning("Send budget unavailable, sending without it: %s", e)
+                break
+            paused = (window + 1) * WINDOW_SECONDS - now
+        time.sleep(paused)
+        waited += paused
+
+    outbound_wait_seconds.labels(priority).observe(waited)
+    if waited:
+        sender.add_wait(waited)
+    return waited
+
+
+def sender_for(phone: str, priority: str) -> Sender:
+    """Mesajın gönderici numarası: cevaplar konuşmanın numarasından, marketing hash ile"""
+    if priority != MARKETING and len(sender_pool.senders) > 1:
+        try:
+            phone_number_id = ChatModel.get_reply_phone_number_id(phone)
+        except Exception as e:
+            logger.warning("Reply sender lookup failed for %s: %s", phone, e)
+            phone_number_id = None
+        sender = sender_pool.get(phone_number_id) if phone_number_id else None
+        if sender:
+            return sender
+    return sender_pool.for_contact(phone)
+
+
+def send_text(phone: str, text: str, priority: str = INTERACTIVE) -> Dict:
+    sender = sender_for(phone, priority)
+    acquire(sender, priority)
+    return send_text_message(phone, text, sender=sender)
+
+
+def send_image(phone: str, image_url: str, caption: str = "", priority: str = INTERACTIVE) -> Dict:
+    sender = sender_for(phone, priority)
+    acquire(sender, priority)
+    return send_image_message(phone, image_url, caption, sender=sender)
+
+
+def send_template(phone: str, template_name: str, priority: str = TRANSACTIONAL, **kwargs) -> Dict:
+    sender = sender_for(phone, priority)
+    acquire(sender, priority)
+    return send_template_message(phone, template_name, sender=sender, **kwargs)
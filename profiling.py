@@ -0,0 +1,172 @@
+"""
+Request Profiling
+İstek süresini Mongo / Graph API / uygulama kodu olarak ayırır
+
+- "X-Profile: 1" header'ı (giriş yapmış kullanıcılar) veya örnekleme oranı ile açılır
+- Örnekleme oranı: PROFILE_SAMPLE_RATE (env) veya panelden "profile_sample_rate" ayarı
+- Sonuç Server-Timing header'ı olarak döner ve profile_traces'e kaydedilir
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+from flask import request, session
+from pymongo import monitoring
+from database import register_listener
+import logging
+import os
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+DEFAULT_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+
+# Trace başına saklanan en yavaş komut / çağrı sayısı
+MAX_TRACE_SPANS = 20
+
+_local = threading.local()
+
+# Panel ayarı en fazla bu sıklıkla okunur; Mongo erişilemezse son değer kullanılır
+SETTINGS_REFRESH_SECONDS = 30
+_sample_rate_state = {"value": DEFAULT_SAMPLE_RATE, "checked_at": 0.0}
+
+
+class RequestProfile:
+    """Tek bir isteğin süre dökümü"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.mongo_ms = 0.0
+        self.mongo_count = 0
+        self.graph_ms = 0.0
+        self.graph_count = 0
+        self.spans = []
+
+    def add_span(self, kind: str, name: str, duration_ms: float):
+        self.spans.append({"kind": kind, "name": name, "ms": round(duration_ms, 2)})
+
+    def breakdown(self) -> Dict:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        return {
+            "total_ms": round(total_ms, 2),
+            "mongo_ms": round(self.mongo_ms, 2),
+            "mongo_count": self.mongo_count,
+            "graph_ms": round(self.graph_ms, 2),
+            "graph_count": self.graph_count,
+            "app_ms": round(max(total_ms - self.mongo_ms - self.graph_ms, 0), 2),
+            "spans": sorted(self.spans, key=lambda s: s["ms"], reverse=True)[:MAX_TRACE_SPANS]
+        }
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return getattr(_local, "profile", None)
+
+
+def record_graph_time(endpoint: str, seconds: float):
+    """Graph API çağrı süresini aktif profile ekle (utils.graph_request çağırır)"""
+    profile = current_profile()
+    if profile is not None:
+        profile.graph_ms += seconds * 1000
+        profile.graph_count += 1
+        profile.add_span("graph", endpoint, seconds * 1000)
+
+
+class ProfileCommandListener(monitoring.CommandListener):
+    """pymongo komut sürelerini aktif istek profiline ekler"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def _record(self, event):
+        # Listener komutu çalıştıran thread'de çağrılır
+        profile = current_profile()
+        if profile is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        profile.mongo_ms += duration_ms
+        profile.mongo_count += 1
+        profile.add_span("mongo", event.command_name, duration_ms)
+
+
+register_listener(ProfileCommandListener())
+
+
+def _sample_rate() -> float:
+    from models import AppSettingsModel
+    
+    now = time.monotonic()
+    if now - _sample_rate_state["checked_at"] > SETTINGS_REFRESH_SECONDS:
+        _sample_rate_state["checked_at"] = now
+        try:
+            _sample_rate_state["value"] = float(
+                AppSettingsModel.get_setting("profile_sample_rate", DEFAULT_SAMPLE_RATE)
+            )
+        except Exception as e:
+            logger.warning(f"Profile sample rate could not be read: {e}")
+    return _sample_rate_state["value"]
+
+
+def _should_profile() -> bool:
+    if request.headers.get(PROFILE_HEADER) == "1" and session.get("logged_in"):
+        return True
+    rate = _sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def _start_profile():
+    _local.profile = None
+    if request.path.startswith("/static") or request.path in ("/health", "/ready", "/metrics"):
+        return
+    # Ayar okuma (Mongo) profile dahil edilmez
+    if _should_profile():
+        _local.profile = RequestProfile()
+
+
+def _finish_profile(response):
+    profile = current_profile()
+    _local.profile = None
+    if profile is None:
+        return response
+
+    result = profile.breakdown()
+    response.headers["Server-Timing"] = ", ".join([
+        f'mongo;dur={result["mongo_ms"]};desc="{result["mongo_count"]} cmd"',
+        f'graph;dur={result["graph_ms"]};desc="{result["graph_count"]} call"',
+        f'app;dur={result["app_ms"]}',
+        f'total;dur={result["total_ms"]}'
+    ])
+
+    trace = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "user": session.get("username"),
+        "created_at": datetime.utcnow(),
+        **result
+    }
+    # Kayıt yanıt gönderildikten sonra yapılır (istek süresine eklenmez)
+    response.call_on_close(lambda: _save_trace(trace))
+    return response
+
+
+def _save_trace(trace: Dict):
+    from models import ProfileTraceModel
+    try:
+        ProfileTraceModel.save_trace(trace)
+    except Exception as e:
+        logger.warning(f"Profile trace could not be saved: {e}")
+
+
+def init_app(app):
+    """Profiling hook'larını Flask app'e ekle"""
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
@@ -0,0 +1,98 @@
+"""
+Quiet Hours
+Ülke bazında gönderim yapılmayan saatler (zamanlanmış kampanyalar için)
+
+QUIET_HOURS (JSON): ülke → "HH:MM-HH:MM@Zaman/Dilimi"
+    {"TR": "21:00-09:00@Europe/Istanbul", "DE": "20:00-08:00@Europe/Berlin",
+     "*": "22:00-08:00@Europe/Istanbul"}
+
+- Ülke kodu contact.country ile büyük/küçük harf duyarsız eşleşir
+- "*" kuralı eşleşmeyen (ve ülkesi boş) kişilere uygulanır; yoksa kısıt yok
+- Başlangıç > bitiş ise pencere gece yarısını aşar (21:00-09:00)
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import os
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_clock(value: str) -> int:
+    hours, minutes = value.strip().split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_rules(spec: str) -> Dict[str, Tuple[int, int, object]]:
+    """JSON spec → {ülke: (başlangıç dk, bitiş dk, tzinfo)}; hatalı kurallar atlanır"""
+    rules = {}
+    if not spec:
+        return rules
+    try:
+        entries = json.loads(spec)
+    except ValueError as e:
+        logger.error(f"❌ QUIET_HOURS parse error: {e}")
+        return rules
+
+    for country, value in entries.items():
+        try:
+            window, _, tz_name = value.partition("@")
+            start, end = window.split("-")
+            tz = timezone.utc
+            if tz_name:
+                if ZoneInfo is None:
+                    raise ValueError("zoneinfo yok")
+                tz = ZoneInfo(tz_name.strip())
+            rules[country.strip().upper()] = (_parse_clock(start), _parse_clock(end), tz)
+        except Exception as e:
+            logger.error(f"❌ QUIET_HOURS rule skipped for {country}: {value} ({e})")
+    return rules
+
+
+RULES = parse_rules(os.environ.get("QUIET_HOURS", ""))
+
+
+def _rule(country: str):
+    return RULES.get((country or "").strip().upper()) or RULES.get("*")
+
+
+def quiet_until(country: str, now: datetime = None) -> Optional[datetime]:
+    """
+    Ülke şu an sessiz saatteyse pencerenin bittiği an (UTC, naive), değilse None
+
+    now: UTC naive datetime (default: şimdi)
+    """
+    rule = _rule(country)
+    if rule is None:
+        return None
+    start, end, tz = rule
+    if start == end:
+        return None
+
+    now = now or datetime.utcnow()
+    local = now.replace(tzinfo=timezone.utc).astimezone(tz)
+    minute = local.hour * 60 + local.minute
+
+    if start < end:
+        quiet = start <= minute < end
+    else:
+        quiet = minute >= start or minute < end
+    if not quiet:
+        return None
+
+    # Pencere sonu: bugün (veya gece yarısını aştıysa yarın) "end" saati
+    end_local = local.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+    if end_local <= local:
+        end_local += timedelta(days=1)
+    return end_local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def is_quiet(country: str, now: datetime = None) -> bool:
+    return quiet_until(country, now) is not None
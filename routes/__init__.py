@@ -14,6 +14,8 @@ def register_blueprints(app):
     from .chat import chat_bp
     from .analytics import analytics_bp
     from .bulk_send import bulk_send_bp
+    from .campaigns import campaigns_bp
+    from .segments import segments_bp
     from .products import products_bp
     from .sales import sales_bp
     from .templates import templates_bp
@@ -28,11 +30,11 @@ def register_blueprints(app):
     app.register_blueprint(chat_bp)
     app.register_blueprint(analytics_bp)
     app.register_blueprint(bulk_send_bp)
+    app.register_blueprint(campaigns_bp)
+    app.register_blueprint(segments_bp)
     app.register_blueprint(products_bp)
     app.register_blueprint(sales_bp)
     app.register_blueprint(templates_bp)
     app.register_blueprint(messages_bp)
     app.register_blueprint(pages_bp)
     app.register_blueprint(legacy_bp)
-    
-    print("✅ All blueprints registered")
@@ -5,7 +5,10 @@ Dashboard and statistics
 
 from flask import Blueprint, request, jsonify, render_template
 from routes.auth import login_required
-from models import MessageModel, ContactModel
+from models import MessageModel, ContactModel, AppSettingsModel, ProfileTraceModel, get_cache_stats
+from database import get_pool_stats
+import profiling
+from mongo_monitor import query_monitor, SLOW_MS
 from datetime import datetime, timedelta
 import logging
 
@@ -97,3 +100,97 @@ def api_analytics_stats():
     except Exception as e:
         logger.error(f"Analytics stats error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
+
+@analytics_bp.route("/api/cache/stats", methods=["GET"])
+@login_required
+def api_cache_stats():
+    """Model cache hit/miss istatistikleri"""
+    try:
+        return jsonify({
+            "success": True,
+            "caches": get_cache_stats()
+        })
+    except Exception as e:
+        logger.error(f"Cache stats error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@analytics_bp.route("/api/db/pool-stats", methods=["GET"])
+@login_required
+def api_db_pool_stats():
+    """MongoDB bağlantı havuzu istatistikleri (bu worker için)"""
+    try:
+        return jsonify({
+            "success": True,
+            "pool": get_pool_stats()
+        })
+    except Exception as e:
+        logger.error(f"Pool stats error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@analytics_bp.route("/api/db/query-stats", methods=["GET"])
+@login_required
+def api_db_query_stats():
+    """
+    Sorgu şekli bazında MongoDB istatistikleri (bu worker için)
+    Parametreler: limit (max 200), sort=total_ms|max_ms|avg_ms|count|slow, reset=1
+    """
+    try:
+        limit = min(int(request.args.get("limit", 20)), 200)
+        sort = request.args.get("sort", "total_ms")
+        
+        result = {
+            "success": True,
+            "slow_ms": SLOW_MS,
+            "top": query_monitor.top(limit=limit, sort=sort),
+            "slow_log": query_monitor.slow_log(limit=limit)
+        }
+        
+        if request.args.get("reset") == "1":
+            query_monitor.reset()
+        
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Query stats error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@analytics_bp.route("/api/profiling/traces", methods=["GET"])
+@login_required
+def api_profiling_traces():
+    """
+    Örneklenmiş istek profilleri
+    Parametreler: limit (max 200), path, sort=recent|slowest
+    """
+    try:
+        limit = min(int(request.args.get("limit", 50)), 200)
+        traces = ProfileTraceModel.get_traces(
+            limit=limit,
+            path=request.args.get("path"),
+            sort=request.args.get("sort", "recent")
+        )
+        return jsonify({"success": True, "traces": traces})
+    except Exception as e:
+        logger.error(f"Profiling traces error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@analytics_bp.route("/api/profiling/settings", methods=["GET", "POST"])
+@login_required
+def api_profiling_settings():
+    """Profil örnekleme oranı (0-1 arası; tüm worker'lar ~30 sn içinde uygular)"""
+    try:
+        if request.method == "POST":
+            data = request.get_json() or {}
+            try:
+                rate = float(data.get("sample_rate", 0))
+            except (TypeError, ValueError):
+                return jsonify({"success": False, "error": "sample_rate sayı olmalı"}), 400
+            if not 0 <= rate <= 1:
+                return jsonify({"success": False, "error": "sample_rate 0-1 arasında olmalı"}), 400
+            AppSettingsModel.set_setting("profile_sample_rate", rate)
+        
+        return jsonify({
+            "success": True,
+            "sample_rate": AppSettingsModel.get_setting("profile_sample_rate", profiling.DEFAULT_SAMPLE_RATE)
+        })
+    except Exception as e:
+        logger.error(f"Profiling settings error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -5,10 +5,10 @@ Toplu mesaj gönderimi ve log'ları
 
 from flask import Blueprint, request, jsonify, render_template
 from routes.auth import login_required
-from models import ContactModel, MessageModel, ChatModel, TemplateSettingsModel
-from utils import send_template_message
+from models import ContactModel, MessageModel, TemplateSettingsModel, TemplateSendModel, BulkJobModel
+from senders import pool as sender_pool
+import bulk_engine
 import logging
-import time
 
 bulk_send_bp = Blueprint('bulk_send', __name__)
 logger = logging.getLogger(__name__)
@@ -24,10 +24,7 @@ def bulk_send_page():
 def api_bulk_send_preview():
     """
     Toplu gönderim öncesi istatistik
-    
-    Kontroller:
-    1. sent_templates field (ContactModel)
-    2. MessageModel'deki başarılı gönderimler (sent/delivered/read)
+    Daha önce gönderilmiş kişiler template_sends ledger'ından belirlenir
     """
     try:
         template_name = request.args.get("template_name")
@@ -39,22 +36,15 @@ def api_bulk_send_preview():
         # Tüm aktif kişileri getir
         all_contacts = ContactModel.get_all_contacts(is_active=True)
         
-        # MessageModel'de bu template için başarılı gönderim yapılmış telefonları al
-        messages_sent = MessageModel.get_collection().distinct("phone", {
-            "template_name": template_name,
-            "status": {"$in": ["sent", "delivered", "read"]}
-        })
-        messages_sent_set = set(messages_sent)
+        # Bu template'i daha önce almış telefonlar
+        sent_phones = TemplateSendModel.get_phones(template_name)
         
-        # Daha önce almamış olanları filtrele (hem sent_templates hem MessageModel kontrolü)
+        # Daha önce almamış olanları filtrele
         eligible_contacts = []
         already_sent_count = 0
         
         for contact in all_contacts:
-            phone = contact["phone"]
-            
-            # sent_templates veya MessageModel'de varsa skip
-            if template_name in contact.get("sent_templates", []) or phone in messages_sent_set:
+            if contact["phone"] in sent_phones:
                 already_sent_count += 1
             else:
                 eligible_contacts.append(contact)
@@ -71,7 +61,7 @@ def api_bulk_send_preview():
             "will_send": will_send
         }
         
-        logger.info(f"📊 Preview: {len(all_contacts)} total, {already_sent_count} already sent ({len(messages_sent_set)} in messages), {len(eligible_contacts)} eligible")
+        logger.info(f"📊 Preview: {len(all_contacts)} total, {already_sent_count} already sent ({len(sent_phones)} in ledger), {len(eligible_contacts)} eligible")
         
         return jsonify({
             "success": True,
@@ -84,7 +74,13 @@ def api_bulk_send_preview():
 @bulk_send_bp.route("/api/bulk-send", methods=["POST"])
 @login_required
 def api_bulk_send():
-    """Toplu mesaj gönderimi (duplicate kontrolü ile + detaylı log)"""
+    """
+    Toplu mesaj gönderimi (duplicate kontrolü ile + detaylı log)
+    
+    Gönderim bulk_jobs'ta kalıcı bir iş olarak arka planda çalışır; 202 + job_id
+    döner, ilerleme /api/bulk-send/jobs/<job_id> ile izlenir. Worker ölürse
+    scheduler (veya /api/bulk-send/jobs/<job_id>/resume) son checkpoint'ten devam eder.
+    """
     try:
         data = request.get_json()
         
@@ -102,136 +98,111 @@ def api_bulk_send():
                 header_image_id = saved_image_id
                 logger.info(f"📷 Using saved image ID for {template_name}: {header_image_id}")
         
-        # Alıcıları belirle (daha önce almamış olanlar)
-        recipients = ContactModel.get_contacts_without_template(template_name)
+        # Çöken gönderimlerden kalan süresi dolmuş claim'leri çöz
+        TemplateSendModel.recover_expired_leases()
         
-        if not recipients:
+        # Gönderilecek en az bir kişi var mı (daha önce almamış olanlar)
+        if next(ContactModel.iter_contacts_without_template(template_name), None) is None:
             return jsonify({
                 "success": False,
                 "error": "Gönderilecek kişi bulunamadı (tümü daha önce almış)"
             }), 400
         
         # Limit varsa uygula (type conversion)
-        if limit:
-            try:
-                limit_int = int(limit)
-                if limit_int > 0:
-                    recipients = recipients[:limit_int]
-                    logger.info(f"⚠️ LIMIT APPLIED: {limit_int} recipients (original: {len(recipients)})")
-            except (ValueError, TypeError):
-                pass
+        try:
+            limit = int(limit) if limit else None
+        except (ValueError, TypeError):
+            limit = None
+        if limit is not None and limit <= 0:
+            limit = None
         
         # Rate limiting ayarları (dakikada max istek)
-        RATE_LIMIT_PER_MINUTE = data.get("rate_limit_per_minute", 60)  # Default: 60 mesaj/dakika
-        DELAY_BETWEEN_MESSAGES = 60.0 / RATE_LIMIT_PER_MINUTE if RATE_LIMIT_PER_MINUTE > 0 else 1.0
-        
-        logger.info(f"🚀 Bulk send starting: {template_name} to {len(recipients)} recipients")
-        logger.info(f"⏱️ Rate limit: {RATE_LIMIT_PER_MINUTE} mesaj/dakika (Her mesaj arası: {DELAY_BETWEEN_MESSAGES:.2f}s)")
-        
-        # Gönderim yap
-        success_count = 0
-        failed_count = 0
-        skipped_count = 0
-        details = []
-        
-        # Progress logging
-        total_recipients = len(recipients)
-        start_time = time.time()
-        
-        for i, contact in enumerate(recipients, 1):
-            phone = contact["phone"]
-            name = contact.get("name", "Unknown")
-            
-            # Progress log (her 10 mesajda bir)
-            if i % 10 == 0 or i == total_recipients:
-                elapsed_time = time.time() - start_time
-                messages_per_sec = i / elapsed_time if elapsed_time > 0 else 0
-                logger.info(f"📊 Progress: {i}/{total_recipients} ({(i/total_recipients*100):.1f}%) - ✅ {success_count} ❌ {failed_count} - Hız: {messages_per_sec:.2f} msg/s")
-            
-            # Mesaj gönder (image_id ile)
-            result = send_template_message(phone, template_name, language_code="tr", header_image_id=header_image_id)
-            
-            # Rate limiting delay (son mesajdan sonra bekleme)
-            if i < total_recipients:
-                time.sleep(DELAY_BETWEEN_MESSAGES)
-            
-            if result["success"]:
-                # ✅ BAŞARILI - template geçmişine ekle
-                try:
-                    ContactModel.add_sent_template(phone, template_name)
-                    MessageModel.create_message(
-                        phone=phone,
-                        template_name=template_name,
-                        status="sent"
-                    )
-                    
-                    # Chat'e kaydet (Toplu Gönderim)
-                    try:
-                        ChatModel.save_message(
-                            phone=phone,
-                            direction="outgoing",
-                            message_type="template",
-                            content=f"📤 Toplu Gönderim: {template_name}",
-                            media_url=None
-                        )
-                    except Exception as chat_error:
-                        # Chat kaydetme başarısız olsa bile devam et
-                        logger.warning(f"⚠️  Chat kaydetme hatası ({phone}): {chat_error}")
-                    
-                    success_count += 1
-                    details.append({
-                        "phone": phone,
-                        "name": name,
-                        "status": "success"
-                    })
-                    logger.info(f"✅ [{i}/{total_recipients}] Sent to {name} ({phone})")
-                    
-                except Exception as e:
-                    # MessageModel veya ContactModel hatası - bu kritik!
-                    logger.error(f"❌ Database error for {phone}: {e}")
-                    failed_count += 1
-                    details.append({
-                        "phone": phone,
-                        "name": name,
-                        "status": "failed",
-                        "error": f"Database error: {str(e)}"
-                    })
-            else:
-                # ❌ BAŞARISIZ - template geçmişine EKLEME (önemli!)
-                MessageModel.create_message(
-                    phone=phone,
-                    template_name=template_name,
-                    status="failed",
-                    error_message=result.get("error", "Unknown error")
-                )
-                failed_count += 1
-                details.append({
-                    "phone": phone,
-                    "name": name,
-                    "status": "failed",
-                    "error": result.get("error", "Unknown error")
-                })
-                logger.error(f"❌ [{i}/{total_recipients}] Failed to {name} ({phone}): {result.get('error')}")
+        rate_limit_per_minute = data.get("rate_limit_per_minute", 60)  # Default: 60 mesaj/dakika
         
-        logger.info(f"✅ Bulk send completed: {success_count} success, {failed_count} failed, {skipped_count} skipped")
+        job = bulk_engine.create_job(
+            template_name,
+            header_image_id=header_image_id,
+            limit=limit,
+            rate_limit_per_minute=rate_limit_per_minute
+        )
+        bulk_engine.start_job(job)
         
         return jsonify({
             "success": True,
+            "job_id": job["_id"],
+            "status": "running",
             "template": template_name,
-            "results": {
-                "success": success_count,
-                "failed": failed_count,
-                "skipped": skipped_count,
-                "total": len(recipients)
-            },
-            "details": details  # Detaylı log
-        })
+            "total": job["estimated_total"]
+        }), 202
     except Exception as e:
         logger.error(f"Bulk send error: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return jsonify({"success": False, "error": str(e)}), 500
 
+@bulk_send_bp.route("/api/bulk-send/jobs", methods=["GET"])
+@login_required
+def api_bulk_send_jobs():
+    """Son toplu gönderim işleri (?status=running|completed|failed)"""
+    try:
+        limit = int(request.args.get("limit", 20))
+        jobs = BulkJobModel.get_jobs(limit=limit, status=request.args.get("status"))
+        return jsonify({"success": True, "jobs": jobs})
+    except Exception as e:
+        logger.error(f"Bulk send jobs error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bulk_send_bp.route("/api/bulk-send/senders", methods=["GET"])
+@login_required
+def api_bulk_send_senders():
+    """Gönderici numaralar: hız bütçesi, gönderilen/başarısız/throttle sayaçları (bu process)"""
+    try:
+        return jsonify({"success": True, "senders": sender_pool.stats()})
+    except Exception as e:
+        logger.error(f"Bulk send senders error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bulk_send_bp.route("/api/bulk-send/jobs/<job_id>", methods=["GET"])
+@login_required
+def api_bulk_send_job(job_id):
+    """İş durumu: sayaçlar, son checkpoint, lease"""
+    try:
+        job = BulkJobModel.get_job(job_id)
+        if not job:
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        return jsonify({"success": True, "job": job})
+    except Exception as e:
+        logger.error(f"Bulk send job error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bulk_send_bp.route("/api/bulk-send/jobs/<job_id>/resume", methods=["POST"])
+@login_required
+def api_bulk_send_resume(job_id):
+    """Sahibi ölmüş (lease dolmuş) veya hata ile durmuş işi son checkpoint'ten devam ettir"""
+    try:
+        if not BulkJobModel.get_job(job_id):
+            return jsonify({"success": False, "error": "Job not found"}), 404
+        
+        TemplateSendModel.recover_expired_leases()
+        job = bulk_engine.resume_job(job_id)
+        if not job:
+            return jsonify({
+                "success": False,
+                "error": "İş başka bir worker'da çalışıyor ya da tamamlanmış"
+            }), 409
+        
+        bulk_engine.start_job(job)
+        return jsonify({
+            "success": True,
+            "job_id": job["_id"],
+            "status": "running",
+            "template": job["template_name"],
+            "total": job.get("estimated_total") or 0
+        }), 202
+    except Exception as e:
+        logger.error(f"Bulk send resume error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @bulk_send_bp.route("/api/bulk-send/logs", methods=["GET"])
 @login_required
 def api_bulk_send_logs():
@@ -294,7 +265,10 @@ def api_bulk_send_template_status():
         # Tüm aktif contact'ları getir
         all_contacts = ContactModel.get_all_contacts(is_active=True)
         
-        # MessageModel'de bu template için gönderim yapılmış telefonları al
+        # Ledger'daki gönderimler
+        ledger = TemplateSendModel.get_sends(template_name)
+        
+        # MessageModel'de bu template için gönderim yapılmış telefonları al (durum bilgisi için)
         messages_sent = MessageModel.get_collection().find({
             "template_name": template_name,
             "status": {"$in": ["sent", "delivered", "read"]}
@@ -319,14 +293,15 @@ def api_bulk_send_template_status():
             phone = contact["phone"]
             name = contact.get("name", "Unknown")
             
-            # sent_templates veya MessageModel'de var mı kontrol et
-            has_in_sent_templates = template_name in contact.get("sent_templates", [])
+            # Ledger veya MessageModel'de var mı kontrol et
+            ledger_entry = ledger.get(phone)
             has_in_messages = phone in message_status_map
             
-            if has_in_sent_templates or has_in_messages:
+            if ledger_entry or has_in_messages:
                 # GÖNDERİLMİŞ
                 sent_count += 1
                 msg_info = message_status_map.get(phone, {})
+                ledger_sent_at = ledger_entry.get("sent_at") if ledger_entry else None
                 
                 contact_statuses.append({
                     "phone": phone,
@@ -335,8 +310,8 @@ def api_bulk_send_template_status():
                     "tags": contact.get("tags", []),
                     "sent": True,
                     "status": msg_info.get("status", "sent"),
-                    "sent_at": msg_info.get("sent_at"),
-                    "source": "messages" if has_in_messages else "sent_templates"
+                    "sent_at": msg_info.get("sent_at") or (ledger_sent_at.isoformat() if ledger_sent_at else None),
+                    "source": "messages" if has_in_messages else ledger_entry.get("source", "ledger")
                 })
             else:
                 # GÖNDERİLMEMİŞ
@@ -0,0 +1,109 @@
+"""
+Campaigns Routes
+Zamanlanmış kampanyalar (çalıştırma scheduler.py process'indedir)
+"""
+
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify
+from routes.auth import login_required
+from models import CampaignModel, BulkJobModel, SegmentModel
+import logging
+
+campaigns_bp = Blueprint('campaigns', __name__)
+logger = logging.getLogger(__name__)
+
+
+def _parse_scheduled_at(value):
+    """ISO 8601 → UTC naive datetime (offset yoksa UTC kabul edilir)"""
+    if not value:
+        return None
+    scheduled_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if scheduled_at.tzinfo is not None:
+        scheduled_at = scheduled_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return scheduled_at
+
+
+@campaigns_bp.route("/api/campaigns", methods=["GET"])
+@login_required
+def api_get_campaigns():
+    """Kampanya listesi (yeniden eskiye)"""
+    try:
+        limit = int(request.args.get("limit", 50))
+        return jsonify({"success": True, "campaigns": CampaignModel.get_campaigns(limit=limit)})
+    except Exception as e:
+        logger.error(f"Get campaigns error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@campaigns_bp.route("/api/campaigns/<campaign_id>", methods=["GET"])
+@login_required
+def api_get_campaign(campaign_id):
+    """Kampanya + bağlı bulk işinin durumu"""
+    try:
+        campaign = CampaignModel.get_campaign(campaign_id)
+        if not campaign:
+            return jsonify({"success": False, "error": "Campaign not found"}), 404
+        job = BulkJobModel.get_job(campaign["job_id"]) if campaign.get("job_id") else None
+        return jsonify({"success": True, "campaign": campaign, "job": job})
+    except Exception as e:
+        logger.error(f"Get campaign error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@campaigns_bp.route("/api/campaigns", methods=["POST"])
+@login_required
+def api_create_campaign():
+    """
+    Kampanya oluştur
+
+    Body: {name, template_name, segment_id | segment: {filters} | all: true,
+           scheduled_at?: ISO 8601, rate_limit_per_minute?: 60}
+    segment_id yoksa verilen filtrelerden kampanyaya özel bir segment oluşturulur.
+    Boş filtre (tüm aktif kişiler) sadece all: true ile kabul edilir.
+    scheduled_at yoksa scheduler bir sonraki turda başlatır.
+    """
+    try:
+        data = request.get_json() or {}
+        name = (data.get("name") or "").strip()
+        template_name = data.get("template_name")
+
+        if not name or not template_name:
+            return jsonify({"success": False, "error": "name ve template_name gerekli"}), 400
+
+        try:
+            scheduled_at = _parse_scheduled_at(data.get("scheduled_at"))
+        except ValueError:
+            return jsonify({"success": False, "error": "scheduled_at ISO 8601 olmalı"}), 400
+
+        if "segment_id" in data:
+            segment_id = data["segment_id"]
+            if not segment_id:
+                return jsonify({"success": False, "error": "segment_id boş olamaz"}), 400
+            if not SegmentModel.get_segment(segment_id):
+                return jsonify({"success": False, "error": "Segment not found"}), 404
+        else:
+            try:
+                filters = SegmentModel.normalize_filters(data.get("segment") or {})
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            if not filters and data.get("all") is not True:
+                # Yanlışlıkla tüm kişilere gönderimi önle
+                return jsonify({
+                    "success": False,
+                    "error": "Hedef kitle gerekli: segment_id, segment filtreleri veya all: true"
+                }), 400
+            segment = SegmentModel.create_segment(f"{name} hedef kitlesi", filters)
+            segment_id = segment["_id"]
+
+        campaign = CampaignModel.create_campaign(
+            name=name,
+            template_name=template_name,
+            segment_id=segment_id,
+            scheduled_at=scheduled_at,
+            rate_limit_per_minute=data.get("rate_limit_per_minute", 60)
+        )
+        logger.info(f"📣 Campaign created: {name} ({template_name}) at {campaign['scheduled_at']}")
+        return jsonify({"success": True, "campaign": campaign})
+    except Exception as e:
+        logger.error(f"Create campaign error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -75,17 +75,30 @@ def api_get_chat_stats():
 
 @chat_bp.route("/api/chat/<phone>", methods=["GET"])
 def api_get_chat_history(phone):
-    """Bir kişiyle olan chat geçmişini getir (MongoDB)"""
+    """
+    Bir kişiyle olan chat geçmişini getir (MongoDB, cursor pagination)
+    
+    Query params:
+    - limit: mesaj sayısı (default: 100)
+    - before: bu cursor'dan eski mesajlar (geçmişe kaydırma)
+    - after: bu cursor'dan yeni mesajlar (polling)
+    """
     try:
-        limit = int(request.args.get("limit", 100))
-        messages = ChatModel.get_chat_history(phone, limit=limit)
+        limit = min(int(request.args.get("limit", 100)), 500)
+        before = request.args.get("before")
+        after = request.args.get("after")
         
-        # Mesajları okundu olarak işaretle
-        ChatModel.mark_messages_as_read(phone)
+        try:
+            page = ChatModel.get_chat_page(phone, limit=limit, before=before, after=after)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
         return jsonify({
             "success": True,
-            "messages": messages
+            "messages": page['messages'],
+            "has_more": page['has_more'],
+            "before_cursor": page['before_cursor'],
+            "after_cursor": page['after_cursor']
         })
     except Exception as e:
         logger.error(f"Get chat history error: {e}")
@@ -93,12 +106,13 @@ def api_get_chat_history(phone):
 
 @chat_bp.route("/api/chat/<phone>/mark-read", methods=["POST"])
 def api_mark_chat_read(phone):
-    """Chat'i okundu olarak işaretle"""
+    """Chat'i okundu olarak işaretle (okuma cursor'u sadece ilerliyorsa yazılır)"""
     try:
-        ChatModel.mark_messages_as_read(phone)
+        advanced = ChatModel.mark_messages_as_read(phone)
         
         return jsonify({
             "success": True,
+            "advanced": advanced,
             "message": "Mesajlar okundu olarak işaretlendi"
         })
     except Exception as e:
@@ -5,7 +5,7 @@ Contact CRUD operations
 
 from flask import Blueprint, request, jsonify, render_template
 from routes.auth import login_required
-from models import ContactModel
+from models import ContactModel, TemplateSendModel
 import logging
 
 contacts_bp = Blueprint('contacts', __name__)
@@ -20,19 +20,47 @@ def contacts_page():
 @contacts_bp.route("/api/contacts-mongo", methods=["GET"])
 @login_required
 def api_get_contacts_mongo():
-    """MongoDB'den tüm kişileri getir"""
+    """
+    MongoDB'den kişileri getir
+    
+    Query params:
+    - page: verilirse sayfalı yanıt (sayfadaki kişilerin gönderilen template'leri ile)
+    - limit: sayfa başına kişi (default: 20)
+    - search: isim / numara araması (sadece sayfalı)
+    - is_active: true (default) / false
+    
+    page verilmezse tüm kişiler template bilgisi olmadan döner (kişi seçicileri için).
+    """
     try:
-        is_active = request.args.get('is_active')
+        is_active = request.args.get('is_active', 'true').lower() == 'true'
         
-        if is_active is not None:
-            is_active = is_active.lower() == 'true'
-            contacts = ContactModel.get_all_contacts(is_active=is_active)
-        else:
-            contacts = ContactModel.get_all_contacts()
+        if request.args.get('page') is None:
+            return jsonify({
+                "success": True,
+                "contacts": ContactModel.get_all_contacts(is_active=is_active)
+            })
+        
+        page = int(request.args.get('page', 1))
+        limit = min(int(request.args.get('limit', 20)), 200)
+        result = ContactModel.get_contacts_page(
+            page=page, limit=limit, search=request.args.get('search', '').strip(), is_active=is_active
+        )
+        
+        # Gönderilen template'ler ledger'dan sadece bu sayfanın kişileri için, tek sorguyla eklenir
+        contacts = result["contacts"]
+        sent_templates = TemplateSendModel.get_templates_for_phones([c["phone"] for c in contacts])
+        for contact in contacts:
+            contact["sent_templates"] = sent_templates.get(contact["phone"], [])
         
         return jsonify({
             "success": True,
-            "contacts": contacts
+            "contacts": contacts,
+            "total": result["total"],
+            "page": result["page"],
+            "limit": result["limit"],
+            "total_pages": result["total_pages"],
+            "has_next": result["has_next"],
+            "stats": ContactModel.get_stats()
         })
     except Exception as e:
         logger.error(f"Get contacts error: {e}")
@@ -129,7 +157,7 @@ def api_contact_sent_templates(phone):
         if not contact:
             return jsonify({"success": False, "error": "Contact not found"}), 404
         
-        sent_templates = contact.get("sent_templates", [])
+        sent_templates = TemplateSendModel.get_templates_for_phone(phone)
         
         return jsonify({
             "success": True,
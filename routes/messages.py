@@ -5,8 +5,9 @@ Direct messaging (text, image, etc.)
 
 from flask import Blueprint, request, jsonify
 from routes.auth import login_required
-from models import ChatModel
-from utils import send_text_message, send_image_message, send_template_message
+from models import ChatModel, TemplateSendModel
+import outbound
+import bulk_engine
 import logging
 
 messages_bp = Blueprint('messages', __name__)
@@ -25,7 +26,8 @@ def api_send_message():
         if not phone or not message:
             return jsonify({"success": False, "error": "phone ve message gerekli"}), 400
         
-        result = send_text_message(phone, message)
+        # Temsilci cevabı: toplu gönderimlerin önüne geçer
+        result = outbound.send_text(phone, message, priority=outbound.INTERACTIVE)
         
         if result["success"]:
             # Chat history'e kaydet
@@ -55,7 +57,7 @@ def api_send_image():
         if not phone or not image_url:
             return jsonify({"success": False, "error": "phone ve image_url gerekli"}), 400
         
-        result = send_image_message(phone, image_url, caption)
+        result = outbound.send_image(phone, image_url, caption, priority=outbound.INTERACTIVE)
         
         if result["success"]:
             # Chat history'e kaydet
@@ -75,7 +77,16 @@ def api_send_image():
 @messages_bp.route("/api/send-template", methods=["POST"])
 @login_required
 def api_send_template():
-    """Template mesaj gönder (tek kişi veya toplu)"""
+    """
+    Template mesaj gönder (tek kişi veya toplu)
+    
+    Tek alıcıya gönderim tekrar edilebilir (ör. 24 saat penceresini yeniden açmak);
+    başarılı gönderim ledger'a yazılır, böylece toplu gönderimler bu kişiyi atlar.
+    dedupe: true ile tek alıcı da ledger claim'inden geçer (daha önce gönderildiyse
+    atlanır). Birden fazla alıcı bulk_engine işi olarak gönderilir
+    (ledger dedup, rate limit, paralel gönderim) ve arka planda çalışır; 202 +
+    job_id döner (durum: /api/bulk-send/jobs/<job_id>, worker ölürse scheduler devralır).
+    """
     try:
         data = request.get_json()
         
@@ -89,7 +100,35 @@ def api_send_template():
         # Tek telefon numarası varsa
         if len(phone_numbers) == 1:
             phone = phone_numbers[0]
-            result = send_template_message(phone, template_name, language_code=language_code)
+            dedupe = data.get("dedupe") is True
+            
+            if dedupe:
+                if not TemplateSendModel.claim(phone, template_name, source="send_template"):
+                    return jsonify({
+                        "success": False,
+                        "skipped": True,
+                        "error": "Already sent",
+                        "message": "Bu template bu numaraya daha önce gönderildi"
+                    })
+                TemplateSendModel.mark_attempted(phone, template_name)
+                try:
+                    result = outbound.send_template(
+                        phone, template_name, priority=outbound.TRANSACTIONAL, language_code=language_code
+                    )
+                except Exception as e:
+                    # Gidip gitmediği bilinmiyor: timeout gibi ele alınır (tekrar gönderilmez)
+                    result = {"success": False, "error": str(e)}
+                
+                settled = bulk_engine.settle_claim(phone, template_name, result, source="send_template")
+                if settled["db_error"]:
+                    logger.error(f"❌ Send template ledger error for {phone}: {settled['db_error']}")
+            else:
+                result = outbound.send_template(
+                    phone, template_name, priority=outbound.TRANSACTIONAL, language_code=language_code
+                )
+                if result["success"]:
+                    # Toplu gönderimler bu kişiyi atlasın (kayıt varsa değişmez)
+                    TemplateSendModel.record_sent(phone, template_name, source="send_template")
             
             if result["success"]:
                 # Chat history'e kaydet
@@ -103,29 +142,24 @@ def api_send_template():
             return jsonify(result)
         else:
             # Toplu gönderim
-            success_count = 0
-            failed_count = 0
-            
-            for phone in phone_numbers:
-                result = send_template_message(phone, template_name, language_code=language_code)
-                
-                if result["success"]:
-                    success_count += 1
-                    ChatModel.save_message(
-                        phone=phone,
-                        direction="outgoing",
-                        message_type="template",
-                        content=f"📤 Template: {template_name}"
-                    )
-                else:
-                    failed_count += 1
+            TemplateSendModel.recover_expired_leases()
+            job = bulk_engine.create_job(
+                template_name,
+                phones=phone_numbers,
+                direct=True,
+                language_code=language_code,
+                rate_limit_per_minute=data.get("rate_limit_per_minute", 600)
+            )
             
+            # Arka planda çalışır, worker ölürse scheduler devralır
+            bulk_engine.start_job(job)
             return jsonify({
                 "success": True,
-                "message": f"{success_count} başarılı, {failed_count} başarısız",
-                "success_count": success_count,
-                "failed_count": failed_count
-            })
+                "job_id": job["_id"],
+                "status": "running",
+                "total": job["estimated_total"],
+                "message": f"{job['estimated_total']} alıcıya gönderim başlatıldı"
+            }), 202
     except Exception as e:
         logger.error(f"Send template error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
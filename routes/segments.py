@@ -0,0 +1,107 @@
+"""
+Segments Routes
+Kampanya hedef kitleleri (sorgu tanımı + cache'li kitle sayısı)
+"""
+
+from flask import Blueprint, request, jsonify
+from routes.auth import login_required
+from models import SegmentModel, CampaignModel
+import logging
+
+segments_bp = Blueprint('segments', __name__)
+logger = logging.getLogger(__name__)
+
+
+@segments_bp.route("/api/segments", methods=["GET"])
+@login_required
+def api_get_segments():
+    """Kayıtlı segmentler"""
+    try:
+        return jsonify({"success": True, "segments": SegmentModel.get_segments()})
+    except Exception as e:
+        logger.error(f"Get segments error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@segments_bp.route("/api/segments", methods=["POST"])
+@login_required
+def api_create_segment():
+    """
+    Segment oluştur
+
+    Body: {name, filters: {tags, countries, has_sale, replied_within_days, not_received_template}}
+    """
+    try:
+        data = request.get_json() or {}
+        name = (data.get("name") or "").strip()
+        if not name:
+            return jsonify({"success": False, "error": "name gerekli"}), 400
+
+        try:
+            segment = SegmentModel.create_segment(name, data.get("filters") or {})
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        return jsonify({"success": True, "segment": segment})
+    except Exception as e:
+        logger.error(f"Create segment error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@segments_bp.route("/api/segments/preview", methods=["POST"])
+@login_required
+def api_preview_segment():
+    """Kaydetmeden kitle sayısı (Body: {filters})"""
+    try:
+        data = request.get_json() or {}
+        try:
+            filters = SegmentModel.normalize_filters(data.get("filters") or {})
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        return jsonify({
+            "success": True,
+            "filters": filters,
+            "audience_count": SegmentModel.count_audience(filters)
+        })
+    except Exception as e:
+        logger.error(f"Preview segment error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@segments_bp.route("/api/segments/<segment_id>", methods=["GET"])
+@login_required
+def api_get_segment(segment_id):
+    """Segment + kitle sayısı (?refresh=1 ile yeniden hesaplanır)"""
+    try:
+        refresh = request.args.get("refresh") == "1"
+        count = SegmentModel.get_audience_count(segment_id, refresh=refresh)
+        if count is None:
+            return jsonify({"success": False, "error": "Segment not found"}), 404
+        return jsonify({"success": True, "segment": SegmentModel.get_segment(segment_id)})
+    except Exception as e:
+        logger.error(f"Get segment error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@segments_bp.route("/api/segments/<segment_id>", methods=["DELETE"])
+@login_required
+def api_delete_segment(segment_id):
+    """Segment sil (bitmemiş bir kampanya kullanıyorsa 409)"""
+    try:
+        if not SegmentModel.get_segment(segment_id):
+            return jsonify({"success": False, "error": "Segment not found"}), 404
+        
+        # Kampanya hedef kitlesini çalışırken segmentten okur
+        active = CampaignModel.count_active_for_segment(segment_id)
+        if active:
+            return jsonify({
+                "success": False,
+                "error": f"Segment {active} aktif kampanya tarafından kullanılıyor"
+            }), 409
+        
+        SegmentModel.delete_segment(segment_id)
+        return jsonify({"success": True})
+    except Exception as e:
+        logger.error(f"Delete segment error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -6,10 +6,10 @@ WhatsApp template management
 from flask import Blueprint, request, jsonify
 from routes.auth import login_required
 from models import TemplateSettingsModel
+from template_catalog import get_catalog
+import media
 import os
-import requests
 import logging
-import tempfile
 import base64
 
 templates_bp = Blueprint('templates', __name__)
@@ -17,38 +17,37 @@ logger = logging.getLogger(__name__)
 
 # WhatsApp API Config
 WHATSAPP_BUSINESS_ID = os.environ.get("WHATSAPP_BUSINESS_ID")
-ACCESS_TOKEN = os.environ.get("WHATSAPP_ACCESS_TOKEN") or os.environ.get("ACCESS_TOKEN")
-PHONE_NUMBER_ID = os.environ.get("PHONE_NUMBER_ID")
 
 @templates_bp.route("/api/templates", methods=["GET"])
 @login_required
 def api_get_templates():
-    """Meta'dan template'leri çek"""
+    """
+    Template kataloğunu getir (bellekten, Meta'ya her istekte gidilmez)
+    
+    Query params:
+    - refresh=1: kataloğu hemen Meta'dan yenile
+    
+    Yanıt ETag içerir, If-None-Match ile 304 döner.
+    """
     try:
-        url = f"https://graph.facebook.com/v21.0/{WHATSAPP_BUSINESS_ID}/message_templates"
-        headers = {
-            "Authorization": f"Bearer {ACCESS_TOKEN}"
-        }
+        catalog = get_catalog()
         
-        response = requests.get(url, headers=headers, timeout=10)
+        if request.args.get("refresh") == "1":
+            catalog.refresh()
         
-        if response.status_code == 200:
-            data = response.json()
-            templates = data.get("data", [])
-            
-            # Sadece APPROVED template'leri filtrele
-            approved_templates = [t for t in templates if t.get("status") == "APPROVED"]
-            
-            return jsonify({
-                "success": True,
-                "templates": approved_templates
-            })
-        else:
-            logger.error(f"Template fetch error: {response.text}")
-            return jsonify({
-                "success": False,
-                "error": f"API Error: {response.status_code}"
-            }), response.status_code
+        templates, version = catalog.get_templates()
+        
+        # Sadece APPROVED template'leri filtrele
+        approved_templates = [t for t in templates if t.get("status") == "APPROVED"]
+        
+        response = jsonify({
+            "success": True,
+            "templates": approved_templates
+        })
+        if version:
+            response.set_etag(version)
+            response.headers["Cache-Control"] = "private, no-cache"
+        return response.make_conditional(request)
             
     except Exception as e:
         logger.error(f"Template fetch error: {e}")
@@ -151,63 +150,34 @@ def api_upload_whatsapp_image():
         if not template_name:
             return jsonify({"success": False, "error": "template_name gerekli"}), 400
         
-        # Dosyayı geçici olarak kaydet
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
-        file.save(temp_file.name)
-        temp_file.close()
+        # İstekten hash'lenerek okunur; aynı içerik daha önce yüklendiyse media ID tekrar kullanılır
+        stored = media.store_upload(file)
+        result = media.get_or_upload(stored, file.filename, file.content_type or 'image/jpeg')
         
-        try:
-            # WhatsApp Media Upload API
-            url = f"https://graph.facebook.com/v24.0/{PHONE_NUMBER_ID}/media"
-            
-            headers = {
-                "Authorization": f"Bearer {ACCESS_TOKEN}"
-            }
-            
-            # Dosya tipini belirle
-            content_type = file.content_type or 'image/jpeg'
-            
-            with open(temp_file.name, 'rb') as f:
-                files = {
-                    'file': (file.filename, f, content_type)
-                }
-                data = {
-                    'messaging_product': 'whatsapp'
-                }
-                
-                logger.info(f"📤 Uploading image to WhatsApp: {file.filename}")
-                response = requests.post(url, headers=headers, files=files, data=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                media_id = result.get('id')
-                
-                # Template için image ID'yi kaydet
-                TemplateSettingsModel.set_header_image_id(template_name, media_id)
-                
-                logger.info(f"✅ Image uploaded successfully: {media_id}")
-                
-                return jsonify({
-                    "success": True,
-                    "media_id": media_id,
-                    "template_name": template_name,
-                    "message": "Image yüklendi ve template'e atandı"
-                })
-            else:
-                error_data = response.json() if response.text else {}
-                error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                logger.error(f"❌ WhatsApp upload error: {error_msg}")
-                
-                return jsonify({
-                    "success": False,
-                    "error": error_msg,
-                    "details": error_data
-                }), response.status_code
-        
-        finally:
-            # Geçici dosyayı sil
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
+        if not result["success"]:
+            logger.error(f"❌ WhatsApp upload error: {result['error']}")
+            return jsonify({
+                "success": False,
+                "error": result["error"],
+                "details": result.get("response")
+            }), result.get("status_code") or 500
+        
+        media_id = result["media_id"]
+        
+        # Template için image ID'yi kaydet
+        TemplateSettingsModel.set_header_image_id(template_name, media_id)
+        
+        logger.info(f"✅ Image {'reused' if result['reused'] else 'uploaded'}: {media_id}")
+        
+        return jsonify({
+            "success": True,
+            "media_id": media_id,
+            "template_name": template_name,
+            "reused": result["reused"],
+            "sha256": stored["sha256"],
+            "expires_at": result["expires_at"].isoformat(),
+            "message": "Image yüklendi ve template'e atandı"
+        })
     
     except Exception as e:
         logger.error(f"Image upload error: {e}")
@@ -3,8 +3,13 @@ Webhook Routes
 WhatsApp Cloud API webhook handler
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from models import WebhookLogModel, MessageModel, ChatModel, ContactModel
+from template_catalog import get_catalog
+from health import monitor
+from metrics import webhook_events, webhook_processing_seconds, generate_latest
+import threading
+import time
 import logging
 import datetime
 import os
@@ -14,16 +19,49 @@ logger = logging.getLogger(__name__)
 
 VERIFY_TOKEN = os.environ.get("VERIFY_TOKEN", "technoglobal123")
 
+# Hata log'unda yazılacak en fazla payload karakteri
+MAX_LOGGED_PAYLOAD = 500
+
+# Ayarlanırsa /metrics "Authorization: Bearer <token>" ister
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# İşlenmekte olan webhook sayısı (readiness'te kuyruk göstergesi)
+_webhooks_in_flight = 0
+_webhooks_lock = threading.Lock()
+monitor.register_queue("webhooks_in_flight", lambda: _webhooks_in_flight)
+
 @webhook_bp.route("/health")
 def health_check():
-    """Health check endpoint"""
+    """Liveness probe: process ayakta mı? (bağımlılık kontrolü yok)"""
     return jsonify({
         "status": "ok",
         "service": "TechnoSender WhatsApp API",
-        "timestamp": datetime.datetime.now().isoformat(),
-        "verify_token": VERIFY_TOKEN
+        "timestamp": datetime.datetime.now().isoformat()
     })
 
+@webhook_bp.route("/ready")
+def readiness_check():
+    """
+    Readiness probe: arka planda periyodik yenilenen bağımlılık kontrolleri
+    (Mongo ping RTT, havuz doluluğu, bekleyen kuyruklar, son başarılı Graph çağrısı)
+    
+    Probe'un kendisi sadece cache'lenmiş sonuçları okur.
+    """
+    snapshot = monitor.snapshot()
+    status_code = 200 if snapshot["status"] == "ready" else 503
+    return jsonify(snapshot), status_code
+
+@webhook_bp.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (multiprocess modda tüm worker'lar)"""
+    if METRICS_TOKEN and request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+        return "Unauthorized", 401
+    
+    content, content_type = generate_latest()
+    if content is None:
+        return "prometheus_client kurulu değil", 503
+    return Response(content, content_type=content_type)
+
 @webhook_bp.route("/webhook/test")
 def webhook_test():
     """Webhook test endpoint - Meta ayarlarını kontrol et"""
@@ -84,19 +122,65 @@ def verify_webhook():
 @webhook_bp.route("/webhook", methods=["POST"])
 def receive_webhook():
     """Gelen webhook'ları yakala ve MongoDB'ye kaydet"""
+    global _webhooks_in_flight
     data = request.get_json()
+    event_type = _event_type(data)
+    webhook_events.labels(event_type).inc()
     
+    started = time.perf_counter()
+    with _webhooks_lock:
+        _webhooks_in_flight += 1
     try:
-        value = data["entry"][0]["changes"][0]["value"]
+        return _process_webhook(data)
+    finally:
+        with _webhooks_lock:
+            _webhooks_in_flight -= 1
+        webhook_processing_seconds.labels(event_type).observe(time.perf_counter() - started)
+
+def _event_type(data) -> str:
+    """Metrikler için webhook tipi"""
+    try:
+        change = data["entry"][0]["changes"][0]
+        value = change["value"]
+    except (KeyError, IndexError, TypeError):
+        return "invalid"
+    
+    if change.get("field") == "message_template_status_update":
+        return "template_status"
+    if "statuses" in value:
+        return "status"
+    if "messages" in value:
+        return "incoming_message"
+    return "other"
+
+def _process_webhook(data):
+    """Webhook payload'ını işle"""
+    try:
+        change = data["entry"][0]["changes"][0]
+        value = change["value"]
+        
+        # Template onay/red durumu değişti → kataloğu yenile
+        if change.get("field") == "message_template_status_update":
+            logger.info(f"📚 Template durumu: {value.get('message_template_name')} → {value.get('event')}")
+            
+            WebhookLogModel.create_log(
+                event_type="template_status",
+                phone=None,
+                data=value
+            )
+            get_catalog().invalidate()
         
         # Mesaj durumu (delivered, read, sent, failed)
-        if "statuses" in value:
+        elif "statuses" in value:
             status = value["statuses"][0]
             message_id = status["id"]
             status_type = status["status"]
             recipient = status.get("recipient_id", "unknown")
             
-            logger.info(f"📦 Mesaj durumu: {status_type} → {message_id} (Alıcı: {recipient})")
+            logger.info(
+                "Webhook status %s", status_type,
+                extra={"sample": "webhook.status", "message_id": message_id, "phone": recipient}
+            )
             
             # MongoDB'ye webhook log kaydet
             WebhookLogModel.create_log(
@@ -110,9 +194,9 @@ def receive_webhook():
                 error_msg = None
                 if status_type == "failed" and "errors" in status:
                     error_msg = str(status["errors"])
-                    logger.warning(f"   ⚠️  Failed message: {message_id} - {error_msg}")
+                    logger.warning("Failed message %s: %s", message_id, error_msg, extra={"phone": recipient})
                     
-                    # NOT: sent_templates'den ÇIKARMIYORUZ
+                    # NOT: template_sends ledger'ından SİLMİYORUZ
                     # Bir kez gönderildiyse, webhook failed gelse bile duplicate önlemek için
                     # MessageModel status'ü failed olarak işaretlenir ama tekrar gönderilmez
                 
@@ -121,7 +205,6 @@ def receive_webhook():
                     status=status_type,
                     error=error_msg
                 )
-                logger.info(f"   ✅ Message status updated in MongoDB: {message_id} → {status_type}")
         
         # Gelen mesaj
         elif "messages" in value:
@@ -148,7 +231,10 @@ def receive_webhook():
             else:
                 content = f"({message_type})"
             
-            logger.info(f"💬 Gelen mesaj: {phone} - {message_type}: {content[:50]}")
+            logger.info(
+                "Webhook incoming %s", message_type,
+                extra={"sample": "webhook.incoming", "phone": phone, "message_id": message_id}
+            )
             
             # MongoDB'ye webhook log kaydet
             WebhookLogModel.create_log(
@@ -163,9 +249,10 @@ def receive_webhook():
                 direction="incoming",
                 message_type=message_type,
                 content=content,
-                media_url=media_url
+                media_url=media_url,
+                # Cevaplar kişinin yazdığı numaradan gönderilir
+                phone_number_id=value.get("metadata", {}).get("phone_number_id")
             )
-            logger.info(f"   ✅ Message saved to chat history: {phone}")
             
             # Contact yoksa otomatik ekle
             existing_contact = ContactModel.get_contact(phone)
@@ -179,7 +266,7 @@ def receive_webhook():
                     country="",
                     tags=["webhook"]  # Otomatik eklenen
                 )
-                logger.info(f"   ✅ New contact auto-added from webhook: {phone} ({profile_name})")
+                logger.info("New contact auto-added from webhook: %s", phone)
         
         # JSON dosyasına da yedek kaydet (backward compatibility)
         save_webhook_log({
@@ -189,8 +276,11 @@ def receive_webhook():
         })
         
     except Exception as e:
-        logger.error(f"⚠️ Webhook parsing hatası: {e}")
-        logger.error(f"   Data: {data}")
+        # Payload'ın tamamı log'lanmaz (kişisel veri + boyut); tamamı WebhookLog'da
+        logger.error(
+            "Webhook parsing error: %s", e,
+            extra={"event_type": _event_type(data), "payload_preview": str(data)[:MAX_LOGGED_PAYLOAD]}
+        )
         
         # Hata durumunda da MongoDB'ye kaydet
         try:
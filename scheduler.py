@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Campaign Scheduler
+Zamanı gelen kampanyaları bulk_engine ile çalıştıran ayrı process (Procfile: scheduler)
+
+Her SCHEDULER_INTERVAL saniyede:
+1. Süresi dolmuş template_sends claim'leri çözülür
+2. Sahibi ölmüş (job lease'i dolmuş) running kampanyaların işi devralınır,
+   işi hiç oluşturulamamış olanlar tekrar zamanlanır; kampanyasız işler
+   (/api/bulk-send, /api/send-template) de aynı şekilde devralınır
+3. Zamanı gelen kampanyalar (status, scheduled_at) index'i ile atomik olarak
+   alınır ve sırayla çalıştırılır
+4. Geçerlilik süresi dolmak üzere olan media ID'leri yenilenir (media.py)
+5. CHAT_STATS_REBUILD_SECONDS'ta bir global chat sayaçları konuşma
+   özetlerinden yeniden hesaplanır (artımlı güncellemelerdeki kaymayı düzeltir)
+
+Sessiz saatteki ülkelerin kişileri atlanır; kampanya pencere bitince tekrar
+zamanlanır. Birden fazla scheduler process'i güvenle çalışabilir.
+
+    python scheduler.py          # sürekli
+    python scheduler.py --once   # tek tur (cron / test)
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from config import load_env_file
+
+load_env_file()
+
+from logging_config import setup_logging
+from models import CampaignModel, TemplateSendModel, TemplateSettingsModel, BulkJobModel, ChatModel
+import bulk_engine
+import media
+
+logger = logging.getLogger("scheduler")
+
+INTERVAL = float(os.environ.get("SCHEDULER_INTERVAL", 30))
+CHAT_STATS_REBUILD_SECONDS = float(os.environ.get("CHAT_STATS_REBUILD_SECONDS", 3600))
+
+_last_stats_rebuild = None
+
+_stop = threading.Event()
+
+
+def _owner() -> str:
+    return f"scheduler:{socket.gethostname()}:{os.getpid()}"
+
+
+def _finish(campaign: dict, summary: dict):
+    """
+    Çalıştırma sonucunu kampanyaya yaz (ertelenen varsa tekrar zamanla)
+
+    Sadece kampanya hâlâ bu işle running ise yazılır; sonucu başka bir scheduler
+    yazdıysa sayaçlar iki kez artırılmaz.
+    """
+    if summary["status"] == "lost":
+        # İş başka bir process'e geçti, sonucu o yazacak
+        return
+
+    results = summary["results"]
+    job_id = summary["job_id"]
+    if summary["status"] == "failed":
+        recorded = CampaignModel.record_run(campaign["_id"], results, "failed", error=summary["error"], job_id=job_id)
+    elif results.get("deferred"):
+        resume_at = summary.get("resume_at") or datetime.utcnow() + timedelta(seconds=INTERVAL)
+        recorded = CampaignModel.record_run(campaign["_id"], results, "scheduled", scheduled_at=resume_at, job_id=job_id)
+        if recorded:
+            logger.info(
+                "Campaign %s: %d recipients deferred until %s", campaign["name"], results["deferred"], resume_at,
+                extra={"campaign_id": campaign["_id"], "job_id": job_id}
+            )
+    else:
+        recorded = CampaignModel.record_run(campaign["_id"], results, "completed", job_id=job_id)
+
+    if not recorded:
+        logger.info("Campaign %s run %s already recorded", campaign["name"], job_id,
+                    extra={"campaign_id": campaign["_id"], "job_id": job_id})
+        return
+
+    logger.info(
+        "Campaign %s run finished: %d sent, %d failed, %d skipped",
+        campaign["name"], results["success"], results["failed"], results["skipped"],
+        extra={"campaign_id": campaign["_id"], "job_id": job_id}
+    )
+
+
+def run_campaign(campaign: dict) -> dict:
+    """Kampanyayı yeni bir bulk işi olarak çalıştır"""
+    template_name = campaign["template_name"]
+    job = bulk_engine.create_job(
+        template_name,
+        header_image_id=TemplateSettingsModel.get_header_image_id(template_name) or "",
+        rate_limit_per_minute=campaign.get("rate_limit_per_minute") or 60,
+        segment_id=campaign.get("segment_id"),
+        # Segment öncesi oluşturulmuş kampanyalar
+        tags=campaign.get("tags") or None,
+        phones=campaign.get("target_phones") or None,
+        respect_quiet_hours=True,
+        campaign_id=campaign["_id"]
+    )
+    CampaignModel.attach_job(campaign["_id"], job["_id"], job["owner"])
+    logger.info("Campaign %s started", campaign["name"], extra={"campaign_id": campaign["_id"], "job_id": job["_id"]})
+
+    summary = bulk_engine.run_job(job)
+    _finish(campaign, summary)
+    return summary
+
+
+def resume_orphaned() -> int:
+    """Sahibi ölmüş running kampanyaların işlerini son checkpoint'ten devam ettir"""
+    resumed = 0
+    for campaign in CampaignModel.get_running():
+        if _stop.is_set():
+            break
+        job = bulk_engine.resume_job(campaign["job_id"])
+        if not job:
+            # İş canlı bir process'te çalışıyor ya da zaten bitmiş
+            finished = BulkJobModel.get_job(campaign["job_id"])
+            if finished and finished["status"] == "completed":
+                # İş bitti ama sonucu kampanyaya yazılamadan process öldü
+                counters = finished.get("counters") or {}
+                _finish(campaign, {
+                    "job_id": campaign["job_id"],
+                    "status": "completed",
+                    "error": None,
+                    "resume_at": None,
+                    "results": {
+                        "success": counters.get("success", 0),
+                        "failed": counters.get("failed", 0),
+                        "skipped": counters.get("skipped", 0),
+                        "deferred": counters.get("deferred", 0)
+                    }
+                })
+            continue
+        CampaignModel.attach_job(campaign["_id"], job["_id"], job["owner"])
+        logger.warning("Resuming orphaned campaign %s", campaign["name"],
+                       extra={"campaign_id": campaign["_id"], "job_id": job["_id"]})
+        _finish(campaign, bulk_engine.run_job(job))
+        resumed += 1
+    return resumed
+
+
+def resume_orphaned_jobs() -> int:
+    """Web worker'ı ölmüş (kampanyaya bağlı olmayan) toplu gönderim işlerini devam ettir"""
+    resumed = 0
+    for job_id in BulkJobModel.get_orphaned():
+        if _stop.is_set():
+            break
+        job = bulk_engine.resume_job(job_id)
+        if not job:
+            # Başka bir scheduler devraldı
+            continue
+        logger.warning("Resuming orphaned bulk job %s", job_id,
+                       extra={"job_id": job_id, "template": job["template_name"]})
+        bulk_engine.run_job(job)
+        resumed += 1
+    return resumed
+
+
+def tick() -> int:
+    """Tek tur: recovery + devralma + zamanı gelen kampanyalar + media yenileme; çalıştırılan kampanya sayısı"""
+    TemplateSendModel.recover_expired_leases()
+    CampaignModel.requeue_stale()
+    ran = resume_orphaned()
+    resume_orphaned_jobs()
+
+    while not _stop.is_set():
+        campaign = CampaignModel.claim_due(_owner())
+        if not campaign:
+            break
+        try:
+            run_campaign(campaign)
+        except Exception as e:
+            logger.exception("Campaign %s error: %s", campaign["name"], e, extra={"campaign_id": campaign["_id"]})
+            CampaignModel.record_run(campaign["_id"], {}, "failed", error=str(e))
+        ran += 1
+
+    try:
+        media.refresh_expiring()
+    except Exception as e:
+        logger.exception("Media refresh error: %s", e)
+
+    rebuild_chat_stats()
+    return ran
+
+
+def rebuild_chat_stats(force: bool = False) -> bool:
+    """Global chat sayaçlarını CHAT_STATS_REBUILD_SECONDS'ta bir yeniden hesapla"""
+    global _last_stats_rebuild
+    now = time.monotonic()
+    if not force and _last_stats_rebuild is not None and now - _last_stats_rebuild < CHAT_STATS_REBUILD_SECONDS:
+        return False
+    _last_stats_rebuild = now
+    try:
+        counters = ChatModel.rebuild_chat_stats()
+    except Exception as e:
+        logger.exception("Chat stats rebuild error: %s", e)
+        return False
+    logger.info("Chat stats rebuilt", extra={"counters": counters})
+    return True
+
+
+def _handle_signal(signum, frame):
+    # Çalışan iş bitmeden çıkılırsa job lease'i dolar, başka scheduler devralır
+    logger.info("Scheduler stopping (signal %s)", signum)
+    _stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kampanya zamanlayıcı")
+    parser.add_argument("--once", action="store_true", help="Tek tur çalış ve çık")
+    args = parser.parse_args()
+
+    setup_logging()
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    logger.info("Campaign scheduler started (interval %ss)", INTERVAL)
+    while not _stop.is_set():
+        try:
+            tick()
+        except Exception as e:
+            logger.exception("Scheduler tick error: %s", e)
+        if args.once:
+            break
+        _stop.wait(INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Sender Pool
+Birden fazla WhatsApp gönderici numarası (phone_number_id + token + hız bütçesi)
+
+SENDER_NUMBERS (JSON liste):
+    [{"id": "1234567890", "token": "EAAG...", "rate_per_minute": 4800, "name": "TR-1"},
+     {"id": "2345678901", "name": "TR-2"}]
+
+- token verilmezse WHATSAPP_ACCESS_TOKEN kullanılır
+- Tanımlı değilse PHONE_NUMBER_ID tek gönderici olarak kullanılır
+- Toplu gönderimde kişi → numara ataması rendezvous hash ile yapılır: aynı kişi
+  hep aynı numaradan mesaj alır, havuza numara eklenince kişilerin sadece ~1/N'i
+  taşınır. Cevaplar kişinin yazdığı numaradan gider (outbound.sender_for)
+- rate_per_minute numaranın tüm process'lerde paylaşılan bütçesidir; öncelik
+  sınıflarına göre dağıtımı outbound.py yapar
+"""
+
+from datetime import datetime
+from typing import Dict, List
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from metrics import sender_messages
+
+logger = logging.getLogger(__name__)
+
+PHONE_NUMBER_ID = os.environ.get("PHONE_NUMBER_ID")
+ACCESS_TOKEN = os.environ.get("WHATSAPP_ACCESS_TOKEN") or os.environ.get("ACCESS_TOKEN")
+
+# Cloud API varsayılan throughput'u 80 mesaj/sn
+DEFAULT_RATE_PER_MINUTE = float(os.environ.get("SENDER_RATE_PER_MINUTE", 4800))
+
+# Graph API throughput hatası alan numara bu kadar saniye bekletilir
+THROTTLE_PAUSE_SECONDS = float(os.environ.get("SENDER_THROTTLE_PAUSE", 60))
+
+# Numara bazlı hız sınırı hata kodları (131056 alıcı bazlı olduğu için dahil değil)
+THROTTLE_ERROR_CODES = {4, 80007, 130429}
+
+
+class Sender:
+    """Tek gönderici numara: kimlik bilgisi, hız bütçesi ve sayaçlar"""
+
+    def __init__(self, phone_number_id: str, access_token: str, rate_per_minute: float = None, name: str = None):
+        self.phone_number_id = str(phone_number_id)
+        self.access_token = access_token
+        self.name = name or self.phone_number_id
+        self.rate_per_minute = float(rate_per_minute or DEFAULT_RATE_PER_MINUTE)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "sent": 0,
+            "failed": 0,
+            "throttled": 0,
+            "waited_seconds": 0.0,
+            "last_error": None,
+            "last_error_at": None
+        }
+
+    def paused_seconds(self) -> float:
+        """Throughput hatası sonrası kalan bekleme süresi"""
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+    def add_wait(self, seconds: float):
+        with self._lock:
+            self._stats["waited_seconds"] += seconds
+
+    def record(self, success: bool, error: str = None, error_code: int = None):
+        """Gönderim sonucunu say; throughput hatasında numarayı beklet"""
+        throttled = error_code in THROTTLE_ERROR_CODES
+        with self._lock:
+            if success:
+                self._stats["sent"] += 1
+            else:
+                self._stats["failed"] += 1
+                self._stats["last_error"] = error
+                self._stats["last_error_at"] = datetime.utcnow()
+            if throttled:
+                self._stats["throttled"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + THROTTLE_PAUSE_SECONDS)
+
+        result = "success" if success else "throttled" if throttled else "failed"
+        sender_messages.labels(self.name, result).inc()
+        if throttled:
+            logger.warning(f"🐢 Sender {self.name} throttled by Graph API, pausing {THROTTLE_PAUSE_SECONDS:.0f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "id": self.phone_number_id,
+                "name": self.name,
+                "rate_per_minute": self.rate_per_minute,
+                "paused_seconds": round(self.paused_seconds(), 1),
+                **self._stats,
+                "waited_seconds": round(self._stats["waited_seconds"], 2)
+            }
+
+
+class SenderPool:
+    """Gönderici numaralar + kişi → numara ataması"""
+
+    def __init__(self, senders: List[Sender]):
+        self.senders = senders
+
+    def for_contact(self, phone: str) -> Sender:
+        """Kişinin (sabit) gönderici numarası"""
+        if len(self.senders) == 1:
+            return self.senders[0]
+        key = "".join(c for c in str(phone) if c.isdigit())
+        return max(
+            self.senders,
+            key=lambda sender: hashlib.md5(f"{sender.phone_number_id}:{key}".encode()).digest()
+        )
+
+    def get(self, phone_number_id: str):
+        for sender in self.senders:
+            if sender.phone_number_id == str(phone_number_id):
+                return sender
+        return None
+
+    def stats(self) -> List[Dict]:
+        return [sender.stats() for sender in self.senders]
+
+
+def load_pool(spec: str) -> SenderPool:
+    """SENDER_NUMBERS → SenderPool (boş / hatalıysa PHONE_NUMBER_ID tek gönderici)"""
+    senders = []
+    if spec:
+        try:
+            for entry in json.loads(spec):
+                if not entry.get("id"):
+                    logger.error(f"❌ SENDER_NUMBERS entry without id skipped: {entry.get('name')}")
+                    continue
+                senders.append(Sender(
+                    entry["id"],
+                    entry.get("token") or ACCESS_TOKEN,
+                    rate_per_minute=entry.get("rate_per_minute"),
+                    name=entry.get("name")
+                ))
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.error(f"❌ SENDER_NUMBERS parse error: {e}")
+            senders = []
+
+    if not senders:
+        senders = [Sender(PHONE_NUMBER_ID, ACCESS_TOKEN)]
+    elif len(senders) > 1:
+        logger.info(f"📱 Sender pool: {', '.join(sender.name for sender in senders)}")
+    return SenderPool(senders)
+
+
+pool = load_pool(os.environ.get("SENDER_NUMBERS", ""))
@@ -0,0 +1,188 @@
+"""
+Template Catalogue Cache
+Meta message_templates listesini bellekte tutar, arka planda yeniler
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from models import TemplateCatalogModel
+from utils import graph_request, GRAPH_API_BASE
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+WHATSAPP_BUSINESS_ID = os.environ.get("WHATSAPP_BUSINESS_ID")
+ACCESS_TOKEN = os.environ.get("WHATSAPP_ACCESS_TOKEN") or os.environ.get("ACCESS_TOKEN")
+
+GRAPH_API_VERSION = "v21.0"
+TEMPLATE_FIELDS = "id,name,status,language,category,components"
+PAGE_LIMIT = 100
+MAX_PAGES = 50
+
+# Katalog bu süreden eskiyse arka planda yenilenir (stale-while-revalidate)
+CATALOG_TTL = int(os.environ.get("TEMPLATE_CATALOG_TTL", 300))
+
+
+class TemplateCatalog:
+    """
+    Template kataloğu cache'i
+
+    - Graph API'de tüm sayfalar (paging.next) gezilir
+    - Her sayfanın ETag'i saklanır, yenilemede If-None-Match gönderilir;
+      304 dönen sayfa yerel kopyadan kullanılır
+    - Sonuç MongoDB'ye yazılır, diğer worker'lar Graph'a gitmeden oradan alır
+    - Okuma her zaman bellekten yapılır, eskimişse yenileme arka plana atılır
+    """
+
+    def __init__(self, business_id: str, access_token: str, ttl: int = CATALOG_TTL):
+        self.business_id = business_id
+        self.access_token = access_token
+        self.ttl = ttl
+        self._templates = None
+        self._pages = []
+        self._version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get_templates(self) -> Tuple[List[Dict], Optional[str]]:
+        """Katalog ve versiyonu (ETag) döndür"""
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._load_from_store(max_age=self.ttl)
+                if self._templates is None:
+                    self.refresh()
+
+        if self.is_stale():
+            self.refresh_async()
+
+        return self._templates or [], self._version
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def invalidate(self):
+        """Kataloğu eskimiş say ve arka planda yenile (webhook tetikler)"""
+        self._loaded_at = 0.0
+        self.refresh_async(force=True)
+
+    def refresh_async(self, force: bool = False):
+        """Arka planda yenile (aynı anda tek yenileme çalışır)"""
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(
+            target=self._refresh_in_background,
+            args=(force,),
+            name="template-catalog-refresh",
+            daemon=True
+        ).start()
+
+    def _refresh_in_background(self, force: bool):
+        try:
+            # Başka bir worker yakın zamanda yenilediyse onu kullan
+            if force or not self._load_from_store(max_age=self.ttl, newer_than_memory=True):
+                self.refresh()
+        except Exception as e:
+            logger.error(f"Template catalog background refresh error: {e}")
+
+    def refresh(self) -> bool:
+        """Graph API'den tüm sayfaları çek (ETag ile koşullu istek)"""
+        with self._refresh_lock:
+            old_pages = self._pages
+            pages = []
+            url = f"{GRAPH_API_BASE}/{GRAPH_API_VERSION}/{self.business_id}/message_templates"
+            params = {"fields": TEMPLATE_FIELDS, "limit": PAGE_LIMIT}
+            not_modified = 0
+
+            while url and len(pages) < MAX_PAGES:
+                headers = {"Authorization": f"Bearer {self.access_token}"}
+                old_page = old_pages[len(pages)] if len(pages) < len(old_pages) else None
+                if old_page and old_page.get("etag"):
+                    headers["If-None-Match"] = old_page["etag"]
+
+                response = graph_request("GET", url, "message_templates", headers=headers, params=params, timeout=10)
+
+                if response.status_code == 304 and old_page:
+                    page = old_page
+                    not_modified += 1
+                elif response.status_code == 200:
+                    body = response.json()
+                    page = {
+                        "etag": response.headers.get("ETag"),
+                        "data": body.get("data", []),
+                        "next": body.get("paging", {}).get("next")
+                    }
+                else:
+                    logger.error(f"Template catalog fetch error: {response.status_code} {response.text[:200]}")
+                    raise RuntimeError(f"API Error: {response.status_code}")
+
+                pages.append(page)
+                # paging.next URL'i tüm parametreleri içerir
+                url = page["next"]
+                params = None
+
+            templates = [t for page in pages for t in page["data"]]
+            version = hashlib.sha256(json.dumps(templates, sort_keys=True).encode()).hexdigest()[:16]
+            changed = version != self._version
+
+            self._pages = pages
+            self._templates = templates
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+            try:
+                TemplateCatalogModel.save_catalog(self.business_id, templates, pages, version)
+            except Exception as e:
+                logger.warning(f"Template catalog could not be stored: {e}")
+
+            logger.info(f"📚 Template catalog refreshed: {len(templates)} templates, {len(pages)} pages ({not_modified} not modified)")
+            return changed
+
+    def _load_from_store(self, max_age: int, newer_than_memory: bool = False) -> bool:
+        """MongoDB'deki kopyayı yükle (yeterince tazeyse)"""
+        try:
+            doc = TemplateCatalogModel.get_catalog(self.business_id)
+        except Exception as e:
+            logger.warning(f"Template catalog store read error: {e}")
+            return False
+
+        if not doc or not doc.get("fetched_at"):
+            return False
+        if newer_than_memory and doc.get("version") == self._version:
+            return False
+
+        age = (datetime.utcnow() - doc["fetched_at"]).total_seconds()
+        if age > max_age:
+            # Eski de olsa boş katalogdan iyidir, ama yenileme gerekli
+            if self._templates is None:
+                self._set_from_doc(doc, loaded_at=0.0)
+            return False
+
+        self._set_from_doc(doc, loaded_at=time.monotonic() - age)
+        return True
+
+    def _set_from_doc(self, doc: Dict, loaded_at: float):
+        self._templates = doc.get("templates", [])
+        self._pages = doc.get("pages", [])
+        self._version = doc.get("version")
+        self._loaded_at = loaded_at
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> TemplateCatalog:
+    """Process başına tek katalog instance'ı"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = TemplateCatalog(WHATSAPP_BUSINESS_ID, ACCESS_TOKEN)
+    return _catalog
@@ -0,0 +1,27 @@
+"""
+Test ortamı: MongoDB yerine mongomock
+
+Her test boş bir veritabanıyla başlar; process içi cache'ler temizlenir.
+"""
+
+import os
+
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/test")
+
+import mongomock
+import pytest
+
+import database
+import models
+
+
+@pytest.fixture(autouse=True)
+def db(monkeypatch):
+    mock_db = mongomock.MongoClient().get_database("test")
+    monkeypatch.setattr(database, "get_database", lambda: mock_db)
+    monkeypatch.setattr(models, "get_database", lambda: mock_db)
+    for cache in (models._contact_cache, models._product_cache, models._template_settings_cache,
+                  models._admin_cache, models._settings_cache):
+        cache.clear()
+    models.TemplateSendModel.ensure_indexes()
+    return mock_db
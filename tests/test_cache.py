@@ -0,0 +1,56 @@
+"""TTLCache ve model yazmalarında invalidation"""
+
+import models
+from models import ContactModel, TTLCache
+
+
+def test_values_are_copied():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    value = {"tags": ["vip"]}
+    cache.set("k", value)
+
+    value["tags"].append("changed")
+    cached = cache.get("k")
+    cached["tags"].append("changed")
+
+    assert cache.get("k") == {"tags": ["vip"]}
+
+
+def test_lru_eviction():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = TTLCache("test", maxsize=10, ttl=5)
+    now = [1000.0]
+    monkeypatch.setattr(models.time, "monotonic", lambda: now[0])
+    cache.set("k", "v")
+
+    now[0] += 4
+    assert cache.get("k") == "v"
+    now[0] += 2
+    assert cache.get("k") is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = TTLCache("test", maxsize=10, ttl=0)
+    cache.set("k", "v")
+
+    assert cache.get("k") is None
+
+
+def test_contact_update_invalidates_cache():
+    ContactModel.create_contact("905551112233", "Ali")
+    assert ContactModel.get_contact("905551112233")["name"] == "Ali"
+
+    ContactModel.update_contact("905551112233", {"name": "Veli"})
+
+    assert ContactModel.get_contact("905551112233")["name"] == "Veli"
@@ -0,0 +1,60 @@
+"""Chat geçmişi cursor pagination"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ChatModel
+
+PHONE = "905551112233"
+
+
+@pytest.fixture
+def chats(db):
+    start = datetime(2026, 1, 1, 12, 0)
+    # Aynı timestamp'li mesajlar _id ile ayrışmalı
+    timestamps = [start + timedelta(seconds=i // 2) for i in range(10)]
+    db.chats.insert_many([
+        {"phone": PHONE, "direction": "incoming", "content": f"m{i}", "timestamp": ts}
+        for i, ts in enumerate(timestamps)
+    ])
+    db.chats.insert_one({"phone": "other", "direction": "incoming", "content": "x", "timestamp": start})
+
+
+def _contents(page):
+    return [message["content"] for message in page["messages"]]
+
+
+def test_latest_page(chats):
+    page = ChatModel.get_chat_page(PHONE, limit=4)
+
+    assert _contents(page) == ["m6", "m7", "m8", "m9"]
+    assert page["has_more"] is True
+
+
+def test_before_walks_back_without_gaps(chats):
+    page = ChatModel.get_chat_page(PHONE, limit=3)
+    seen = _contents(page)
+    while page["has_more"]:
+        page = ChatModel.get_chat_page(PHONE, limit=3, before=page["before_cursor"])
+        seen = _contents(page) + seen
+
+    assert seen == [f"m{i}" for i in range(10)]
+
+
+def test_after_returns_only_newer(chats, db):
+    page = ChatModel.get_chat_page(PHONE, limit=10)
+    db.chats.insert_one({"phone": PHONE, "direction": "outgoing", "content": "new",
+                         "timestamp": datetime(2026, 1, 1, 12, 5)})
+
+    newer = ChatModel.get_chat_page(PHONE, limit=10, after=page["after_cursor"])
+    assert _contents(newer) == ["new"]
+
+    empty = ChatModel.get_chat_page(PHONE, limit=10, after=newer["after_cursor"])
+    assert empty["messages"] == []
+    assert empty["after_cursor"] == newer["after_cursor"]
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        ChatModel.decode_cursor("bozuk")
@@ -0,0 +1,36 @@
+"""Ülke bazında sessiz saatler"""
+
+from datetime import datetime
+
+import pytest
+
+import quiet_hours
+
+
+@pytest.fixture(autouse=True)
+def rules(monkeypatch):
+    monkeypatch.setattr(quiet_hours, "RULES", quiet_hours.parse_rules(
+        '{"TR": "21:00-09:00@Europe/Istanbul", "DE": "12:00-13:00", "XX": "bozuk"}'
+    ))
+
+
+def test_parse_rules_skips_invalid():
+    assert set(quiet_hours.RULES) == {"TR", "DE"}
+
+
+def test_overnight_window():
+    # 20:00 UTC = 23:00 İstanbul → pencere ertesi sabah 09:00 (06:00 UTC) biter
+    assert quiet_hours.quiet_until("tr", datetime(2026, 1, 10, 20, 0)) == datetime(2026, 1, 11, 6, 0)
+    # 05:00 UTC = 08:00 İstanbul → aynı gün 06:00 UTC
+    assert quiet_hours.quiet_until("TR", datetime(2026, 1, 10, 5, 0)) == datetime(2026, 1, 10, 6, 0)
+    assert quiet_hours.quiet_until("TR", datetime(2026, 1, 10, 12, 0)) is None
+
+
+def test_same_day_window_utc():
+    assert quiet_hours.quiet_until("DE", datetime(2026, 1, 10, 12, 30)) == datetime(2026, 1, 10, 13, 0)
+    assert quiet_hours.quiet_until("DE", datetime(2026, 1, 10, 13, 0)) is None
+
+
+def test_unknown_country_without_default_rule():
+    assert quiet_hours.quiet_until("US", datetime(2026, 1, 10, 23, 0)) is None
+    assert quiet_hours.is_quiet("", datetime(2026, 1, 10, 23, 0)) is False
@@ -0,0 +1,51 @@
+"""SegmentModel: filtre normalizasyonu ve contacts sorgusu"""
+
+import pytest
+
+from models import SegmentModel
+
+
+def test_normalize_filters_cleans_lists():
+    filters = SegmentModel.normalize_filters({
+        "tags": "vip, , yeni",
+        "countries": ["tr", " de "],
+        "phones": [],
+        "replied_within_days": "7",
+        "not_received_template": " welcome "
+    })
+
+    assert filters == {
+        "tags": ["vip", "yeni"],
+        "countries": ["TR", "DE"],
+        "replied_within_days": 7,
+        "not_received_template": "welcome"
+    }
+
+
+def test_normalize_filters_empty():
+    assert SegmentModel.normalize_filters(None) == {}
+    assert SegmentModel.normalize_filters({"tags": [], "has_sale": None}) == {}
+
+
+@pytest.mark.parametrize("filters", [
+    {"tags": {"vip": True}},
+    {"has_sale": "yes"},
+    {"replied_within_days": "abc"},
+    {"replied_within_days": 0}
+])
+def test_normalize_filters_rejects_invalid(filters):
+    with pytest.raises(ValueError):
+        SegmentModel.normalize_filters(filters)
+
+
+def test_build_query():
+    query = SegmentModel.build_query({"tags": ["vip"], "countries": ["TR"], "has_sale": False})
+
+    assert query["is_active"] is True
+    assert query["tags"] == {"$in": ["vip"]}
+    assert set(query["country"]["$in"]) == {"TR", "tr", "Tr"}
+    assert query["has_sale"] == {"$ne": True}
+
+
+def test_build_query_without_filters_targets_active_contacts():
+    assert SegmentModel.build_query({}) == {"is_active": True}
@@ -0,0 +1,17 @@
+"""SendBudgetModel: numara başına paylaşılan pencere bütçesi"""
+
+from models import SendBudgetModel
+
+
+def test_take_stops_at_limit():
+    assert [SendBudgetModel.take("sender-1", 100, 3) for _ in range(4)] == [True, True, True, False]
+
+
+def test_windows_and_senders_are_independent(db):
+    for _ in range(2):
+        SendBudgetModel.take("sender-1", 100, 2)
+
+    assert SendBudgetModel.take("sender-1", 100, 2) is False
+    assert SendBudgetModel.take("sender-1", 101, 2) is True
+    assert SendBudgetModel.take("sender-2", 100, 2) is True
+    assert db.send_budget.find_one({"_id": "sender-1:100"})["count"] == 2
@@ -0,0 +1,124 @@
+"""template_sends ledger: claim / commit / release / lease recovery"""
+
+from datetime import datetime, timedelta
+
+from models import TemplateSendModel
+
+PHONE = "905551112233"
+TEMPLATE = "welcome"
+
+
+def _expire(db, phone=PHONE, template_name=TEMPLATE):
+    db.template_sends.update_one(
+        {"phone": phone, "template_name": template_name},
+        {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+
+def test_claim_is_exclusive(db):
+    assert TemplateSendModel.claim(PHONE, TEMPLATE) is True
+    assert TemplateSendModel.claim(PHONE, TEMPLATE) is False
+
+    send = db.template_sends.find_one({"phone": PHONE})
+    assert send["status"] == "in_flight"
+    assert send["attempted_at"] is None
+
+
+def test_commit_marks_sent(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    TemplateSendModel.mark_attempted(PHONE, TEMPLATE)
+
+    assert TemplateSendModel.commit(PHONE, TEMPLATE, message_id="wamid.1") is True
+
+    send = db.template_sends.find_one({"phone": PHONE})
+    assert send["status"] == "sent"
+    assert send["confirmed"] is True
+    assert send["message_id"] == "wamid.1"
+    assert "lease_expires_at" not in send
+    assert TemplateSendModel.claim(PHONE, TEMPLATE) is False
+
+
+def test_release_allows_retry(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+
+    assert TemplateSendModel.release(PHONE, TEMPLATE) is True
+    assert TemplateSendModel.claim(PHONE, TEMPLATE) is True
+
+
+def test_release_keeps_sent_record(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    TemplateSendModel.commit(PHONE, TEMPLATE)
+
+    assert TemplateSendModel.release(PHONE, TEMPLATE) is False
+    assert TemplateSendModel.has_received(PHONE, TEMPLATE)
+
+
+def test_commit_after_recovery_reports_lost_claim(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    _expire(db)
+    TemplateSendModel.recover_expired_leases()
+
+    # Recovery claim'i bıraktı: commit False döner, kayıt record_sent ile geri yazılır
+    assert TemplateSendModel.commit(PHONE, TEMPLATE) is False
+    assert TemplateSendModel.record_sent(PHONE, TEMPLATE, source="bulk_send") is True
+    assert TemplateSendModel.record_sent(PHONE, TEMPLATE) is False
+
+
+def test_recover_releases_never_attempted(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    _expire(db)
+
+    assert TemplateSendModel.recover_expired_leases() == {"committed": 0, "released": 1, "needs_review": 0}
+    assert db.template_sends.count_documents({}) == 0
+
+
+def test_recover_flags_attempted_for_review(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    TemplateSendModel.mark_attempted(PHONE, TEMPLATE)
+    _expire(db)
+
+    assert TemplateSendModel.recover_expired_leases() == {"committed": 0, "released": 0, "needs_review": 1}
+
+    send = db.template_sends.find_one({"phone": PHONE})
+    assert send["status"] == "sent"
+    assert send["confirmed"] is False
+    assert send["needs_review"] is True
+
+
+def test_recover_flags_legacy_claim_without_marker(db):
+    db.template_sends.insert_one({
+        "phone": PHONE,
+        "template_name": TEMPLATE,
+        "status": "in_flight",
+        "claimed_at": datetime.utcnow() - timedelta(minutes=5),
+        "lease_expires_at": datetime.utcnow() - timedelta(minutes=1)
+    })
+
+    assert TemplateSendModel.recover_expired_leases()["needs_review"] == 1
+
+
+def test_recover_commits_when_message_logged(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+    TemplateSendModel.mark_attempted(PHONE, TEMPLATE)
+    db.messages.insert_one({
+        "phone": PHONE,
+        "template_name": TEMPLATE,
+        "status": "delivered",
+        "message_id": "wamid.2",
+        "sent_at": datetime.utcnow()
+    })
+    _expire(db)
+
+    assert TemplateSendModel.recover_expired_leases() == {"committed": 1, "released": 0, "needs_review": 0}
+
+    send = db.template_sends.find_one({"phone": PHONE})
+    assert send["status"] == "sent"
+    assert send["confirmed"] is True
+    assert send["message_id"] == "wamid.2"
+
+
+def test_recover_ignores_live_leases(db):
+    TemplateSendModel.claim(PHONE, TEMPLATE)
+
+    assert TemplateSendModel.recover_expired_leases() == {"committed": 0, "released": 0, "needs_review": 0}
+    assert db.template_sends.find_one({"phone": PHONE})["status"] == "in_flight"
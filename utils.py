@@ -3,24 +3,58 @@ Utility Functions
 WhatsApp API helpers and common functions
 """
 
-import requests
 import os
 import logging
+import time
 from typing import Dict
+from health import record_graph_call
+from metrics import graph_request_seconds
+from profiling import record_graph_time
+from senders import Sender, pool as sender_pool
 
 logger = logging.getLogger(__name__)
 
-# WhatsApp API Config
-PHONE_NUMBER_ID = os.environ.get("PHONE_NUMBER_ID")
-ACCESS_TOKEN = os.environ.get("WHATSAPP_ACCESS_TOKEN") or os.environ.get("ACCESS_TOKEN")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v21.0/{PHONE_NUMBER_ID}/messages"
+# Benchmark / test için yerel stub'a yönlendirilebilir (benchmarks/graph_stub.py)
+GRAPH_API_BASE = os.environ.get("GRAPH_API_BASE", "https://graph.facebook.com").rstrip("/")
 
-def send_template_message(phone_number: str, template_name: str, language_code: str = "tr", header_image_id: str = None) -> Dict:
+def _messages_url(sender: Sender) -> str:
+    return f"{GRAPH_API_BASE}/v21.0/{sender.phone_number_id}/messages"
+
+def _error_code(error_data: Dict):
+    return (error_data.get("error") or {}).get("code")
+
+def graph_request(method: str, url: str, endpoint: str, **kwargs):
+    """
+    Graph API isteği (requests.request) + endpoint/status bazında süre metriği
+    Exception'lar (timeout vb.) olduğu gibi yukarı fırlatılır.
+    """
+    import requests
+    
+    started = time.perf_counter()
+    status = "error"
+    try:
+        response = requests.request(method, url, **kwargs)
+        status = str(response.status_code)
+        return response
+    except requests.Timeout:
+        status = "timeout"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        graph_request_seconds.labels(endpoint, status).observe(elapsed)
+        record_graph_time(endpoint, elapsed)
+
+def send_template_message(phone_number: str, template_name: str, language_code: str = "tr",
+                          header_image_id: str = None, sender: Sender = None) -> Dict:
     """
     WhatsApp Cloud API ile şablon mesajı gönder
+    sender verilmezse kişinin havuzdaki sabit numarası kullanılır (senders.py)
     """
+    import requests
+    
+    sender = sender or sender_pool.for_contact(phone_number)
     headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
+        "Authorization": f"Bearer {sender.access_token}",
         "Content-Type": "application/json"
     }
     
@@ -51,15 +85,14 @@ def send_template_message(phone_number: str, template_name: str, language_code:
                 ]
             }
         ]
-        logger.info(f"Template with image header: {header_image_id}")
+        logger.debug("Template with image header: %s", header_image_id)
     
     try:
-        response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload, timeout=10)
-        
-        # Log response for debugging
-        logger.info(f"WhatsApp API Response: {response.status_code}")
+        response = graph_request("POST", _messages_url(sender), "messages", headers=headers, json=payload, timeout=10)
         
         if response.status_code == 200:
+            record_graph_call(True)
+            sender.record(True)
             return {
                 "success": True,
                 "status_code": response.status_code,
@@ -68,7 +101,13 @@ def send_template_message(phone_number: str, template_name: str, language_code:
         else:
             error_data = response.json() if response.text else {}
             error_msg = error_data.get("error", {}).get("message", "Unknown error")
-            logger.error(f"WhatsApp API Error: {error_msg}")
+            logger.error(
+                "WhatsApp API Error: %s", error_msg,
+                extra={"phone": phone_number, "template": template_name, "status_code": response.status_code,
+                       "sender": sender.name}
+            )
+            record_graph_call(False, error_msg)
+            sender.record(False, error_msg, _error_code(error_data))
             return {
                 "success": False,
                 "status_code": response.status_code,
@@ -76,24 +115,29 @@ def send_template_message(phone_number: str, template_name: str, language_code:
                 "response": error_data
             }
     except requests.Timeout:
-        logger.error(f"Timeout while sending to {phone_number}")
+        logger.error("Timeout while sending to %s", phone_number, extra={"template": template_name})
+        record_graph_call(False, "timeout")
+        sender.record(False, "timeout")
         return {
             "success": False,
             "error": "Request timeout (10s)"
         }
     except Exception as e:
-        logger.error(f"Exception while sending to {phone_number}: {e}")
+        logger.error("Exception while sending to %s: %s", phone_number, e, extra={"template": template_name})
+        record_graph_call(False, str(e))
+        sender.record(False, str(e))
         return {
             "success": False,
             "error": str(e)
         }
 
-def send_text_message(phone_number: str, text: str) -> Dict:
+def send_text_message(phone_number: str, text: str, sender: Sender = None) -> Dict:
     """
     WhatsApp Cloud API ile text mesajı gönder
     """
+    sender = sender or sender_pool.for_contact(phone_number)
     headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
+        "Authorization": f"Bearer {sender.access_token}",
         "Content-Type": "application/json"
     }
     
@@ -108,36 +152,42 @@ def send_text_message(phone_number: str, text: str) -> Dict:
     }
     
     try:
-        logger.info(f"🚀 Sending text to {phone_number}")
-        response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload, timeout=10)
+        response = graph_request("POST", _messages_url(sender), "messages", headers=headers, json=payload, timeout=10)
         response_data = response.json()
         
         if response.status_code == 200:
-            logger.info(f"✅ Message sent successfully: {response_data}")
+            logger.debug("Text message sent to %s", phone_number)
+            record_graph_call(True)
+            sender.record(True)
             return {
                 "success": True,
                 "response": response_data
             }
         else:
-            logger.error(f"❌ Message send failed: {response_data}")
+            logger.error("Text message send failed to %s: %s", phone_number, response_data.get("error", {}).get("message"))
+            record_graph_call(False, response_data.get("error", {}).get("message"))
+            sender.record(False, response_data.get("error", {}).get("message"), _error_code(response_data))
             return {
                 "success": False,
                 "error": response_data.get("error", {}).get("message", "Unknown error"),
                 "response": response_data
             }
     except Exception as e:
-        logger.error(f"❌ Exception: {e}")
+        logger.error("Text message exception for %s: %s", phone_number, e)
+        record_graph_call(False, str(e))
+        sender.record(False, str(e))
         return {
             "success": False,
             "error": str(e)
         }
 
-def send_image_message(phone_number: str, image_url: str, caption: str = "") -> Dict:
+def send_image_message(phone_number: str, image_url: str, caption: str = "", sender: Sender = None) -> Dict:
     """
     WhatsApp Cloud API ile görsel mesajı gönder
     """
+    sender = sender or sender_pool.for_contact(phone_number)
     headers = {
-        "Authorization": f"Bearer {ACCESS_TOKEN}",
+        "Authorization": f"Bearer {sender.access_token}",
         "Content-Type": "application/json"
     }
     
@@ -154,21 +204,27 @@ def send_image_message(phone_number: str, image_url: str, caption: str = "") ->
         payload["image"]["caption"] = caption
     
     try:
-        response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload, timeout=10)
+        response = graph_request("POST", _messages_url(sender), "messages", headers=headers, json=payload, timeout=10)
         response_data = response.json()
         
         if response.status_code == 200:
+            record_graph_call(True)
+            sender.record(True)
             return {
                 "success": True,
                 "response": response_data
             }
         else:
+            record_graph_call(False, response_data.get("error", {}).get("message"))
+            sender.record(False, response_data.get("error", {}).get("message"), _error_code(response_data))
             return {
                 "success": False,
                 "error": response_data.get("error", {}).get("message", "Unknown error"),
                 "response": response_data
             }
     except Exception as e:
+        record_graph_call(False, str(e))
+        sender.record(False, str(e))
         return {
             "success": False,
             "error": str(e)